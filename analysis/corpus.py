@@ -0,0 +1,388 @@
+"""
+Aggregates the whole corpus of pitchers (every pitcher/season file of
+the store, or every pitcher csv file) on all cores without ever holding
+more than a chunk of pitches per worker in memory.
+
+A map function turns a chunk of pitches (whole games) into a partial
+aggregate: a count, a sum, a Series or DataFrame of counts, a Counter,
+a dictionary of those, or a sketch (Histogram, Distinct). Every
+partition file is mapped on a process pool, a chunk at a time, and the
+partial aggregates are merged as they come back, e.g.
+
+  import corpus
+  mix = corpus.run(corpus.pitch_mix_by_inning, ['../store'])
+  outs = corpus.run(corpus.outs, ['../pitchers-compressed'], workers=8)
+
+A map function has to be a module level function (it is sent to the
+workers by name) and should return sums and counts rather than means,
+so the partial aggregates add up.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=3.9
+@copyright 2014
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import getopt
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import features
+from report import pitcher_files
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import instrument
+import store
+
+
+class Histogram(object):
+    """
+    A histogram of a numeric column over fixed bins (plus one bin below
+    and one above them), for the quantiles of the whole corpus.
+    """
+
+    def __init__(self, edges, counts=None):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64) \
+            if counts is None else counts
+
+    def add(self, values):
+        """Counts the values (missing values are left out)."""
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.counts += np.bincount(
+            np.searchsorted(self.edges, values, 'right'),
+            minlength=len(self.counts))
+
+        return self
+
+    def merge(self, other):
+        """The histogram of the values of both histograms."""
+
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bins")
+
+        return Histogram(self.edges, self.counts + other.counts)
+
+    def quantile(self, q):
+        """
+        The q-th quantile of the values, interpolated within its bin
+        (the values below and above the bins count as the first and
+        last edge).
+        """
+
+        total = self.counts.sum()
+        if not total:
+            return np.nan
+
+        cumulative = np.cumsum(self.counts)
+        position = int(np.searchsorted(cumulative, q * total, 'left'))
+        if position == 0:
+            return self.edges[0]
+        if position >= len(self.edges):
+            return self.edges[-1]
+
+        before = cumulative[position - 1]
+        fraction = (q * total - before) / float(self.counts[position])
+        lo, hi = self.edges[position - 1], self.edges[position]
+
+        return lo + fraction * (hi - lo)
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+
+class Distinct(object):
+    """
+    A sketch of the number of distinct values: the k smallest hashes of
+    the values (exact up to k distinct values, within a few percent
+    above).
+    """
+
+    def __init__(self, k=4096, hashes=None):
+        self.k = k
+        self.hashes = np.array([], dtype=np.uint64) \
+            if hashes is None else hashes
+
+    def add(self, values):
+        """Counts the values."""
+
+        hashes = pd.util.hash_array(np.asarray(values))
+        self.hashes = np.unique(
+            np.concatenate([self.hashes, hashes]))[:self.k]
+
+        return self
+
+    def merge(self, other):
+        """The sketch of the values of both sketches."""
+
+        return Distinct(self.k, np.unique(
+            np.concatenate([self.hashes, other.hashes]))[:self.k])
+
+    def estimate(self):
+        """The estimated number of distinct values."""
+
+        if len(self.hashes) < self.k:
+            return len(self.hashes)
+
+        return int((self.k - 1) / (float(self.hashes[-1]) / 2.0 ** 64))
+
+
+def merge(a, b):
+    """
+    Merges two partial aggregates: numbers and arrays are added, Series
+    and DataFrames are added by index (missing rows count as 0), Counters
+    and dictionaries are merged by key and sketches with their merge().
+    """
+
+    if a is None:
+        return b
+    if b is None:
+        return a
+
+    if isinstance(a, (pd.Series, pd.DataFrame)):
+        return a.add(b, fill_value=0)
+    if hasattr(a, 'merge'):
+        return a.merge(b)
+    if isinstance(a, Counter):
+        merged = Counter(a)
+        merged.update(b)
+        return merged
+    if isinstance(a, dict):
+        merged = dict(a)
+        for key, value in b.items():
+            merged[key] = merge(merged.get(key), value)
+        return merged
+    if isinstance(a, tuple):
+        return tuple(merge(x, y) for x, y in zip(a, b))
+
+    return a + b
+
+
+def run(map_fn, paths, columns=None, workers=None, chunksize=100000,
+        name=None):
+    """
+    Maps a function over every partition of the pitcher files (or store
+    directories) in paths and merges the results (see merge()).
+
+    Every worker reads its partition chunksize rows (csv) or one part
+    file at a time, only the requested columns, and the chunks are
+    regrouped so no game is split between two of them (gid is always
+    read). workers defaults to the number of cpus, 1 runs in this
+    process.
+
+    Returns the merged aggregate (None for no pitches).
+    """
+
+    if columns is not None and 'gid' not in columns:
+        columns = ['gid'] + list(columns)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    tasks = [(map_fn, part, columns, chunksize)
+             for path in pitcher_files(paths)
+             for part in store.partitions(path)]
+
+    # Every worker holds one chunk at a time.
+    if workers > 1:
+        executor = ProcessPoolExecutor(workers)
+        results = _completed(executor, tasks)
+    else:
+        executor = None
+        results = (_map(task) for task in tasks)
+
+    result = None
+    with instrument.stage(
+            'corpus', aggregate=name or map_fn.__name__,
+            partitions=len(tasks)) as stats:
+        try:
+            for part, partial, rows, error in results:
+                if error is not None:
+                    raise RuntimeError(
+                        "Failed to aggregate " + part + ": " + error)
+
+                result = merge(result, partial)
+                stats.rows += rows
+                if stats.enabled:
+                    stats.bytes_read += os.path.getsize(part)
+        except Exception:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        if executor:
+            executor.shutdown()
+
+    return result
+
+
+def _completed(executor, tasks):
+    """
+    Maps the partitions on the workers of an executor and yields the
+    results as they finish (see _map()). A worker that dies (e.g. killed
+    for running out of memory) fails the run instead of hanging it.
+    """
+
+    futures = [executor.submit(_map, task) for task in tasks]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    except BrokenProcessPool:
+        raise RuntimeError(
+            "A worker died while aggregating (e.g. out of memory)")
+
+
+def _map(args):
+    """Maps a function over the chunks of a partition (pool worker)."""
+
+    map_fn, part, columns, chunksize = args
+
+    partial = None
+    rows = 0
+    try:
+        for df in store.games(store.chunks(part, columns, chunksize)):
+            partial = merge(partial, map_fn(df))
+            rows += len(df)
+    except Exception as e:
+        return part, None, rows, str(e) or e.__class__.__name__
+
+    return part, partial, rows, None
+
+
+def pitch_mix_by_inning(df):
+    """The number of pitches of every pitch type (columns) per inning."""
+
+    return pd.crosstab(df['inning'], df['mlbam_pitch_name'].astype(object))
+
+
+def outs(df):
+    """The number of pitches thrown with 0, 1, 2, ... outs."""
+
+    if 'outs' not in df:
+        df = features.derive(df)
+
+    return df['outs'].value_counts()
+
+
+# The bins of the speed histograms (mph).
+SPEED_BINS = np.arange(40.0, 110.25, 0.25)
+
+
+def speeds(df):
+    """A speed histogram (start_speed) of every pitch type."""
+
+    return dict(
+        (pitch_type, Histogram(SPEED_BINS).add(group.values))
+        for pitch_type, group in df['start_speed'].groupby(
+            df['mlbam_pitch_name'].astype(object)))
+
+
+def batters(df):
+    """A sketch of the distinct batters faced."""
+
+    return Distinct().add(df['batter_id'].values)
+
+
+# The aggregates of the command line and the columns they read.
+AGGREGATES = {
+    'pitch_mix_by_inning': (pitch_mix_by_inning,
+                            ['inning', 'mlbam_pitch_name']),
+    'outs': (outs, None),
+    'speeds': (speeds, ['mlbam_pitch_name', 'start_speed']),
+    'batters': (batters, ['batter_id']),
+}
+
+
+def table(result):
+    """Converts an aggregate into a DataFrame (to print or save)."""
+
+    if isinstance(result, pd.DataFrame):
+        return result
+    if isinstance(result, pd.Series):
+        return result.sort_index().to_frame('pitches')
+    if isinstance(result, Distinct):
+        return pd.DataFrame({'distinct': [result.estimate()]})
+    if isinstance(result, Histogram):
+        result = {'all': result}
+
+    return pd.DataFrame(
+        [[len(h), h.quantile(0.1), h.quantile(0.5), h.quantile(0.9)]
+         for h in result.values()],
+        index=list(result.keys()),
+        columns=['pitches', 'p10', 'p50', 'p90']).sort_index()
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:a:o:j:b:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i', 'a']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    if not opts['a'] in AGGREGATES:
+        usage()
+        sys.exit(2)
+
+    map_fn, columns = AGGREGATES[opts['a']]
+    result = table(run(
+        map_fn, opts['i'].split(','), columns,
+        workers=int(opts['j']) if 'j' in opts else None,
+        chunksize=int(opts.get('b', 100000))))
+
+    if 'o' in opts:
+        result.to_csv(opts['o'])
+    else:
+        print(result.to_string())
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) files or store directories (comma separated).\n" +
+    "\t-a: the aggregate, one of " + ", ".join(sorted(AGGREGATES)) + ".\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-o: a csv file for the result (printed otherwise).\n" +
+    "\t-j: the number of worker processes (defaults to the number of cpus).\n" +
+    "\t-b: the number of csv rows read at a time (defaults to 100000).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython corpus.py -i \"../store\" -a pitch_mix_by_inning -j 8\n" +
+    "\tpython corpus.py -i \"../samples/\" -a speeds\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+A precomputed pitcher x batter matchup cube: the number of pitches of
+every type (and the sum of their speeds) a pitcher has thrown a batter
+in every situation, i.e. for every
+
+  (pitcher_id, batter_id, season, stand, inning bucket, outs, balls, strikes)
+
+cell. The cell coordinates are packed into a single sorted int64 key,
+so a question like "what does pitcher P throw batter B on 1-2 with two
+outs" is a binary search and a roll-up over any of the coordinates is a
+contiguous slice plus a mask.
+
+The cube is saved as plain numpy arrays and memory-mapped when loaded:
+
+  path/
+    cube.json     (the pitch types and the key layout)
+    keys.npy      (K sorted cell keys)
+    counts.npy    (K x T pitch counts)
+    speeds.npy    (K x T sums of start_speed)
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import features
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The pitch types counted by the cube. Any other type is counted as
+#  unknown (UN).
+# @see http://www.fangraphs.com/library/pitch-type-abbreviations-classifications/
+PITCH_TYPES = ['CH', 'CU', 'EP', 'FA', 'FC', 'FF', 'FO', 'FS', 'FT', 'IN',
+               'KC', 'KN', 'PO', 'SC', 'SI', 'SL', 'UN']
+
+# The coordinates of a cell and the number of bits they take in the
+#  key, most significant first. A roll-up is fastest when it fixes a
+#  prefix of these.
+FIELDS = [
+    ('pitcher_id', 20),
+    ('batter_id', 20),
+    ('season', 8),
+    ('stand', 1),
+    ('inning', 2),
+    ('outs', 2),
+    ('balls', 2),
+    ('strikes', 2),
+]
+
+# Seasons are stored as an offset from this year.
+FIRST_SEASON = 1900
+
+# The side of the plate the batter stands on.
+STANDS = ['L', 'R']
+
+# The inning buckets: 1-3, 4-6, 7-9 and extra innings.
+INNINGS = ['1-3', '4-6', '7-9', '10+']
+
+
+class Cube(object):
+    """The cells of a matchup cube, held in memory or memory-mapped."""
+
+    def __init__(self, keys, counts, speeds, types=PITCH_TYPES, skipped=0):
+        self.keys = keys
+        self.counts = counts
+        self.speeds = speeds
+        self.types = list(types)
+
+        # The pitches left out of the last build (see build()).
+        self.skipped = skipped
+
+    def __len__(self):
+        return len(self.keys)
+
+    def cells(self, **where):
+        """
+        Finds the cells matching some coordinates, e.g.
+        cells(pitcher_id=433587, balls=1, strikes=2). Coordinates that
+        are not given are rolled up.
+
+        Returns the positions of the matching cells (a slice when the
+        given coordinates are a prefix of the key, an index array
+        otherwise).
+        """
+
+        codes = _codes(where)
+
+        # The leading coordinates narrow the search to a contiguous
+        #  range of keys.
+        prefix = 0
+        for name, _ in FIELDS:
+            if name not in codes:
+                break
+            prefix += 1
+
+        lo, hi = _range(codes, prefix)
+        start = int(np.searchsorted(self.keys, lo, 'left'))
+        stop = int(np.searchsorted(self.keys, hi, 'right'))
+
+        if prefix == len(codes):
+            return slice(start, stop)
+
+        # The remaining coordinates are checked cell by cell.
+        leading = [name for name, _ in FIELDS[:prefix]]
+        keys = self.keys[start:stop]
+        mask = np.ones(len(keys), dtype=bool)
+        for name, code in codes.items():
+            if name not in leading:
+                mask &= _unpack(keys, name) == code
+
+        return start + np.flatnonzero(mask)
+
+    def totals(self, **where):
+        """
+        Rolls up the cells matching some coordinates (see cells()).
+
+        Returns the pitch counts and the speed sums of every pitch type.
+        """
+
+        cells = self.cells(**where)
+
+        return (self.counts[cells].sum(axis=0),
+                self.speeds[cells].sum(axis=0, dtype=np.float64))
+
+    def query(self, **where):
+        """
+        Summarizes the pitches thrown in the cells matching some
+        coordinates (see cells()).
+
+        Returns a DataFrame indexed by the pitch types thrown with the
+        columns num_pitches, pct (of all pitches) and avg_speed.
+        """
+
+        counts, speeds = self.totals(**where)
+        thrown = counts > 0
+
+        summary = pd.DataFrame({
+            'num_pitches': counts[thrown],
+            'pct': 100.0 * counts[thrown] / max(counts.sum(), 1),
+            'avg_speed': speeds[thrown] / counts[thrown],
+        }, index=pd.Index(np.array(self.types)[thrown], name='type'))
+
+        return summary[['num_pitches', 'pct', 'avg_speed']]
+
+    def refresh(self, df):
+        """
+        Rebuilds the cells of every (pitcher, season) in a DataFrame of
+        pitches, keeping the cells of all the other pitchers and seasons.
+        The DataFrame has to hold every pitch of those seasons (not only
+        the new games), as their cells are replaced as a whole.
+        Refreshing with the same pitches twice gives the same cube.
+
+        Returns the refreshed cube.
+        """
+
+        new = build(df, self.types)
+
+        # Drop the (pitcher, season) partitions that were rebuilt.
+        partition = _partition(self.keys)
+        keep = ~np.isin(partition, np.unique(_partition(new.keys)))
+
+        keys = np.concatenate([self.keys[keep], new.keys])
+        order = np.argsort(keys, kind='mergesort')
+
+        return Cube(keys[order],
+                    np.concatenate([self.counts[keep], new.counts])[order],
+                    np.concatenate([self.speeds[keep], new.speeds])[order],
+                    self.types, new.skipped)
+
+    def save(self, path):
+        """Saves the cube to a directory (see load())."""
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        # Write every file aside and move it in place, the
+        #  description last.
+        for name, array in [('keys', self.keys), ('counts', self.counts),
+                            ('speeds', self.speeds)]:
+            filename = os.path.join(path, name + '.npy')
+            with open(filename + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.rename(filename + '.tmp', filename)
+
+        filename = os.path.join(path, 'cube.json')
+        with open(filename + '.tmp', 'w') as f:
+            json.dump({'types': self.types, 'fields': FIELDS}, f)
+        os.rename(filename + '.tmp', filename)
+
+
+def build(df, types=PITCH_TYPES):
+    """
+    Aggregates a DataFrame of pitches into a cube. The pitches need the
+    derived outs column (see features.derive()). Pitches without a cell
+    (e.g. a missing stand or a count out of range) are left out and
+    counted in the cube's skipped.
+    """
+
+    keys, valid = _pack(df)
+    skipped = len(df) - int(valid.sum())
+    if skipped:
+        df = df[valid]
+        keys = keys[valid]
+
+    # Unknown pitch types are counted as the last type.
+    codes = pd.Index(types).get_indexer(
+        df['mlbam_pitch_name'].astype(object))
+    codes = np.where(codes < 0, len(types) - 1, codes)
+
+    cells, cell = np.unique(keys, return_inverse=True)
+    flat = cell * len(types) + codes
+    size = len(cells) * len(types)
+
+    counts = np.bincount(flat, minlength=size).astype(np.uint32)
+    speeds = np.bincount(
+        flat, weights=df['start_speed'].fillna(0).values, minlength=size)
+
+    return Cube(cells,
+                counts.reshape(len(cells), len(types)),
+                speeds.astype(np.float32).reshape(len(cells), len(types)),
+                types, skipped)
+
+
+def load(path, mmap_mode='r'):
+    """Memory-maps a cube saved with Cube.save()."""
+
+    with open(os.path.join(path, 'cube.json'), 'r') as f:
+        description = json.load(f)
+
+    if [list(field) for field in description['fields']] != \
+            [list(field) for field in FIELDS]:
+        raise ValueError("Unsupported cube layout in " + path)
+
+    arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+              for name in ['keys', 'counts', 'speeds']]
+
+    return Cube(*arrays, types=description['types'])
+
+
+def _pack(df):
+    """
+    Packs the cell coordinates of every pitch into an int64 key.
+
+    Returns the keys and whether every pitch has a cell (all of its
+    coordinates given and in range); the keys of the others are
+    meaningless.
+    """
+
+    coordinates = {
+        'pitcher_id': df['pitcher_id'].values,
+        'batter_id': df['batter_id'].values,
+        'season': _seasons(df) - FIRST_SEASON,
+        'stand': pd.Index(STANDS).get_indexer(df['stand'].astype(object)),
+        'inning': np.minimum((df['inning'].values - 1) // 3, 3),
+        # Innings with more outs than allowed are kept in the last bucket.
+        'outs': np.clip(df['outs'].values, 0, 3),
+        'balls': df['balls'].values,
+        'strikes': df['strikes'].values,
+    }
+
+    keys = np.zeros(len(df), dtype=np.int64)
+    valid = np.ones(len(df), dtype=bool)
+    for name, bits in FIELDS:
+        values = np.asarray(coordinates[name], dtype=np.float64)
+        in_range = (values >= 0) & (values < 1 << bits)
+        valid &= in_range
+        values = np.where(in_range, values, 0).astype(np.int64)
+        keys = (keys << bits) | values
+
+    return keys, valid
+
+
+def _codes(where):
+    """Encodes the coordinates of a query the way _pack() does."""
+
+    codes = {}
+    for name, value in where.items():
+        if name not in dict(FIELDS):
+            raise ValueError("Unknown cube coordinate: " + name)
+        if name == 'season':
+            value -= FIRST_SEASON
+        elif name == 'stand':
+            value = STANDS.index(value)
+        elif name == 'inning':
+            value = INNINGS.index(value) if value in INNINGS \
+                else min((int(value) - 1) // 3, 3)
+        codes[name] = int(value)
+
+    return codes
+
+
+def _range(codes, prefix):
+    """The smallest and largest key starting with the prefix coordinates."""
+
+    lo = hi = 0
+    for i, (name, bits) in enumerate(FIELDS):
+        lo <<= bits
+        hi <<= bits
+        if i < prefix:
+            lo |= codes[name]
+            hi |= codes[name]
+        else:
+            hi |= (1 << bits) - 1
+
+    return lo, hi
+
+
+def _unpack(keys, name):
+    """Extracts one coordinate from packed keys."""
+
+    shift = 0
+    for field, bits in reversed(FIELDS):
+        if field == name:
+            return (keys >> shift) & ((1 << bits) - 1)
+        shift += bits
+
+
+def _partition(keys):
+    """The (pitcher, season) partition of packed keys as one number."""
+
+    return _unpack(keys, 'pitcher_id') << 8 | _unpack(keys, 'season')
+
+
+def _seasons(df):
+    """The season of every pitch."""
+
+    if 'year' in df:
+        return df['year'].values
+
+    return pd.to_datetime(df['dateStamp']).dt.year.values
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:a')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i', 'o']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    df = store.read(opts['i'])
+    if 'outs' not in df:
+        df = features.derive(df)
+
+    if 'a' in opts and os.path.exists(os.path.join(opts['o'], 'cube.json')):
+        cube = load(opts['o'], mmap_mode=None).refresh(df)
+    else:
+        cube = build(df)
+
+    cube.save(opts['o'])
+
+    if cube.skipped:
+        print("Skipped " + str(cube.skipped) + " pitches without a cell " +
+              "(e.g. a missing stand or a count out of range).")
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) file or store directory.\n" +
+    "\t-o: the output cube directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-a: refresh the pitchers and seasons of the input in an existing\n" +
+    "\t    cube instead of rebuilding it. The input has to hold whole\n" +
+    "\t    seasons, the cells of its seasons are replaced.\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython cube.py -i \"./store/\" -o \"./cube/\"\n" +
+    "\tpython cube.py -i \"./store/433587/\" -o \"./cube/\" -a\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
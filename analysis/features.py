@@ -0,0 +1,156 @@
+"""
+Derives the additional columns used by the analysis (pitch_in_inning,
+outs, speed_last, ...) from the raw columns of a pitcher file.
+
+Every column is computed with grouped (game, inning) operations over the
+whole file at once, so any pitcher file (or the whole league) can be run
+through it as one stage of the pipeline.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The pitch types that are considered fastballs (sinkers included,
+#  as in the sample files).
+# @see http://www.fangraphs.com/library/pitch-type-abbreviations-classifications/
+FASTBALLS = ['FA', 'FF', 'FT', 'FC', 'FS', 'SI']
+
+# The number of outs the outcome of an at-bat ('des') results in.
+DES_OUTS = {
+    'Strikeout': 1, 'Groundout': 1, 'Intent Walk': 0, 'Bunt Groundout': 1,
+    'Sac Fly DP': 2, 'Lineout': 1, 'Force Out': 1, 'Sac Fly': 1,
+    'Grounded Into DP': 2, 'Ground Out': 1, 'Triple': 0, 'Fly Out': 1,
+    'Double': 0, 'Bunt Pop Out': 1, 'Field Error': 0, 'Forceout': 1,
+    'Runner Out': 1, 'Fielders Choice Out': 1, 'Hit By Pitch': 0,
+    'Bunt Ground Out': 1, 'Double Play': 2, 'Line Out': 1,
+    'Strikeout - DP': 2, 'Pop Out': 1, 'Fan interference': 0, 'Flyout': 1,
+    'Fielders Choice': 1, 'Walk': 0, 'Single': 0, 'Home Run': 0,
+    'Sac Bunt': 1,
+}
+
+
+def derive(df):
+    """
+    Adds the derived columns to a pitcher DataFrame. The pitches are
+    expected in the order they were thrown within each game.
+
+    - pitch_in_inning: number of the pitch in the inning (from 1)
+    - pitch_in_game: number of the pitch in the game (from 1)
+    - first_of_inning: 1 if first pitch of the inning, 0 otherwise
+    - last_pitch_ab: 1 if last pitch of the at-bat, 0 otherwise
+    - resulting_outs: outs the pitch led to (0 unless last of the at-bat)
+    - outs: number of outs at the time of the pitch
+    - fastball_binary: 1 if the pitch is a type of fastball, 0 otherwise
+    - speed_last: speed of the previous pitch (0 if first of inning)
+    - fastball_last: fastball_binary of the previous pitch
+      (-1 if first of inning)
+    - type_last: type of the previous pitch ('NONE' if first of inning)
+    - year: the season of the pitch
+    """
+
+    df = df.copy()
+
+    by_game = df.groupby('gid', sort=False)
+    by_inning = df.groupby(['gid', 'inning'], sort=False)
+
+    df['pitch_in_inning'] = by_inning.cumcount() + 1
+    df['pitch_in_game'] = by_game.cumcount() + 1
+    df['first_of_inning'] = (df['pitch_in_inning'] == 1).astype(np.int8)
+    df['last_pitch_ab'] = (df['ab_total'] == df['ab_count']).astype(np.int8)
+
+    # Only the last pitch of an at-bat results in outs.
+    des_outs = df['des'].astype(object).map(DES_OUTS).fillna(0)
+    df['resulting_outs'] = \
+        (des_outs * df['last_pitch_ab']).astype(np.int8)
+
+    # The outs before a pitch are the outs of every earlier
+    #  pitch in the inning.
+    df['outs'] = (
+        by_inning['resulting_outs'].cumsum() - df['resulting_outs']
+    ).astype(np.int8)
+
+    df['fastball_binary'] = \
+        df['mlbam_pitch_name'].isin(FASTBALLS).astype(np.int8)
+
+    # Look back at the previous pitch of the inning.
+    previous = by_inning[
+        ['start_speed', 'fastball_binary', 'mlbam_pitch_name']].shift(1)
+    df['speed_last'] = previous['start_speed'].fillna(0)
+    df['fastball_last'] = \
+        previous['fastball_binary'].fillna(-1).astype(np.int8)
+    df['type_last'] = \
+        previous['mlbam_pitch_name'].astype(object).fillna('NONE')
+
+    df['year'] = pd.to_datetime(df['dateStamp']).dt.year
+
+    return df
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i', 'o']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    df = derive(store.read(opts['i']))
+
+    if opts['o'].endswith('.csv'):
+        df.to_csv(opts['o'], index=False)
+    else:
+        # Start the pitchers over, the store only adds part files.
+        store.remove(opts['o'], df['pitcher_id'].unique())
+        store.write(df, opts['o'])
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) file or store directory.\n" +
+    "\t-o: the output pitcher csv file or store directory.\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython features.py -i \"./pitchers/433587.csv\" " +
+    "-o \"./features/433587.csv\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
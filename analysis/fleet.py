@@ -0,0 +1,309 @@
+"""
+Trains the fastball model (see model.py) for every pitcher, one pitcher
+per process on a bounded pool of workers.
+
+Every pitcher is trained on 2011-12 and tested on 2013-14, like the
+notebook's model for Hernandez. The output directory holds:
+
+  out/
+    433587.joblib   (the fitted model, params and cv score per pitcher)
+    ...
+    registry.json   (pitcher id -> model file, source file, params, ...)
+    metrics.csv     (one row of training/test metrics per pitcher)
+
+The registry is written after every pitcher. A pitcher that fails (or
+whose process dies or times out, -t) is recorded with its error and the
+others carry on; running the fleet again only trains the pitchers that
+failed or whose data changed.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+from multiprocessing.connection import wait
+
+import numpy as np
+import pandas as pd
+
+import joblib
+
+import model
+from report import pitcher_files
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The registry and metrics files in the output directory.
+REGISTRY = "registry.json"
+METRICS = "metrics.csv"
+
+# The columns of the metrics table.
+METRIC_COLUMNS = ['pitcher_id', 'source', 'train_pitches', 'test_pitches',
+                  'cv_score', 'test_accuracy', 'baseline_accuracy',
+                  'params', 'seconds', 'error']
+
+
+def fit(filename, out_dir, search='halving', probability=False):
+    """
+    Trains and tests the model of a single pitcher file and saves the
+    model to the output directory.
+
+    Returns the registry entry of the pitcher.
+    """
+
+    start = time.time()
+
+    df = store.read(filename)
+    pid = str(int(df['pitcher_id'].iloc[0]))
+
+    X_train, y_train, X_test, y_test = model.split(df)
+    if not len(X_train) or not len(X_test):
+        raise ValueError("No pitches in the training or test seasons")
+
+    result = model.train(X_train, y_train, search=search, n_jobs=1,
+                         probability=probability)
+
+    # The baseline always predicts the most common class of training.
+    majority = int(np.mean(y_train) >= 0.5)
+
+    model_file = os.path.join(out_dir, pid + '.joblib')
+    joblib.dump(result, model_file + '.tmp')
+    os.rename(model_file + '.tmp', model_file)
+
+    return {
+        'pitcher_id': pid,
+        'model': os.path.basename(model_file),
+        'train_pitches': len(X_train),
+        'test_pitches': len(X_test),
+        'cv_score': result['score'],
+        'test_accuracy': float(np.mean(
+            result['model'].predict(X_test.values) == y_test)),
+        'baseline_accuracy': float(np.mean(y_test == majority)),
+        'params': result['params'],
+        'seconds': time.time() - start,
+    }
+
+
+def _stat(filename):
+    """
+    The size and modification time of a pitcher file (the total size
+    and latest modification of the parts of a store directory).
+    """
+
+    if os.path.isdir(filename):
+        stats = [os.stat(os.path.join(path, name))
+                 for path, _, names in os.walk(filename) for name in names]
+        return [sum(s.st_size for s in stats),
+                max([s.st_mtime for s in stats] or [0])]
+
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime]
+
+
+def run(tasks, workers, timeout=None):
+    """
+    Trains the pitchers of the tasks, every pitcher in a fresh process
+    of its own (at most workers at a time), so a pitcher can't take the
+    memory of the next one with it. A pitcher whose process dies (e.g.
+    killed for running out of memory) or takes longer than timeout
+    seconds is failed and the others carry on.
+
+    Yields the registry entries of the pitchers as they finish.
+    """
+
+    tasks = list(tasks)
+
+    # The receiving end of every running pitcher's pipe ->
+    #  (process, task, start time).
+    running = {}
+    while tasks or running:
+        while tasks and len(running) < workers:
+            task = tasks.pop(0)
+            receiver, sender = multiprocessing.Pipe(False)
+            process = multiprocessing.Process(
+                target=_fit_process, args=(task, sender))
+            process.start()
+            # Only the child holds the sending end, so its pipe is
+            #  closed (and ready) as soon as it dies.
+            sender.close()
+            running[receiver] = (process, task, time.time())
+
+        for receiver in wait(list(running), 1 if timeout else None):
+            process, task, _ = running.pop(receiver)
+            try:
+                entry = receiver.recv()
+            except EOFError:
+                entry = None
+            receiver.close()
+            process.join()
+
+            if entry is None:
+                entry = _failed(task[0], "Worker died (exit code " +
+                                str(process.exitcode) + ")")
+            yield entry
+
+        if timeout:
+            for receiver, (process, task, start) in list(running.items()):
+                if time.time() - start > timeout:
+                    del running[receiver]
+                    process.terminate()
+                    process.join()
+                    receiver.close()
+                    yield _failed(task[0], "Timed out after " +
+                                  str(timeout) + " seconds")
+
+
+def _fit(args):
+    """Trains a single pitcher (in its own process)."""
+
+    filename, out_dir, search, probability = args
+
+    try:
+        entry = fit(filename, out_dir, search, probability)
+    except Exception as e:
+        traceback.print_exc()
+        return _failed(filename, str(e) or e.__class__.__name__)
+
+    entry['source'] = filename
+    entry['stat'] = _stat(filename)
+
+    return entry
+
+
+def _fit_process(args, sender):
+    """Trains a single pitcher and sends its entry back (process)."""
+
+    sender.send(_fit(args))
+    sender.close()
+
+
+def _failed(filename, error):
+    """
+    The registry entry of a pitcher file that failed (without a stat if
+    the file is gone).
+    """
+
+    try:
+        stat = _stat(filename)
+    except OSError:
+        stat = None
+
+    return {'error': error, 'source': filename, 'stat': stat}
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:j:s:t:p')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i', 'o']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    out_dir = opts['o']
+    workers = int(opts['j']) if 'j' in opts else multiprocessing.cpu_count()
+    search = opts.get('s', 'halving')
+    probability = 'p' in opts
+    timeout = float(opts['t']) if 't' in opts else None
+
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    # The registry is keyed by pitcher id; failed pitchers are kept
+    #  under their source file until they succeed.
+    registry = {}
+    registry_file = os.path.join(out_dir, REGISTRY)
+    if os.path.exists(registry_file):
+        with open(registry_file, 'r') as f:
+            registry = json.load(f)
+
+    done = dict(
+        (entry['source'], entry['stat']) for entry in registry.values()
+        if not 'error' in entry)
+
+    tasks = [
+        (filename, out_dir, search, probability)
+        for filename in pitcher_files(opts['i'].split(','))
+        if done.get(filename) != _stat(filename)]
+
+    print("Training " + str(len(tasks)) + " pitchers.")
+
+    for entry in run(tasks, workers, timeout):
+        # Drop the previous (failed) entries of the source.
+        for name in [name for name, old in registry.items()
+                     if old['source'] == entry['source']]:
+            del registry[name]
+
+        registry[entry.get('pitcher_id', entry['source'])] = entry
+
+        if 'error' in entry:
+            print("Failed " + entry['source'] + ": " + entry['error'])
+        else:
+            print("Trained " + entry['pitcher_id'] + " (test accuracy " +
+                  str(round(entry['test_accuracy'], 3)) + ")")
+
+        with open(registry_file + '.tmp', 'w') as f:
+            json.dump(registry, f, indent=2, sort_keys=True)
+        os.rename(registry_file + '.tmp', registry_file)
+
+    metrics = pd.DataFrame(
+        list(registry.values()), columns=METRIC_COLUMNS)
+    metrics['params'] = metrics['params'].map(
+        lambda params: json.dumps(params, sort_keys=True)
+        if isinstance(params, dict) else params)
+    metrics.sort_values('source').to_csv(
+        os.path.join(out_dir, METRICS), index=False)
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) files or store directories (comma separated).\n" +
+    "\t-o: the output (model) directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-j: the number of worker processes (defaults to the number of cpus).\n" +
+    "\t-s: the search, halving or random (defaults to halving).\n" +
+    "\t-p: also fit the models to predict probabilities (see serve.py).\n" +
+    "\t-t: fail the pitchers that take longer than this many seconds.\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython fleet.py -i \"../store/\" -o \"./fleet\" -j 8\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Summarizes how pitchers pitch to batters: the pitch mix, average speed,
+pitches per at-bat, fastball rate and first pitch fastball rate of every
+pitcher x batter matchup.
+
+The whole summary matrix is computed with one grouped aggregation, so it
+scales to every pitcher against every batter.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import pandas as pd
+
+
+# The pitch mix columns and the pitch types that make them up.
+PITCH_MIX = [
+    ('% Changeups', ['CH']),
+    ('% Curveballs', ['CU']),
+    ('% 4-Seam Fastballs', ['FA', 'FF']),
+    ('% Cutter', ['FC']),
+    ('% Sinker', ['SI', 'FS']),
+    ('% Slider', ['SL']),
+]
+
+# The summary statistics of a matchup (in the order of the notebook's
+#  matchup_analysis).
+COLUMNS = [column for column, _ in PITCH_MIX] + [
+    'Avg Speed of pitch',
+    'Avg Pitches per AB',
+    '% of pitches that are fastballs',
+    '% of first pitch fastballs',
+]
+
+
+def summary(df, by=('pitcher_id', 'batter_id'), years=None, min_pitches=0):
+    """
+    Computes the summary statistics (COLUMNS) of every group of pitches,
+    by default every pitcher x batter matchup, plus the number of
+    pitches (num_pitches) the statistics are based on.
+
+    years optionally limits the pitches to some seasons and groups with
+    min_pitches or fewer pitches are left out.
+    """
+
+    by = list(by)
+
+    if years is not None:
+        df = df[_years(df).isin(years)]
+
+    names = df['mlbam_pitch_name'].astype(object)
+    first = df['ab_count'] == 1
+
+    # Every statistic is the mean of a column over the group's pitches
+    #  (missing values are skipped, e.g. only the first pitches count
+    #  towards the pitches per at-bat).
+    stats = pd.DataFrame(dict(
+        [(column, 100.0 * names.isin(types))
+         for column, types in PITCH_MIX] +
+        [('Avg Speed of pitch', df['start_speed']),
+         ('Avg Pitches per AB', df['ab_total'].where(first)),
+         ('% of pitches that are fastballs', 100.0 * df['fastball_binary']),
+         ('% of first pitch fastballs',
+          100.0 * df['fastball_binary'].where(first))]
+    ), index=df.index)
+    for column in by:
+        stats[column] = df[column]
+
+    grouped = stats.groupby(by)
+    matchups = grouped[COLUMNS].mean()
+    matchups['num_pitches'] = grouped.size()
+
+    return matchups[matchups['num_pitches'] > min_pitches]
+
+
+def _years(df):
+    """The season of every pitch."""
+
+    if 'year' in df:
+        return df['year'].astype(int)
+
+    return pd.to_datetime(df['dateStamp']).dt.year
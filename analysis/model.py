@@ -0,0 +1,277 @@
+"""
+Trains the fastball model of the notebook: an RBF support vector
+machine on the situation of a pitch (count, outs, inning, the previous
+pitch, ...) and the batter's prior, trained on 2011-12 and tested on
+2013-14.
+
+The hyperparameter search runs on all cores with successive halving
+(or a randomized search) instead of the full grid, and every search is
+memoized on disk under a hash of the training data and the search
+settings, so re-running the notebook or the fleet never fits the same
+model twice. Pitchers with too many pitches for an exact SVM are fit
+with a linear SVM on a Nystroem approximation of the same kernel.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import sklearn
+from sklearn import svm
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.kernel_approximation import Nystroem
+from sklearn.model_selection import RandomizedSearchCV
+from sklearn.pipeline import Pipeline
+import joblib
+
+import features
+import priors
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The features of a pitch and the class to predict.
+FEATURES = ['ab_count', 'speed_last', 'fastball_last', 'stand', 'strikes',
+            'balls', 'inning', 'outs', 'prior']
+TARGET = 'fastball_binary'
+
+# The seasons the model is trained and tested on.
+TRAIN_SEASONS = [2011, 2012]
+TEST_SEASONS = [2013, 2014]
+
+# The hyperparameters searched (the grid of the notebook).
+GRID = {
+    'kernel': ['rbf'],
+    'class_weight': ['balanced', None],
+    'C': [1, 10, 100, 1000],
+    'gamma': [0.0001, 0.001, 0.01, 1],
+}
+
+# Pitchers with more training pitches than this are fit on an
+#  approximation of the kernel.
+MAX_EXACT = 20000
+
+
+def design(df, rates):
+    """
+    Builds the feature matrix (FEATURES) of the pitches with the priors
+    from a priors.table().
+    """
+
+    X = pd.DataFrame(index=df.index)
+    for column in FEATURES:
+        if column == 'stand':
+            X[column] = (df['stand'] == 'R').astype(np.int8)
+        elif column == 'prior':
+            X[column] = priors.attach(df, rates)
+        else:
+            X[column] = df[column]
+
+    return X
+
+
+def split(df, train_seasons=TRAIN_SEASONS, test_seasons=TEST_SEASONS,
+          shrinkage=0.0):
+    """
+    Splits the pitches of a pitcher into the training and test sets of
+    the season benchmark. The priors of both sets come from the
+    training seasons only.
+
+    Returns a tuple (X_train, y_train, X_test, y_test).
+    """
+
+    if 'outs' not in df:
+        df = features.derive(df)
+
+    seasons = df['year'] if 'year' in df else \
+        pd.to_datetime(df['dateStamp']).dt.year
+    train = df[seasons.isin(train_seasons)]
+    test = df[seasons.isin(test_seasons)]
+
+    rates = priors.table(train, by=['batter_id'], shrinkage=shrinkage)
+
+    return (design(train, rates), train[TARGET].values,
+            design(test, rates), test[TARGET].values)
+
+
+def train(X, y, cache_dir=None, search='halving', n_iter=10, cv=3,
+          n_jobs=-1, max_exact=MAX_EXACT, grid=GRID, random_state=0,
+          probability=False):
+    """
+    Searches the hyperparameters of the fastball model and fits the best
+    model on all of X, y.
+
+    search is either 'halving' (successive halving over the grid) or
+    'random' (n_iter random picks from the grid). With a cache_dir the
+    result is stored under a hash of X, y and the settings and loaded
+    from there the next time. With probability the best model is refit
+    to also predict probabilities (predict_proba).
+
+    Returns a dictionary with the fitted model, its params and the mean
+    cross validation score of the params.
+    """
+
+    settings = {
+        'search': search, 'n_iter': n_iter, 'cv': cv, 'grid': grid,
+        'approximate': len(X) > max_exact, 'random_state': random_state,
+        'probability': probability, 'sklearn': sklearn.__version__,
+    }
+
+    filename = None
+    if cache_dir is not None:
+        filename = os.path.join(cache_dir, key(X, y, settings) + '.joblib')
+        if os.path.exists(filename):
+            return joblib.load(filename)
+
+    if settings['approximate']:
+        estimator, grid = _approximation(grid, random_state)
+    else:
+        estimator = svm.SVC()
+
+    if search == 'halving':
+        # Successive halving is still experimental in sklearn.
+        from sklearn.experimental import enable_halving_search_cv
+        from sklearn.model_selection import HalvingGridSearchCV
+        searcher = HalvingGridSearchCV(
+            estimator, grid, cv=cv, n_jobs=n_jobs,
+            random_state=random_state)
+    elif search == 'random':
+        searcher = RandomizedSearchCV(
+            estimator, grid, n_iter=n_iter, cv=cv, n_jobs=n_jobs,
+            random_state=random_state)
+    else:
+        raise ValueError("Unknown search: " + str(search))
+
+    searcher.fit(_values(X), y)
+
+    # Calibrate the decision function of the best model (the same
+    #  sigmoid fit as SVC(probability=True)).
+    best = searcher.best_estimator_
+    if probability:
+        best = CalibratedClassifierCV(best, cv=cv).fit(_values(X), y)
+
+    result = {
+        'model': best,
+        'params': searcher.best_params_,
+        'score': searcher.best_score_,
+    }
+
+    if filename is not None:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        joblib.dump(result, filename + '.tmp')
+        os.rename(filename + '.tmp', filename)
+
+    return result
+
+
+def key(X, y, settings):
+    """A hash of the training data and the settings of a search."""
+
+    h = hashlib.sha1()
+    if hasattr(X, 'columns'):
+        h.update(json.dumps([str(c) for c in X.columns]).encode('utf-8'))
+    h.update(np.ascontiguousarray(_values(X), dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    h.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+
+    return h.hexdigest()
+
+
+def _approximation(grid, random_state):
+    """
+    A linear SVM on a Nystroem approximation of the RBF kernel and the
+    grid translated to it.
+    """
+
+    estimator = Pipeline([
+        ('kernel', Nystroem(kernel='rbf', random_state=random_state)),
+        ('svm', svm.LinearSVC()),
+    ])
+
+    return estimator, {
+        'kernel__gamma': grid['gamma'],
+        'svm__C': grid['C'],
+        'svm__class_weight': grid['class_weight'],
+    }
+
+
+def _values(X):
+    """The numpy array of a feature DataFrame (or array)."""
+
+    return X.values if hasattr(X, 'values') else np.asarray(X)
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:m:s:j:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    X_train, y_train, X_test, y_test = split(store.read(opts['i']))
+
+    result = train(
+        X_train, y_train,
+        cache_dir=opts.get('m', 'models/'),
+        search=opts.get('s', 'halving'),
+        n_jobs=int(opts['j']) if 'j' in opts else -1)
+
+    print("Best params: " + str(result['params']))
+    print("CV score: " + str(result['score']))
+    print("Test accuracy: " +
+          str(np.mean(result['model'].predict(_values(X_test)) == y_test)))
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) file or store directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-m: the model cache directory (defaults to models/).\n" +
+    "\t-s: the search, halving or random (defaults to halving).\n" +
+    "\t-j: the number of parallel jobs (defaults to all cpus).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython model.py -i \"../samples/433587-hernandez.csv\" -m \"./models\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+A single multi-class model of the pitch type (mlbam_pitch_name) in
+place of the notebook's one-vs-rest forests, one per pitch type.
+
+The pitch types are encoded once and a single random forest is trained
+on all of them (its trees in parallel). The importance of the features
+for every pitch type comes out of that one forest: every split is
+credited with the decrease of the one-vs-rest gini impurity of each
+pitch type, the same measure a forest trained for just that pitch type
+would use.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from sklearn.ensemble import RandomForestClassifier
+
+import features
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The numeric columns the notebook's pitch type forests were trained on.
+FEATURES = ['ab_total', 'ab_count', 'batter_id', 'id', 'speed_last',
+            'fastball_last', 'strikes', 'balls', 'inning', 'pitch_in_inning',
+            'pitch_in_game', 'first_of_inning', 'outs', 'year']
+TARGET = 'mlbam_pitch_name'
+
+
+def design(df):
+    """Builds the feature matrix (FEATURES) of the pitches."""
+
+    if 'outs' not in df:
+        df = features.derive(df)
+    elif 'year' not in df:
+        df = df.assign(year=pd.to_datetime(df['dateStamp']).dt.year)
+
+    return df[FEATURES]
+
+
+def fit(X, pitch_types, n_estimators=15, random_state=0, n_jobs=-1):
+    """
+    Trains one forest on all the pitch types.
+
+    Returns the fitted forest; forest.classes_ are the pitch types.
+    """
+
+    # The forest encodes the pitch types once for all its trees.
+    forest = RandomForestClassifier(
+        n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
+    forest.fit(X, np.asarray(pitch_types, dtype=str))
+
+    return forest
+
+
+def importances(forest, columns=None):
+    """
+    The importance of every feature for every pitch type.
+
+    Returns a tuple (means, stds) of DataFrames indexed by pitch type
+    with one column per feature: the importances averaged over the
+    trees and their standard deviation. The importances of a pitch type
+    sum to 1 in every tree that splits it from the others (and to 0 in
+    the trees that never do, e.g. for very rare pitch types).
+    """
+
+    per_tree = np.array([_tree_importances(tree.tree_)
+                         for tree in forest.estimators_])
+
+    if columns is None:
+        columns = np.arange(per_tree.shape[2])
+
+    return (pd.DataFrame(per_tree.mean(axis=0),
+                         index=forest.classes_, columns=columns),
+            pd.DataFrame(per_tree.std(axis=0),
+                         index=forest.classes_, columns=columns))
+
+
+def probabilities(forest, X):
+    """The probability of every pitch type (columns) for every pitch."""
+
+    return pd.DataFrame(forest.predict_proba(X), columns=forest.classes_,
+                        index=getattr(X, 'index', None))
+
+
+def _tree_importances(tree):
+    """
+    The (pitch types x features) one-vs-rest gini importances of a
+    single tree, normalized per pitch type.
+    """
+
+    split = tree.children_left >= 0
+    left = tree.children_left[split]
+    right = tree.children_right[split]
+
+    # The fraction of each pitch type and the weight of every node.
+    value = tree.value[:, 0, :]
+    p = value / value.sum(axis=1)[:, np.newaxis]
+    w = tree.weighted_n_node_samples[:, np.newaxis]
+    gini = w * 2 * p * (1 - p)
+
+    decrease = gini[split] - gini[left] - gini[right]
+
+    result = np.zeros((p.shape[1], tree.n_features))
+    np.add.at(result.T, tree.feature[split], decrease)
+
+    totals = result.sum(axis=1)[:, np.newaxis]
+    return np.where(totals > 0, result / np.where(totals > 0, totals, 1), 0)
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:n:j:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    df = store.read(opts['i'])
+    X = design(df)
+
+    forest = fit(X, df[TARGET],
+                 n_estimators=int(opts.get('n', 15)),
+                 n_jobs=int(opts.get('j', -1)))
+    means, _ = importances(forest, X.columns)
+
+    # Print the feature ranking of every pitch type.
+    for pitch_type, row in means.iterrows():
+        print("Pitch type: " + pitch_type)
+        ranking = row.sort_values(ascending=False)
+        for rank, (column, importance) in enumerate(ranking.items()):
+            print(str(rank + 1) + ". " + column + " - " +
+                  str(round(importance, 2)))
+        print("")
+
+    if 'o' in opts:
+        means.to_csv(opts['o'], index_label='pitch_type')
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) file or store directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-o: a csv file for the importances (pitch types x features).\n" +
+    "\t-n: the number of trees (defaults to 15).\n" +
+    "\t-j: the number of parallel jobs (defaults to all cpus).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython pitchtype.py -i \"../samples/433587-hernandez.csv\" " +
+    "-o \"./importances.csv\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
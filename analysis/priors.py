@@ -0,0 +1,104 @@
+"""
+Builds the batter priors used as a feature by the fastball model: the
+fraction of pitches a batter has seen from the pitcher that were
+fastballs.
+
+The rates for every batter (or every pitcher x batter pair) come out of
+a single groupby and are attached to the pitches with a hash join, so
+computing priors for millions of pitches takes seconds. Batters with
+little support can be shrunk towards the pitcher's overall rate.
+
+@see http://www.sloansportsconference.com/wp-content/uploads/2012/02/98-Predicting-the-Next-Pitch_updated.pdf
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import pandas as pd
+
+
+def table(df, by=('pitcher_id', 'batter_id'), shrinkage=0.0):
+    """
+    Computes the fastball rate for every group of pitches, e.g. every
+    batter or every pitcher x batter pair.
+
+    With shrinkage k > 0 the rate of a group with n pitches becomes
+    (fastballs + k * rate of the pitcher) / (n + k), i.e. groups with
+    few pitches are pulled towards the pitcher's overall rate.
+
+    Returns a DataFrame indexed by the group keys with the columns
+    fastballs, num_pitches and prior.
+    """
+
+    by = list(by)
+
+    rates = df.groupby(by)['fastball_binary'].agg(['sum', 'count'])
+    rates.columns = ['fastballs', 'num_pitches']
+
+    rates['prior'] = (
+        rates['fastballs'] + shrinkage * _baseline(rates, by)
+    ) / (rates['num_pitches'] + shrinkage)
+
+    return rates
+
+
+def attach(df, rates):
+    """
+    Looks up the prior of every pitch in a table from table(). Pitches
+    of groups that are not in the table (e.g. batters who have not
+    faced the pitcher yet) get the pitcher's overall rate.
+
+    Returns a Series of priors aligned with df.
+    """
+
+    by = list(rates.index.names)
+
+    if len(by) == 1:
+        keys = df[by[0]]
+    else:
+        keys = pd.MultiIndex.from_arrays([df[column] for column in by])
+
+    prior = pd.Series(
+        rates['prior'].reindex(keys).values, index=df.index, name='prior')
+
+    # Fall back on the pitcher's rate (or the rate over the
+    #  whole table if there's no pitcher to go by).
+    overall = float(rates['fastballs'].sum()) / rates['num_pitches'].sum()
+    if _per_pitcher(by):
+        prior = prior.fillna(df['pitcher_id'].map(_pitcher_rates(rates)))
+
+    return prior.fillna(overall)
+
+
+def _baseline(rates, by):
+    """
+    The rate every group is shrunk towards: the rate of the group's
+    pitcher, or the overall rate if the groups aren't per pitcher.
+    """
+
+    if _per_pitcher(by):
+        return _pitcher_rates(rates).reindex(
+            rates.index.get_level_values('pitcher_id')).values
+
+    return float(rates['fastballs'].sum()) / rates['num_pitches'].sum()
+
+
+def _per_pitcher(by):
+    """Determines if the groups are pitcher x something groups."""
+
+    return 'pitcher_id' in by and len(by) > 1
+
+
+def _pitcher_rates(rates):
+    """The overall fastball rate of every pitcher in a table."""
+
+    pitchers = rates.groupby(level='pitcher_id')[
+        ['fastballs', 'num_pitches']].sum()
+
+    return pitchers['fastballs'].astype(float) / pitchers['num_pitches']
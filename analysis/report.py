@@ -0,0 +1,295 @@
+"""
+Renders the tendency charts of column-tendency.py for many pitcher files,
+columns and window sizes at once.
+
+Every pitcher file is read once (only the requested columns) and the
+window averages of every column and window size are computed up front
+from the one frame: the games are split up and every column is encoded
+once, each window size only adds a count. The charts are then drawn on
+a process pool, one pitcher per task, reusing a single figure per task
+(matplotlib is only imported once there is a chart to draw). A chart is
+only drawn again when the data behind it changed since the last report,
+so a nightly refresh of the whole league only draws the charts of the
+pitchers that played.
+
+The charts of a pitcher file <name>.csv (or store directory <name>/)
+are written to <out>/<name>/, named like the charts of
+column-tendency.py.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+import tendency
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The file (in the output directory) that remembers what every chart
+#  was drawn from.
+MANIFEST = "report.json"
+
+
+def charts(filename, column_names, windows):
+    """
+    Computes the data of every chart of a pitcher file, for every
+    column and every window size (pitches per window) in windows.
+
+    Returns a list of (chart filename, title, labels, values) tuples.
+    """
+
+    if isinstance(windows, int):
+        windows = [windows]
+
+    df = store.read(filename, columns=['gid', 'pitcher_id'] + column_names)
+    pid = str(int(df['pitcher_id'][0]))
+
+    # The games are split up and every column is encoded only once,
+    #  each window size is a single count on top of them.
+    positions = tendency.game_positions(df)
+
+    found = []
+    for column_name in column_names:
+        codes, column_types = tendency.encode(df[column_name])
+
+        for pitches_per_window in windows:
+            totals, games = tendency.count_windows(
+                positions, codes, len(column_types), pitches_per_window)
+            type_avgs = tendency.averages(totals, games, column_types)
+            labels = tendency.window_labels(
+                type_avgs.shape[0], pitches_per_window)
+
+            for column_type, type_counts in type_avgs.items():
+                found.append((
+                    pid + "-" + column_name + "-" + str(column_type) + \
+                    "-n" + str(pitches_per_window) + ".png",
+                    "\"" + str(column_type) + "\"" + \
+                    " Over Time for Column " + column_name,
+                    labels,
+                    type_counts.values))
+
+    return found
+
+
+def render(charts, out_dir, drawn=None):
+    """
+    Draws charts (see charts()) into a directory on a single reused
+    figure. Charts whose data matches their signature in drawn (a
+    dictionary of chart filename to signature) are skipped.
+
+    Returns the signatures of all the charts.
+    """
+
+    drawn = drawn or {}
+    signatures = {}
+    fig = None
+
+    for chart in charts:
+        filename = chart[0]
+        signatures[filename] = signature(chart)
+
+        if drawn.get(filename) == signatures[filename] and \
+                os.path.exists(os.path.join(out_dir, filename)):
+            continue
+
+        if fig is None:
+            fig = _figure()
+        _draw(fig, chart)
+        fig.savefig(os.path.join(out_dir, filename))
+
+    if fig is not None:
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+
+    return signatures
+
+
+def signature(chart):
+    """A hash of everything a chart is drawn from."""
+
+    _, title, labels, values = chart
+
+    h = hashlib.md5()
+    h.update(json.dumps([title, labels]).encode('utf-8'))
+    h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+
+    return h.hexdigest()
+
+
+def pitcher_files(paths):
+    """
+    Expands the input paths into pitcher files: csv files, pitcher
+    directories of the store, and the csv files or pitcher directories
+    inside any other directory.
+    """
+
+    found = []
+
+    for path in paths:
+        if not os.path.isdir(path) or _is_pitcher(path):
+            found.append(path)
+            continue
+
+        for name in sorted(os.listdir(path)):
+            child = os.path.join(path, name)
+            if name.endswith('.csv') or \
+                    (os.path.isdir(child) and _is_pitcher(child)):
+                found.append(child)
+
+    return found
+
+
+def _is_pitcher(path):
+    """Determines if a directory is a pitcher directory of the store."""
+
+    return all(season.isdigit() and len(season) == 4
+               for season in os.listdir(path))
+
+
+def _name(filename):
+    """The name of a pitcher file, e.g. 433587-hernandez."""
+
+    return os.path.splitext(os.path.basename(os.path.normpath(filename)))[0]
+
+
+def _figure():
+    """Creates the figure the charts are drawn on."""
+
+    import matplotlib
+    matplotlib.use('agg')
+    import matplotlib.pyplot as plt
+
+    return plt.figure(figsize=(20, 10))
+
+
+def _draw(fig, chart):
+    """Draws a chart on a (cleared) figure."""
+
+    _, title, labels, values = chart
+
+    fig.clf()
+
+    ind = np.arange(len(values))
+    ax = fig.add_subplot(111)
+    ax.bar(ind, values)
+    ax.set_xticks(ind)
+    ax.set_xticklabels(labels)
+    ax.set_title(title)
+    ax.set_xlabel("Pitch Range")
+    ax.set_ylabel("Number of Occurrences")
+
+
+def _report(args):
+    """Reports a single pitcher file (pool worker)."""
+
+    filename, column_names, windows, out_dir, drawn = args
+
+    out_dir = os.path.join(out_dir, _name(filename))
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    try:
+        return filename, render(
+            charts(filename, column_names, windows),
+            out_dir, drawn)
+    except Exception as e:
+        print("Failed to report " + filename + ": " + str(e))
+        return filename, None
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:c:n:o:j:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i', 'c', 'n', 'o']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    column_names = opts['c'].split(',')
+    windows = [int(n) for n in opts['n'].split(',')]
+    workers = int(opts['j']) if 'j' in opts else multiprocessing.cpu_count()
+
+    if not os.path.exists(opts['o']):
+        os.makedirs(opts['o'])
+
+    manifest = {}
+    manifest_file = os.path.join(opts['o'], MANIFEST)
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+
+    tasks = [
+        (filename, column_names, windows, opts['o'],
+         manifest.get(_name(filename), {}))
+        for filename in pitcher_files(opts['i'].split(','))]
+
+    pool = multiprocessing.Pool(workers)
+    for filename, signatures in pool.imap_unordered(_report, tasks):
+        if signatures is not None:
+            manifest.setdefault(_name(filename), {}).update(signatures)
+    pool.close()
+    pool.join()
+
+    with open(manifest_file + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.rename(manifest_file + '.tmp', manifest_file)
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) files or store directories (comma separated).\n" +
+    "\t-c: the columns to chart (comma separated).\n" +
+    "\t-n: the number of pitches per pitch window (e.g. 10 for 0-10, 10-20, ...),\n" +
+    "\t    several sizes can be given (comma separated).\n" +
+    "\t-o: the output directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-j: the number of worker processes (defaults to the number of cpus).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython report.py -i \"../samples/\" " +
+    "-c \"mlbam_pitch_name,fastball_binary\" -n 10 -o \"../results\"\n" +
+    "\tpython report.py -i \"../samples/\" " +
+    "-c \"mlbam_pitch_name,fastball_binary,zone_location,pdes\" " +
+    "-n 5,10,20 -o \"../results\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+A pitch sequence (n-gram) model: how often each pitch type follows the
+previous pitches of a pitcher, within an at-bat or a game, optionally
+split by the count and the side of the plate the batter stands on.
+
+The transitions are counted in a dense array of
+
+  (pitchers, situations, contexts, pitch types)
+
+where a context is the previous order - 1 pitch types (or the start of
+the at-bat/game, for the first pitches), encoded as a number. The next
+pitch distribution of a pitcher in a situation is a single row of the
+array. The counts of a whole league are built with one bincount and
+can be updated with new pitches (or rebuilt per pitcher) later on.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cube import PITCH_TYPES, STANDS
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The situations the transitions can be split by and the number of
+#  values of each (balls 0-3 x strikes 0-2, left/right).
+CONDITIONS = [('count', 12), ('stand', 2)]
+
+# The sequences the transitions are counted in.
+SCOPES = {
+    'ab': ['pitcher_id', 'gid', 'ab_id'],
+    'game': ['pitcher_id', 'gid'],
+}
+
+
+class Transitions(object):
+    """The pitch transition counts of a number of pitchers."""
+
+    def __init__(self, pitchers, counts, order=2, scope='ab', conditions=(),
+                 types=PITCH_TYPES):
+        self.pitchers = pitchers
+        self.counts = counts
+        self.order = order
+        self.scope = scope
+        self.conditions = list(conditions)
+        self.types = list(types)
+
+        self._rows = dict(
+            (int(pid), row) for row, pid in enumerate(self.pitchers))
+
+        # The counts with room for more pitchers (see _grow()).
+        self._buffer = None
+
+    def __len__(self):
+        return len(self.pitchers)
+
+    def lookup(self, pid, previous=(), **situation):
+        """
+        The counts of the next pitch types of a pitcher after the
+        previous pitch types (most recent last; fewer than order - 1 at
+        the start of an at-bat/game) in a situation, e.g.
+        lookup(433587, ['FF', 'SL'], balls=1, strikes=2, stand='L').
+        Situations that are not given are rolled up.
+        """
+
+        row = self._rows[int(pid)]
+        context = _context(self._symbols(previous), self.order,
+                           len(self.types))
+
+        if not self.conditions:
+            return self.counts[row, 0, context]
+
+        # Split the situations back into one axis per condition.
+        sizes = [dict(CONDITIONS)[name] for name in self.conditions]
+        counts = self.counts[row, :, context].reshape(
+            sizes + [len(self.types)])
+
+        index = []
+        for name in self.conditions:
+            code = _situation(name, situation)
+            index.append(slice(None) if code is None else code)
+        counts = counts[tuple(index)]
+
+        return counts.reshape(-1, len(self.types)).sum(axis=0)
+
+    def distribution(self, pid, previous=(), **situation):
+        """
+        The probability of every pitch type being next (see lookup()).
+
+        Returns a Series indexed by the pitch types (all zero when the
+        context was never seen).
+        """
+
+        counts = self.lookup(pid, previous, **situation)
+        total = counts.sum()
+
+        return pd.Series(counts / float(max(total, 1)), index=self.types)
+
+    def table(self, pid, **situation):
+        """
+        The next pitch distributions of a pitcher after every context
+        seen (see lookup()).
+
+        Returns a DataFrame indexed by the previous pitch types (comma
+        separated, '^' for the start of an at-bat/game) with one column
+        per pitch type thrown.
+        """
+
+        rows = []
+        labels = []
+        for context in range((len(self.types) + 1) ** (self.order - 1)):
+            previous = _previous(context, self.order, len(self.types))
+            counts = self.lookup(pid, [
+                self.types[s] if s < len(self.types) else None
+                for s in previous], **situation)
+            if counts.sum():
+                rows.append(counts / float(counts.sum()))
+                labels.append(','.join(
+                    self.types[s] if s < len(self.types) else '^'
+                    for s in previous))
+
+        table = pd.DataFrame(rows, index=labels, columns=self.types)
+
+        return table.loc[:, table.sum(axis=0) > 0]
+
+    def add(self, pid, previous, pitch, **situation):
+        """
+        Counts a single pitch (in constant time for known pitchers), e.g.
+        as it is thrown in a live game. All the conditions of the
+        transitions have to be given. The counts are changed in place,
+        so transitions from load() have to be loaded writable (e.g.
+        mmap_mode='c' to leave the saved counts alone).
+        """
+
+        if not self.counts.flags.writeable:
+            raise ValueError(
+                "The transitions are read-only, load them with "
+                "mmap_mode='c' (or None) to add pitches")
+
+        pid = int(pid)
+        if pid not in self._rows:
+            self._grow([pid])
+
+        condition = 0
+        for name in self.conditions:
+            code = _situation(name, situation)
+            if code is None:
+                raise ValueError("Missing situation: " + name)
+            condition = condition * dict(CONDITIONS)[name] + code
+
+        context = _context(self._symbols(previous), self.order,
+                           len(self.types))
+        self.counts[self._rows[pid], condition, context,
+                    self._symbols([pitch])[0]] += 1
+
+    def update(self, df):
+        """
+        Adds the transitions of new pitches (e.g. the games played since
+        the last build). Every at-bat (or game) has to be new as a
+        whole.
+
+        Returns the updated transitions.
+        """
+
+        return self._merge(self._build(df), replace=False)
+
+    def refresh(self, df):
+        """
+        Rebuilds the transitions of every pitcher in a DataFrame of
+        pitches (all of their pitches), keeping the other pitchers.
+        Refreshing with the same pitches twice gives the same counts.
+
+        Returns the refreshed transitions.
+        """
+
+        return self._merge(self._build(df), replace=True)
+
+    def save(self, path):
+        """Saves the transitions to a directory (see load())."""
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        # Write every file aside and move it in place, the
+        #  description last.
+        for name, array in [('pitchers', self.pitchers),
+                            ('counts', self.counts)]:
+            filename = os.path.join(path, name + '.npy')
+            with open(filename + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.rename(filename + '.tmp', filename)
+
+        filename = os.path.join(path, 'sequence.json')
+        with open(filename + '.tmp', 'w') as f:
+            json.dump({'order': self.order, 'scope': self.scope,
+                       'conditions': self.conditions,
+                       'types': self.types}, f)
+        os.rename(filename + '.tmp', filename)
+
+    def _build(self, df):
+        """Counts the transitions of pitches with the same settings."""
+
+        return build(df, self.order, self.scope, self.conditions,
+                     self.types)
+
+    def _symbols(self, pitches):
+        """Encodes pitch types (None for the start of an at-bat/game)."""
+
+        unknown = len(self.types) - 1
+        symbols = []
+        for pitch in pitches:
+            if pitch is None:
+                symbols.append(len(self.types))
+            elif pitch in self.types:
+                symbols.append(self.types.index(pitch))
+            else:
+                symbols.append(unknown)
+
+        return symbols
+
+    def _grow(self, pids):
+        """
+        Adds empty counts for new pitchers (after the others, i.e. out
+        of order until the next merge). The counts are kept in a buffer
+        that doubles when it is full, so adding pitchers one at a time
+        doesn't copy all the counts every time.
+        """
+
+        size = len(self.pitchers) + len(pids)
+        if self._buffer is None or len(self._buffer) < size:
+            self._buffer = np.zeros(
+                (max(size, 2 * len(self.pitchers)),) + self.counts.shape[1:],
+                dtype=self.counts.dtype)
+            self._buffer[:len(self.pitchers)] = self.counts
+
+        self.counts = self._buffer[:size]
+        self.pitchers = np.concatenate(
+            [self.pitchers, np.array(pids, dtype=np.int64)])
+        for pid in pids:
+            self._rows[int(pid)] = len(self._rows)
+
+    def _merge(self, other, replace):
+        """Adds (or replaces) the counts of other's pitchers."""
+
+        pitchers = np.union1d(self.pitchers, other.pitchers)
+        counts = np.zeros((len(pitchers),) + self.counts.shape[1:],
+                          dtype=np.uint32)
+
+        rows = np.searchsorted(pitchers, self.pitchers)
+        counts[rows] = self.counts
+
+        rows = np.searchsorted(pitchers, other.pitchers)
+        if replace:
+            counts[rows] = other.counts
+        else:
+            counts[rows] += other.counts
+
+        return Transitions(pitchers, counts, self.order, self.scope,
+                           self.conditions, self.types)
+
+
+def build(df, order=2, scope='ab', conditions=(), types=PITCH_TYPES):
+    """
+    Counts the transitions of a DataFrame of pitches (any number of
+    pitchers) in one pass. The pitches are expected in the order they
+    were thrown within each game.
+    """
+
+    if scope not in SCOPES:
+        raise ValueError("Unknown scope: " + str(scope))
+    for name in conditions:
+        if name not in dict(CONDITIONS):
+            raise ValueError("Unknown condition: " + str(name))
+
+    num_types = len(types)
+    symbols = _encode(df, types)
+
+    # The previous pitches of every pitch within its at-bat (or game).
+    group = df.groupby(SCOPES[scope], sort=False).ngroup().values
+    position = df.groupby(SCOPES[scope], sort=False).cumcount().values
+    ordered = np.argsort(group, kind='mergesort')
+
+    context = np.zeros(len(df), dtype=np.int64)
+    for k in range(1, order):
+        previous = np.full(len(df), num_types, dtype=np.int64)
+        previous[k:] = symbols[ordered][:-k]
+        previous[position[ordered] < k] = num_types
+        context[ordered] += previous * (num_types + 1) ** (k - 1)
+
+    condition = np.zeros(len(df), dtype=np.int64)
+    for name in conditions:
+        condition = condition * dict(CONDITIONS)[name] + _conditions(df, name)
+
+    pitchers, row = np.unique(df['pitcher_id'].values, return_inverse=True)
+
+    shape = (len(pitchers), _size(conditions),
+             (num_types + 1) ** (order - 1), num_types)
+    flat = ((row * shape[1] + condition) * shape[2] + context) * shape[3] + \
+        symbols
+    counts = np.bincount(flat, minlength=int(np.prod(shape)))
+
+    return Transitions(pitchers.astype(np.int64),
+                       counts.astype(np.uint32).reshape(shape),
+                       order, scope, conditions, types)
+
+
+def load(path, mmap_mode='r'):
+    """
+    Memory-maps transitions saved with Transitions.save(). The counts
+    are read-only by default; load them with mmap_mode='c' (copy on
+    write) or None (into memory) to add() pitches to them.
+    """
+
+    with open(os.path.join(path, 'sequence.json'), 'r') as f:
+        description = json.load(f)
+
+    arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+              for name in ['pitchers', 'counts']]
+
+    return Transitions(*arrays, **description)
+
+
+def _encode(df, types):
+    """The pitch type codes of the pitches (unknown types last)."""
+
+    codes = pd.Index(types).get_indexer(
+        df['mlbam_pitch_name'].astype(object))
+
+    return np.where(codes < 0, len(types) - 1, codes).astype(np.int64)
+
+
+def _conditions(df, name):
+    """The situation code of every pitch for a condition."""
+
+    if name == 'count':
+        balls = df['balls'].values.astype(np.int64)
+        strikes = df['strikes'].values.astype(np.int64)
+        if len(df) and (balls.min() < 0 or balls.max() > 3 or
+                        strikes.min() < 0 or strikes.max() > 2):
+            raise ValueError("Count out of range for the transitions")
+        return balls * 3 + strikes
+
+    codes = pd.Index(STANDS).get_indexer(df['stand'].astype(object))
+    if (codes < 0).any():
+        raise ValueError("Unknown stand for the transitions")
+
+    return codes.astype(np.int64)
+
+
+def _situation(name, situation):
+    """The code of a condition in a situation (None if not given)."""
+
+    if name == 'count':
+        if 'balls' not in situation or 'strikes' not in situation:
+            return None
+        return int(situation['balls']) * 3 + int(situation['strikes'])
+
+    if situation.get('stand') is None:
+        return None
+
+    return STANDS.index(situation['stand'])
+
+
+def _context(symbols, order, num_types):
+    """The context code of the previous pitch symbols."""
+
+    # Pad the start of the at-bat (or game).
+    symbols = list(symbols)[-(order - 1):] if order > 1 else []
+    symbols = [num_types] * (order - 1 - len(symbols)) + symbols
+
+    context = 0
+    for k, symbol in enumerate(reversed(symbols)):
+        context += symbol * (num_types + 1) ** k
+
+    return context
+
+
+def _previous(context, order, num_types):
+    """The previous pitch symbols of a context code (oldest first)."""
+
+    symbols = []
+    for _ in range(order - 1):
+        context, symbol = divmod(context, num_types + 1)
+        symbols.append(symbol)
+
+    return symbols[::-1]
+
+
+def _size(conditions):
+    """The number of situations of the conditions."""
+
+    size = 1
+    for name in conditions:
+        size *= dict(CONDITIONS)[name]
+
+    return size
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:n:s:c:a')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    df = store.read(opts['i'])
+
+    out = opts.get('o')
+    if 'a' in opts and out and \
+            os.path.exists(os.path.join(out, 'sequence.json')):
+        transitions = load(out, mmap_mode=None)
+
+        # The refreshed pitchers have to be counted like the others.
+        conditions = opts['c'].split(',') if 'c' in opts \
+            else transitions.conditions
+        if int(opts.get('n', transitions.order)) != transitions.order \
+                or opts.get('s', transitions.scope) != transitions.scope \
+                or list(conditions) != transitions.conditions:
+            print("The transitions were built with -n " +
+                  str(transitions.order) + " -s " + transitions.scope +
+                  " -c " + ','.join(transitions.conditions) +
+                  ", rebuild them without -a to change them.")
+            sys.exit(2)
+
+        transitions = transitions.refresh(df)
+    else:
+        transitions = build(
+            df,
+            order=int(opts.get('n', 2)),
+            scope=opts.get('s', 'ab'),
+            conditions=opts['c'].split(',') if 'c' in opts else ())
+
+    if out:
+        transitions.save(out)
+
+    # Print the next pitch distributions of the (first) pitcher.
+    pd.set_option('display.width', 200)
+    print((100 * transitions.table(transitions.pitchers[0])).round(1))
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) file or store directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-o: the output directory of the transitions.\n" +
+    "\t-n: the order, i.e. previous pitches + 1 (defaults to 2).\n" +
+    "\t-s: the sequences, ab or game (defaults to ab).\n" +
+    "\t-c: the conditions, count and/or stand (comma separated).\n" +
+    "\t-a: rebuild the pitchers of the input in the existing output\n" +
+    "\t    (with the -n, -s and -c it was built with).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython sequence.py -i \"../samples/433587-hernandez.csv\" " +
+    "-o \"./sequence\" -n 3 -c \"count,stand\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+A local next pitch prediction service on top of the models of fleet.py.
+
+Requests ("what is the probability of a fastball from pitcher P in this
+situation") are queued and answered by a single batching thread. It
+takes every request that arrives within a couple of milliseconds (up to
+a maximum batch), groups them by pitcher and answers each group with
+one vectorized predict call. The models are loaded from the fleet
+directory on first use and kept in an LRU cache.
+
+The service can be run as a small JSON http server:
+
+  POST /predict  {"pitcher_id": 433587, "ab_count": 1, "speed_last": 0,
+                  "fastball_last": -1, "stand": "R", "strikes": 0,
+                  "balls": 0, "inning": 1, "outs": 0, "prior": 0.55}
+  GET  /latency  the p50/p99 latency (ms) of the recent requests
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+from collections import OrderedDict, deque
+import getopt
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+import numpy as np
+
+import joblib
+
+from fleet import REGISTRY
+from model import FEATURES
+
+
+class UnknownPitcher(KeyError):
+    """A pitcher without a model in the fleet."""
+
+
+class ModelError(EnvironmentError):
+    """A model file that can't be loaded (missing or corrupt)."""
+
+
+class ModelCache(object):
+    """The models of a fleet directory, the most recently used in memory."""
+
+    def __init__(self, model_dir, size=32, retry=10.0):
+        self.model_dir = model_dir
+        self.size = size
+        self.retry = retry
+
+        self._models = OrderedDict()
+        self._registry = {}
+        self._registry_stat = None
+
+        # The pitchers without a model -> when they were looked up.
+        self._missing = {}
+
+    def get(self, pid):
+        """The model of a pitcher."""
+
+        pid = str(pid)
+
+        if pid in self._models:
+            model = self._models.pop(pid)
+        else:
+            model = self._load(pid)
+            if len(self._models) >= self.size:
+                self._models.popitem(last=False)
+
+        self._models[pid] = model
+
+        return model
+
+    def _load(self, pid):
+        """Loads the model of a pitcher from disk."""
+
+        # Look for a missing pitcher in the registry again (the fleet
+        #  may have trained it since), but at most every retry seconds.
+        if pid not in self._registry:
+            if time.time() - self._missing.get(pid, -np.inf) < self.retry:
+                raise UnknownPitcher("No model for pitcher " + pid)
+            self._read_registry()
+
+        entry = self._registry.get(pid)
+        if entry is None or 'model' not in entry:
+            self._missing[pid] = time.time()
+            raise UnknownPitcher("No model for pitcher " + pid)
+        self._missing.pop(pid, None)
+
+        try:
+            return joblib.load(
+                os.path.join(self.model_dir, entry['model']))['model']
+        except Exception as e:
+            raise ModelError("Failed to load the model of pitcher " + pid +
+                             ": " + (str(e) or e.__class__.__name__))
+
+    def _read_registry(self):
+        """Reads the registry of the fleet if it changed."""
+
+        filename = os.path.join(self.model_dir, REGISTRY)
+        stat = os.stat(filename)
+        stat = (stat.st_size, stat.st_mtime)
+        if stat == self._registry_stat:
+            return
+
+        with open(filename, 'r') as f:
+            self._registry = json.load(f)
+        self._registry_stat = stat
+
+
+class Request(object):
+    """A pending prediction."""
+
+    def __init__(self, pid, situation):
+        self.pid = str(pid)
+        self.features = situation_features(situation)
+
+        self.start = time.time()
+        self.result = None
+        self.error = None
+
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Waits for the probability of a fastball."""
+
+        if not self._done.wait(timeout):
+            raise RuntimeError("Prediction timed out")
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+
+class Predictor(object):
+    """Answers prediction requests in micro-batches."""
+
+    def __init__(self, model_dir, cache_size=32, max_batch=256,
+                 max_wait=0.002, history=10000):
+        self.models = ModelCache(model_dir, cache_size)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        # The latencies (in seconds) of the most recent requests.
+        self.latencies = deque(maxlen=history)
+
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, pid, situation):
+        """Queues a request; see Request.wait() for the answer."""
+
+        request = Request(pid, situation)
+        self._queue.put(request)
+
+        return request
+
+    def predict(self, pid, situation, timeout=None):
+        """The probability of a fastball from a pitcher in a situation."""
+
+        return self.submit(pid, situation).wait(timeout)
+
+    def latency(self):
+        """The p50 and p99 latency of the recent requests in ms."""
+
+        if not self.latencies:
+            return {'requests': 0, 'p50': None, 'p99': None}
+
+        p50, p99 = np.percentile(
+            1000.0 * np.array(self.latencies), [50, 99])
+
+        return {'requests': len(self.latencies), 'p50': p50, 'p99': p99}
+
+    def close(self):
+        """Stops the batching thread."""
+
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        """Collects and answers batches until closed."""
+
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            # Take whatever else arrives in the next few milliseconds.
+            batch = [request]
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._queue.get(
+                        timeout=max(deadline - time.time(), 0))
+                except Empty:
+                    break
+                if request is None:
+                    self._answer(batch)
+                    return
+                batch.append(request)
+
+            self._answer(batch)
+
+    def _answer(self, batch):
+        """Answers a batch with one predict call per pitcher."""
+
+        by_pitcher = {}
+        for request in batch:
+            by_pitcher.setdefault(request.pid, []).append(request)
+
+        for pid, requests in by_pitcher.items():
+            try:
+                probabilities = fastball_probability(
+                    self.models.get(pid),
+                    np.array([r.features for r in requests]))
+            except Exception as e:
+                for request in requests:
+                    request.error = e
+            else:
+                for request, p in zip(requests, probabilities):
+                    request.result = float(p)
+
+            now = time.time()
+            for request in requests:
+                self.latencies.append(now - request.start)
+                request._done.set()
+
+
+def situation_features(situation):
+    """The feature vector (model.FEATURES) of a situation dictionary."""
+
+    values = []
+    for column in FEATURES:
+        value = situation[column]
+        if column == 'stand' and not isinstance(value, (int, float)):
+            value = int(value == 'R')
+        values.append(float(value))
+
+    return values
+
+
+def fastball_probability(model, X):
+    """
+    The probability of a fastball for every row of X. Models fit
+    without probabilities (see fleet.py -p) answer 0 or 1, and models of
+    a pitcher that never threw a fastball in training always answer 0.
+    """
+
+    if hasattr(model, 'predict_proba'):
+        classes = list(model.classes_)
+        if 1 not in classes:
+            return np.zeros(len(X))
+        return model.predict_proba(X)[:, classes.index(1)]
+
+    return model.predict(X).astype(float)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """An http server that handles every request in its own thread."""
+
+    daemon_threads = True
+
+
+def handler(predictor):
+    """The http request handler class for a predictor."""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == '/latency':
+                self._reply(200, predictor.latency())
+            else:
+                self._reply(404, {'error': "Not found"})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._reply(404, {'error': "Not found"})
+                return
+
+            try:
+                length = int(self.headers['Content-Length'])
+                situation = json.loads(self.rfile.read(length).decode('utf-8'))
+                p = predictor.predict(situation['pitcher_id'], situation, 5)
+            except UnknownPitcher as e:
+                self._reply(404, {'error': e.args[0]})
+            except (KeyError, ValueError, TypeError) as e:
+                self._reply(400, {'error': str(e)})
+            except RuntimeError as e:
+                self._reply(503, {'error': str(e)})
+            except Exception as e:
+                # e.g. a model (or the registry) that can't be read.
+                self._reply(500, {'error': str(e) or e.__class__.__name__})
+            else:
+                self._reply(200, {'fastball': p})
+
+        def _reply(self, code, body):
+            body = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'm:p:c:b:w:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['m']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    predictor = Predictor(
+        opts['m'],
+        cache_size=int(opts.get('c', 32)),
+        max_batch=int(opts.get('b', 256)),
+        max_wait=float(opts.get('w', 2)) / 1000.0)
+
+    server = ThreadingHTTPServer(
+        ('127.0.0.1', int(opts.get('p', 8000))), handler(predictor))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        predictor.close()
+        print(predictor.latency())
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-m: the model directory of fleet.py.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-p: the port to listen on (defaults to 8000).\n" +
+    "\t-c: the number of models kept in memory (defaults to 32).\n" +
+    "\t-b: the maximum number of requests per batch (defaults to 256).\n" +
+    "\t-w: the time to wait for a batch to fill in ms (defaults to 2).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython serve.py -m \"./fleet\" -p 8000\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Finds the batters a pitcher pitches to alike, e.g. "which batters does
+Hernandez attack like Kinsler", over the matchup tendencies of
+matchup.py (pitch mix, speed, pitches per at-bat, fastball rates).
+
+Every pitcher x batter matchup is a vector of the matchup COLUMNS,
+normalized like the notebook's heatmap against the pitcher's matchups
+with all batters: (value - mean) / (max - min). The vectors of all
+pitchers are kept in one array, sorted by pitcher, so the batters of a
+pitcher are a contiguous slice and their distances to a batter are
+computed in one vectorized step (a pitcher faces at most a few thousand
+batters). The vectors of a pitcher only depend on the pitcher's own
+pitches, so a data refresh only rebuilds the pitchers that played.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import matchup
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The distances the index can search by.
+METRICS = ['euclidean', 'cosine']
+
+
+class Index(object):
+    """The normalized matchup vectors of a number of pitchers."""
+
+    def __init__(self, pitchers, batters, values, vectors, num_pitches,
+                 metric='euclidean', min_pitches=0):
+        self.pitchers = pitchers
+        self.batters = batters
+        self.values = values
+        self.vectors = vectors
+        self.num_pitches = num_pitches
+        self.metric = metric
+        self.min_pitches = min_pitches
+
+        if metric not in METRICS:
+            raise ValueError("Unknown metric: " + str(metric))
+
+    def __len__(self):
+        return len(self.pitchers)
+
+    def matchups(self, pid):
+        """The positions (a slice) of the matchups of a pitcher."""
+
+        return slice(
+            int(np.searchsorted(self.pitchers, pid, 'left')),
+            int(np.searchsorted(self.pitchers, pid, 'right')))
+
+    def vector(self, pid, batter_id):
+        """The normalized vector of a matchup."""
+
+        rows = self.matchups(pid)
+        position = rows.start + int(np.searchsorted(
+            self.batters[rows], batter_id))
+        if position >= rows.stop or self.batters[position] != batter_id:
+            raise KeyError("No matchup of pitcher " + str(pid) +
+                           " with batter " + str(batter_id))
+
+        return self.vectors[position]
+
+    def query(self, pid, vector, k=10):
+        """
+        Finds the k batters of a pitcher with the nearest vectors.
+
+        Returns a DataFrame of the batters (batter_id, distance and
+        num_pitches), nearest first, with the (unnormalized) matchup
+        COLUMNS.
+        """
+
+        rows = self.matchups(pid)
+        distances = _distances(
+            np.asarray(self.vectors[rows], dtype=np.float64),
+            np.asarray(vector, dtype=np.float64), self.metric)
+
+        k = min(k, len(distances))
+        nearest = np.argpartition(distances, k - 1)[:k] if k else []
+        nearest = nearest[np.argsort(distances[nearest], kind='mergesort')]
+
+        found = pd.DataFrame(
+            np.asarray(self.values[rows][nearest], dtype=np.float64),
+            columns=matchup.COLUMNS)
+        found.insert(0, 'batter_id', self.batters[rows][nearest])
+        found.insert(1, 'distance', distances[nearest])
+        found.insert(2, 'num_pitches', self.num_pitches[rows][nearest])
+
+        return found
+
+    def neighbours(self, pid, batter_id, k=10):
+        """
+        Finds the k batters a pitcher pitches to most like a batter
+        (see query()), the batter himself left out.
+        """
+
+        found = self.query(pid, self.vector(pid, batter_id), k + 1)
+
+        return found[found['batter_id'] != batter_id].head(k) \
+            .reset_index(drop=True)
+
+    def refresh(self, df):
+        """
+        Rebuilds the matchups of every pitcher in a DataFrame of pitches
+        (all of their pitches), keeping the other pitchers. The matchups
+        are left out and searched the same way as the rest of the index
+        (min_pitches and metric).
+
+        Returns the refreshed index.
+        """
+
+        new = build(df, self.min_pitches, self.metric)
+
+        keep = ~np.isin(self.pitchers, new.pitchers)
+        order = np.lexsort((
+            np.concatenate([self.batters[keep], new.batters]),
+            np.concatenate([self.pitchers[keep], new.pitchers])))
+
+        def merged(name):
+            return np.concatenate(
+                [getattr(self, name)[keep], getattr(new, name)])[order]
+
+        return Index(merged('pitchers'), merged('batters'),
+                     merged('values'), merged('vectors'),
+                     merged('num_pitches'), self.metric, self.min_pitches)
+
+    def save(self, path):
+        """Saves the index to a directory (see load())."""
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        # Write every file aside and move it in place, the
+        #  description last.
+        for name in ['pitchers', 'batters', 'values', 'vectors',
+                     'num_pitches']:
+            filename = os.path.join(path, name + '.npy')
+            with open(filename + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(getattr(self, name)))
+            os.rename(filename + '.tmp', filename)
+
+        filename = os.path.join(path, 'similar.json')
+        with open(filename + '.tmp', 'w') as f:
+            json.dump({'metric': self.metric,
+                       'min_pitches': self.min_pitches,
+                       'columns': matchup.COLUMNS}, f)
+        os.rename(filename + '.tmp', filename)
+
+
+def build(df, min_pitches=0, metric='euclidean'):
+    """
+    Builds the index of every pitcher x batter matchup in a DataFrame of
+    pitches. Matchups with min_pitches or fewer pitches are left out
+    (also of the normalization).
+    """
+
+    matchups = matchup.summary(df, min_pitches=min_pitches).sort_index()
+    values = matchups[matchup.COLUMNS]
+
+    return Index(
+        matchups.index.get_level_values('pitcher_id').values.astype(
+            np.int64),
+        matchups.index.get_level_values('batter_id').values.astype(
+            np.int64),
+        values.values.astype(np.float32),
+        normalize(values).values.astype(np.float32),
+        matchups['num_pitches'].values.astype(np.int64),
+        metric, min_pitches)
+
+
+def normalize(values):
+    """
+    Normalizes the matchup COLUMNS of every pitcher like the heatmap,
+    (value - mean) / (max - min) over the pitcher's matchups. Missing
+    statistics (e.g. no first pitches seen) become the mean, 0.
+    """
+
+    by_pitcher = values.groupby(level='pitcher_id')
+    spread = by_pitcher.transform('max') - by_pitcher.transform('min')
+
+    return ((values - by_pitcher.transform('mean')) /
+            spread.where(spread > 0, 1)).fillna(0)
+
+
+def load(path, mmap_mode='r'):
+    """Memory-maps an index saved with Index.save()."""
+
+    with open(os.path.join(path, 'similar.json'), 'r') as f:
+        description = json.load(f)
+
+    if description['columns'] != matchup.COLUMNS:
+        raise ValueError("Unsupported index columns in " + path)
+
+    arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+              for name in ['pitchers', 'batters', 'values', 'vectors',
+                           'num_pitches']]
+
+    return Index(*arrays, metric=description['metric'],
+                 min_pitches=description['min_pitches'])
+
+
+def _distances(vectors, vector, metric):
+    """The distances of the vectors to a vector."""
+
+    if metric == 'cosine':
+        norms = np.sqrt((vectors ** 2).sum(axis=1)) * \
+            np.sqrt((vector ** 2).sum())
+        similarity = vectors.dot(vector) / np.where(norms > 0, norms, 1)
+        return 1 - np.where(norms > 0, similarity, 0)
+
+    return np.sqrt(((vectors - vector) ** 2).sum(axis=1))
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:p:b:k:m:d:a')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    if not 'i' in opts and not 'o' in opts:
+        usage()
+        sys.exit(2)
+
+    out = opts.get('o')
+    exists = out and os.path.exists(os.path.join(out, 'similar.json'))
+
+    if 'i' in opts:
+        df = pd.concat(
+            [store.read(path) for path in opts['i'].split(',')],
+            ignore_index=True)
+        if 'a' in opts and exists:
+            index = load(out, mmap_mode=None)
+
+            # The refreshed pitchers have to be built like the others.
+            if int(opts.get('m', index.min_pitches)) != index.min_pitches \
+                    or opts.get('d', index.metric) != index.metric:
+                print("The index was built with -m " +
+                      str(index.min_pitches) + " -d " + index.metric +
+                      ", rebuild it without -a to change them.")
+                sys.exit(2)
+
+            index = index.refresh(df)
+        else:
+            index = build(df, int(opts.get('m', 0)),
+                          opts.get('d', 'euclidean'))
+        if out:
+            index.save(out)
+    elif exists:
+        index = load(out)
+    else:
+        usage()
+        sys.exit(2)
+
+    if 'p' in opts and 'b' in opts:
+        print(index.neighbours(
+            int(opts['p']), int(opts['b']), int(opts.get('k', 10)))
+            .round(2).to_string(index=False))
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required (either or both):\n" +
+    "\t-i: the input pitcher (csv) files or store directories (comma separated).\n" +
+    "\t-o: the index directory (built from -i, or searched without it).\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-p: the pitcher id and\n" +
+    "\t-b: the batter id to find the most alike batters of.\n" +
+    "\t-k: the number of batters to find (defaults to 10).\n" +
+    "\t-m: leave out matchups with this many pitches or fewer (defaults to 0).\n" +
+    "\t-d: the distance, euclidean or cosine (defaults to euclidean).\n" +
+    "\t-a: rebuild the pitchers of the input in the existing index\n" +
+    "\t    (with the -m and -d the index was built with).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython similar.py -i \"../samples/433587-hernandez.csv\" " +
+    "-o \"./similar\" -m 20\n" +
+    "\tpython similar.py -o \"./similar\" -p 433587 -b 435079 -k 5\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Keeps the tendency of a column (see tendency.py) up to date while games
+are being played, one pitch (or a small batch of pitches) at a time.
+
+Every game in progress keeps the counts of its current window. When a
+game moves past the end of a window, the window's counts are added to
+the career totals, exactly like tendency.window_totals() counts a
+window once the game continued past it. Adding a pitch is O(1) and a
+snapshot of the averages never looks at past pitches again.
+
+A pitcher file can be replayed as if it were a live feed, e.g.
+
+  python stream.py -i "../samples/433587-hernandez.csv" -c "mlbam_pitch_name" -n 10
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+from collections import Counter
+import getopt
+import os
+import sys
+
+import numpy as np
+
+import tendency
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+class TendencyAccumulator(object):
+    """The window counts of a column, updated pitch by pitch."""
+
+    def __init__(self, column_name, pitches_per_window):
+        self.column_name = column_name
+        self.pitches_per_window = pitches_per_window
+
+        # The occurrences of each value per completed window and the
+        #  number of games that completed each window.
+        self.totals = []
+        self.games = []
+
+        # The occurrences of each value over all pitches (to order
+        #  the values like tendency.py does).
+        self.seen = Counter()
+
+        # The games in progress: gid -> [pitches so far, window counts].
+        self.current = {}
+
+    @classmethod
+    def from_frame(cls, df, column_name, pitches_per_window):
+        """
+        Starts from the finished games of a pitcher DataFrame, e.g. the
+        career up to today, so only new games have to be streamed.
+        """
+
+        acc = cls(column_name, pitches_per_window)
+
+        totals, games, column_types = tendency.window_totals(
+            df, column_name, pitches_per_window)
+
+        acc.totals = [
+            Counter(dict((t, c) for t, c in zip(column_types, row) if c))
+            for row in totals.tolist()]
+        acc.games = games.tolist()
+        acc.seen.update(df[column_name].dropna().tolist())
+
+        return acc
+
+    def add(self, gid, value):
+        """Adds the next pitch of a game."""
+
+        state = self.current.get(gid)
+        if state is None:
+            state = self.current[gid] = [0, Counter()]
+
+        position, counts = state
+
+        # The game moved past the end of its current window.
+        if position and position % self.pitches_per_window == 0:
+            window = position // self.pitches_per_window - 1
+            if window == len(self.totals):
+                self.totals.append(Counter())
+                self.games.append(0)
+            self.totals[window].update(counts)
+            self.games[window] += 1
+            counts = state[1] = Counter()
+
+        state[0] = position + 1
+
+        # Missing values take up a pitch but aren't counted.
+        if value == value and value is not None:
+            counts[value] += 1
+            self.seen[value] += 1
+
+    def extend(self, pitches):
+        """Adds a batch of pitches (a DataFrame in the order thrown)."""
+
+        for gid, value in zip(pitches['gid'].values,
+                              pitches[self.column_name].values):
+            self.add(gid, value)
+
+    def end_game(self, gid):
+        """
+        Forgets a finished game. The window it was in when it ended is
+        never counted (the game didn't continue past it).
+        """
+
+        self.current.pop(gid, None)
+
+    def window_totals(self):
+        """The current totals in the form of tendency.window_totals()."""
+
+        column_types = [t for t, _ in self.seen.most_common()]
+        codes = dict((t, i) for i, t in enumerate(column_types))
+
+        totals = np.zeros((len(self.totals), len(column_types)), dtype=int)
+        for window, counts in enumerate(self.totals):
+            for column_type, count in counts.items():
+                totals[window, codes[column_type]] = count
+
+        return totals, np.array(self.games, dtype=int), column_types
+
+    def snapshot(self):
+        """
+        The current average occurrences of each value per window, in the
+        form of tendency.window_averages().
+        """
+
+        return tendency.averages(*self.window_totals())
+
+
+def replay(filename, column_name, batch_size=1):
+    """
+    Replays a pitcher file as a feed of batches of pitches (DataFrames
+    with the gid and the column), in the order they were thrown.
+    """
+
+    df = store.read(filename, columns=['gid', column_name])
+
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:c:n:b:e:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i', 'c', 'n']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    batch_size = int(opts['b']) if 'b' in opts else 1
+    every = int(opts['e']) if 'e' in opts else 0
+
+    acc = TendencyAccumulator(opts['c'], int(opts['n']))
+
+    pitches = 0
+    for batch in replay(opts['i'], opts['c'], batch_size):
+        acc.extend(batch)
+
+        pitches += len(batch)
+        if every and pitches % every < len(batch):
+            print("After " + str(pitches) + " pitches:")
+            print(acc.snapshot())
+
+    print(acc.snapshot())
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) file or store directory to replay.\n" +
+    "\t-c: the column name.\n" +
+    "\t-n: the number of pitches per pitch window (e.g. 10 for 0-10, 10-20, ...).\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-b: the number of pitches per batch (defaults to 1).\n" +
+    "\t-e: print a snapshot every so many pitches.\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython stream.py -i \"../samples/433587-hernandez.csv\" " +
+    "-c \"mlbam_pitch_name\" -n 10 -e 1000\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
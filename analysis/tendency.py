@@ -0,0 +1,139 @@
+"""
+Computes how often each value of a column occurs per window of pitches
+over the course of a game, averaged over a pitcher's career.
+
+All of the windows for all of the games are counted in one pass. Each
+pitch is given its position in the game (the same idea as pitch_in_game),
+which maps it to a window, and the (window, value) pairs are counted
+with a single bincount.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import numpy as np
+import pandas as pd
+
+
+def window_totals(df, column_name, pitches_per_window):
+    """
+    Counts the occurrences of each column value per window of pitches.
+
+    A window is only counted for a game if the game continued past the
+    end of the window, i.e. window k (pitches k*n to (k+1)*n) is counted
+    when the game had more than (k+1)*n pitches.
+
+    Returns a tuple (totals, games, column_types) where totals is a
+    (windows x types) array of occurrences summed over all games, games
+    is the number of games that reached each window and column_types are
+    the distinct column values ordered by their overall frequency.
+    """
+
+    codes, column_types = encode(df[column_name])
+    totals, games = count_windows(
+        game_positions(df), codes, len(column_types), pitches_per_window)
+
+    return totals, games, column_types
+
+
+def game_positions(df):
+    """
+    The position of every pitch inside its game, the size of its game
+    and the sizes of all the games. They only depend on the games, so
+    they can be shared by every column and window size.
+    """
+
+    by_game = df.groupby('gid', sort=False)
+
+    return (by_game.cumcount().values,
+            by_game['gid'].transform('size').values,
+            by_game.size().values)
+
+
+def encode(values):
+    """
+    Encodes the values of a column, most frequent first (missing values
+    are left out just like value_counts does, with code -1).
+
+    Returns a tuple (codes, column_types).
+    """
+
+    type_counts = values.value_counts()
+    column_types = type_counts[type_counts > 0].index.tolist()
+    codes = pd.Categorical(
+        values, categories=column_types).codes.astype(np.int64)
+
+    return codes, column_types
+
+
+def count_windows(positions, codes, num_types, pitches_per_window):
+    """
+    Counts every (window, type) pair of the encoded pitches (see
+    game_positions() and encode()) at once.
+
+    Returns a tuple (totals, games), see window_totals().
+    """
+
+    n = pitches_per_window
+    position, game_size, game_sizes = positions
+
+    # The number of complete windows for each game.
+    game_windows = (game_sizes - 1) // n
+    num_windows = int(game_windows.max()) if len(game_windows) else 0
+
+    # The number of games that reached each window.
+    games = np.bincount(game_windows, minlength=num_windows + 1)
+    games = games[::-1].cumsum()[::-1][1:]
+
+    window = position // n
+    mask = ((window + 1) * n < game_size) & (codes >= 0)
+    totals = np.bincount(
+        window[mask] * num_types + codes[mask],
+        minlength=num_windows * num_types
+    ).reshape(num_windows, num_types)
+
+    return totals, games
+
+
+def window_averages(df, column_name, pitches_per_window):
+    """
+    Determines the average occurrences of each column value per window
+    of pitches.
+
+    Returns a DataFrame indexed by window (0 for pitches 0-n, 1 for n-2n,
+    ...) with one column per distinct column value.
+    """
+
+    totals, games, column_types = window_totals(
+        df, column_name, pitches_per_window)
+
+    return averages(totals, games, column_types)
+
+
+def averages(totals, games, column_types):
+    """
+    Converts the window totals and game counts into a DataFrame of
+    average occurrences per window.
+    """
+
+    avgs = pd.DataFrame(
+        totals / np.maximum(games, 1)[:, np.newaxis].astype(float),
+        columns=column_types)
+    avgs.index.name = 'window'
+
+    return avgs
+
+
+def window_labels(num_windows, pitches_per_window):
+    """Labels for each window, e.g. 0-10, 10-20, ..."""
+
+    return [
+        str(i * pitches_per_window) + "-" + str((i + 1) * pitches_per_window)
+        for i in range(num_windows)
+    ]
@@ -0,0 +1,236 @@
+"""
+Validates the innings of the pitcher files and quarantines the ones that
+can't be right, in place of removing them by hand (see
+results/etc/outs_problem.png).
+
+Every (game, inning) is checked in one grouped pass:
+
+- outs: the innings' resulting_outs add up to at most 3
+- count: balls and strikes never go down within an at-bat
+- ab_count: no at-bat has more pitches (ab_count) than ab_total
+- order: pitch_in_game (and the pitch id) strictly increase within a game
+
+An inning that fails any check is dropped as a whole and listed in the
+quarantine report (one row per inning with the number of pitches that
+failed each check). The pitches are expected in the order they were
+thrown within each game, and are cleaned a chunk at a time, so a whole
+league never has to be in memory at once.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import features
+
+# The pitcher store lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'wrangle'))
+import store
+
+
+# The columns of the quarantine report.
+REPORT_COLUMNS = ['pitcher_id', 'gid', 'inning', 'pitches', 'outs',
+                  'count', 'ab_count', 'order']
+
+# The most outs an inning can have.
+MAX_OUTS = 3
+
+
+def check(df):
+    """
+    Checks every inning of the pitches.
+
+    Returns a tuple (inning, report): the inning number (0, 1, ...) of
+    every pitch and a DataFrame with one row per inning, its pitches,
+    its outs and the number of pitches failing each of the other
+    checks.
+    """
+
+    inning = df.groupby(['gid', 'inning'], sort=False).ngroup().values
+    n = inning.max() + 1 if len(inning) else 0
+
+    gid = df['gid'].values
+    same_game = gid[1:] == gid[:-1]
+
+    # The pitches of an at-bat are next to each other.
+    at_bat = df.groupby(['gid', 'ab_id'], sort=False).ngroup().values
+    same_ab = at_bat[1:] == at_bat[:-1]
+
+    # The outs are only derived if the file doesn't have them yet.
+    if 'resulting_outs' in df:
+        outs = df['resulting_outs'].values
+    else:
+        outs = df['des'].astype(object).map(features.DES_OUTS).fillna(0) \
+            .values * (df['ab_count'] == df['ab_total']).values
+
+    count = np.zeros(len(df), dtype=bool)
+    count[1:] = same_ab & (
+        (np.diff(df['balls'].values) < 0) |
+        (np.diff(df['strikes'].values) < 0))
+
+    ab_count = ((df['ab_count'] > df['ab_total']) |
+                (df['ab_count'] < 1)).values
+
+    order = np.zeros(len(df), dtype=bool)
+    for column in ['pitch_in_game', 'id']:
+        if column in df:
+            order[1:] |= same_game & (np.diff(df[column].values) <= 0)
+
+    # The first pitch of every inning (for its game and number).
+    first = np.zeros(n, dtype=np.int64)
+    first[inning[::-1]] = np.arange(len(df))[::-1]
+
+    report = pd.DataFrame({
+        'pitcher_id': df['pitcher_id'].values[first],
+        'gid': gid[first],
+        'inning': df['inning'].values[first],
+        'pitches': np.bincount(inning, minlength=n),
+        'outs': np.bincount(inning, weights=outs, minlength=n).astype(int),
+        'count': np.bincount(inning, weights=count, minlength=n).astype(int),
+        'ab_count': np.bincount(
+            inning, weights=ab_count, minlength=n).astype(int),
+        'order': np.bincount(inning, weights=order, minlength=n).astype(int),
+    }, columns=REPORT_COLUMNS)
+
+    return inning, report
+
+
+def clean(df):
+    """
+    Drops the innings that fail a check.
+
+    Returns a tuple (clean, quarantine): the pitches of the valid
+    innings and the report (see check()) of the dropped ones.
+    """
+
+    inning, report = check(df)
+
+    bad = ((report['outs'] > MAX_OUTS) | (report['count'] > 0) |
+           (report['ab_count'] > 0) | (report['order'] > 0)).values
+
+    return df[~bad[inning]], report[bad].reset_index(drop=True)
+
+
+def stream(frames):
+    """
+    Cleans the pitches a chunk at a time (e.g. from store.chunks()). The
+    last game of a chunk is held back until the next chunk, so games
+    that span two chunks are checked as a whole.
+
+    Yields the tuples (clean, quarantine) of every chunk.
+    """
+
+    for frame in store.games(frames):
+        yield clean(frame)
+
+
+def _started_over(frames, root):
+    """
+    Passes the pieces of pitches on, removing every pitcher from the
+    store before its first piece (the store only adds part files).
+    """
+
+    removed = set()
+    for frame in frames:
+        pitchers = set(frame['pitcher_id'].unique()) - removed
+        store.remove(root, pitchers)
+        removed |= pitchers
+
+        yield frame
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:q:b:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i', 'o']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    csv = opts['o'].endswith('.csv')
+    if csv and os.path.exists(opts['o']):
+        os.remove(opts['o'])
+
+    chunks = store.chunks(opts['i'], chunksize=int(opts.get('b', 100000)))
+    if not csv:
+        # The parts of the input are read as the output is written.
+        inside = os.path.relpath(
+            os.path.abspath(opts['i']), os.path.abspath(opts['o']))
+        if not inside.startswith(os.pardir):
+            print("The output store can't hold the input.")
+            sys.exit(2)
+        chunks = _started_over(chunks, opts['o'])
+
+    pitches = 0
+    reports = []
+    for df, quarantine in stream(chunks):
+        pitches += len(df)
+        reports.append(quarantine)
+
+        if csv:
+            df.to_csv(opts['o'], mode='a', index=False,
+                      header=not os.path.exists(opts['o']))
+        elif len(df):
+            store.write(df, opts['o'])
+
+    report = pd.concat(reports, ignore_index=True) if reports else \
+        pd.DataFrame(columns=REPORT_COLUMNS)
+
+    print("Kept " + str(pitches) + " pitches, quarantined " +
+          str(len(report)) + " innings (" +
+          str(int(report['pitches'].sum())) + " pitches).")
+
+    if 'q' in opts:
+        report.to_csv(opts['q'], index=False)
+    else:
+        print(report.to_string(index=False))
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the input pitcher (csv) file or store directory.\n" +
+    "\t-o: the output pitcher csv file or store directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-q: a csv file for the quarantine report (printed otherwise).\n" +
+    "\t-b: the number of csv rows read at a time (defaults to 100000).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython validate.py -i \"../samples/433587-hernandez.csv\" " +
+    "-o \"./433587-valid.csv\" -q \"./quarantine.csv\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
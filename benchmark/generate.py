@@ -0,0 +1,292 @@
+"""
+Generates synthetic pitching data at any scale, from a single pitcher
+to a whole league over a decade, to benchmark the pipeline with.
+
+The data comes in the two forms the pipeline starts from:
+
+  out-directory/
+    html/                (the game pages of an archive crawl)
+      2008/
+        04-01/
+          gid_2008_04_01_texmlb_seamlb_1-pid_400000.html
+          ...
+        ...
+      ...
+    csv/                 (the pitcher files, with the same columns as
+      400000.csv          samples/433587-hernandez.csv)
+      ...
+
+The pitches aren't meant to be realistic, only to look like the real
+thing to the code: the same columns and types, at-bats of a few pitches
+with growing counts, innings of three outs and a mix of pitch types.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# The analysis scripts derive the columns of the pitcher files.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'analysis'))
+import features
+
+
+# The columns of the brooksbaseball game pages.
+RAW_COLUMNS = ['dateStamp', 'park_sv_id', 'ab_total', 'ab_count',
+               'pitcher_id', 'batter_id', 'ab_id', 'des', 'type', 'id',
+               'mlbam_pitch_name', 'zone_location', 'stand', 'strikes',
+               'balls', 'gid', 'pdes', 'inning', 'pitcher_team',
+               'start_speed']
+
+# The columns of the pitcher files (in the order of the samples).
+CSV_COLUMNS = ['dateStamp', 'park_sv_id', 'ab_total', 'ab_count',
+               'pitcher_id', 'batter_id', 'ab_id', 'des', 'type', 'id',
+               'mlbam_pitch_name', 'fastball_binary', 'speed_last',
+               'fastball_last', 'type_last', 'zone_location', 'stand',
+               'strikes', 'balls', 'gid', 'pdes', 'inning', 'pitcher_team',
+               'start_speed', 'pitch_in_inning', 'pitch_in_game',
+               'first_of_inning', 'last_pitch_ab', 'resulting_outs', 'outs']
+
+TEAMS = ['ana', 'ari', 'atl', 'bal', 'bos', 'cha', 'chn', 'cin', 'cle',
+         'col', 'det', 'hou', 'kca', 'lan', 'mia', 'mil', 'min', 'nya',
+         'nyn', 'oak', 'phi', 'pit', 'sdn', 'sea', 'sfn', 'sln', 'tba',
+         'tex', 'tor', 'was']
+
+# The outcomes of the at-bats and how often they happen.
+OUTCOMES = ['Strikeout', 'Groundout', 'Single', 'Walk', 'Flyout', 'Double',
+            'Pop Out', 'Lineout', 'Grounded Into DP', 'Home Run']
+OUTCOME_ODDS = [0.30, 0.18, 0.13, 0.10, 0.08, 0.04, 0.04, 0.04, 0.05, 0.04]
+
+# The pitch types thrown and their average speed.
+PITCHES = ['FF', 'SI', 'CH', 'CU', 'SL', 'FC', 'FA']
+SPEEDS = [94.0, 92.5, 85.0, 79.0, 84.0, 90.0, 94.0]
+
+
+def season(pid, year, games, rng, batters=400):
+    """Generates the pitches of a pitcher's season."""
+
+    team = TEAMS[pid % len(TEAMS)]
+    mix = rng.dirichlet(np.ones(len(PITCHES)))
+
+    # The at-bats of every game and their outcomes.
+    at_bats = rng.randint(18, 31, size=games)
+    game = np.repeat(np.arange(games), at_bats)
+    ab_id = _cumcount(game) + 1
+    ab_total = np.maximum(1 + rng.binomial(9, 0.42, size=len(game)), 1)
+    des = np.array(OUTCOMES)[
+        rng.choice(len(OUTCOMES), size=len(game), p=OUTCOME_ODDS)]
+    outs = pd.Series(des).map(features.DES_OUTS).values
+
+    # Every three outs make an inning (before the at-bat).
+    before = pd.Series(outs).groupby(game).cumsum().values - outs
+    inning = np.minimum(before // 3 + 1, 9)
+
+    batter = 100000 + rng.randint(0, batters, size=len(game))
+
+    # Spread the at-bats into pitches.
+    pitch_ab = np.repeat(np.arange(len(game)), ab_total)
+    ab_count = _cumcount(pitch_ab) + 1
+    last = ab_count == ab_total[pitch_ab]
+    n = len(pitch_ab)
+
+    kind = np.where(rng.rand(n) < 0.45, 'B', 'S')
+    in_play = last & ~np.isin(des[pitch_ab], ['Strikeout', 'Walk'])
+    kind = np.where(in_play, 'X', kind)
+
+    # The count before every pitch of an at-bat.
+    balls = _before(kind == 'B', pitch_ab)
+    strikes = _before(kind == 'S', pitch_ab)
+
+    pdes = np.where(kind == 'B', 'Ball', np.where(
+        kind == 'X', 'In play, out(s)',
+        np.array(['Called Strike', 'Foul', 'Swinging Strike'])[
+            rng.randint(0, 3, size=n)]))
+
+    pitch = rng.choice(len(PITCHES), size=n, p=mix)
+    speed = np.round(
+        np.array(SPEEDS)[pitch] + rng.normal(0, 1.5, size=n), 2)
+
+    # The dates and ids of the games and pitches.
+    days = pd.date_range(pd.Timestamp(year=year, month=4, day=1),
+                         periods=games, freq='5D')
+    opponents = np.array(TEAMS)[(pid + np.arange(games) + 1) % len(TEAMS)]
+    opponents = np.where(opponents == team, 'tor', opponents)
+    dates = np.array([str(day.month) + '/' + str(day.day) + '/' +
+                      str(day.year) + ' 0:00' for day in days])
+    gids = np.array(['gid_' + day.strftime('%Y_%m_%d') + '_' + o + 'mlb_' +
+                     team + 'mlb_1/' for day, o in zip(days, opponents)])
+    prefixes = pd.Series(
+        [day.strftime('%y%m%d') + '_19' for day in days])
+
+    pitch_game = game[pitch_ab]
+    pitch_id = 3 * _cumcount(pitch_game) + 3
+    park_sv_id = prefixes.values[pitch_game] + \
+        pd.Series(pitch_id).astype(str).str.zfill(4).values + team
+
+    return pd.DataFrame({
+        'dateStamp': dates[pitch_game],
+        'park_sv_id': park_sv_id,
+        'ab_total': ab_total[pitch_ab],
+        'ab_count': ab_count,
+        'pitcher_id': pid,
+        'batter_id': batter[pitch_ab],
+        'ab_id': ab_id[pitch_ab],
+        'des': des[pitch_ab],
+        'type': kind,
+        'id': pitch_id,
+        'mlbam_pitch_name': np.array(PITCHES)[pitch],
+        'zone_location': rng.randint(1, 15, size=n),
+        'stand': np.where(batter[pitch_ab] % 2, 'L', 'R'),
+        'strikes': np.minimum(strikes, 2),
+        'balls': np.minimum(balls, 3),
+        'gid': gids[pitch_game],
+        'pdes': pdes,
+        'inning': inning[pitch_ab],
+        'pitcher_team': team,
+        'start_speed': speed,
+    }, columns=RAW_COLUMNS)
+
+
+def write_html(df, out_dir):
+    """Writes the pitches as one game page per pitcher and game."""
+
+    for gid, game in df.groupby('gid', sort=False):
+        year, month, day = gid.split('_')[1:4]
+        path = os.path.join(out_dir, year, month + '-' + day)
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        rows = ['<tr><th>' + '</th><th>'.join(RAW_COLUMNS) + '</th></tr>']
+        rows.extend(
+            '<tr><td>' + '</td><td>'.join(row) + '</td></tr>'
+            for row in game.astype(str).values.tolist())
+
+        filename = gid[:-1] + '-pid_' + str(game['pitcher_id'].iloc[0])
+        with open(os.path.join(path, filename + '.html'), 'w') as f:
+            f.write('<html><body><table>\n' + '\n'.join(rows) +
+                    '\n</table></body></html>\n')
+
+
+def write_csv(df, out_dir):
+    """Writes the pitches of a pitcher as a pitcher file."""
+
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    df = features.derive(df)[CSV_COLUMNS]
+    df.to_csv(os.path.join(
+        out_dir, str(df['pitcher_id'].iloc[0]) + '.csv'))
+
+
+def generate(out_dir, pitchers=1, seasons=7, games=30, first_season=2008,
+             formats=('html', 'csv'), seed=0):
+    """
+    Generates the data of a number of pitchers, each pitching a number
+    of games in every season.
+
+    Returns the number of pitches generated.
+    """
+
+    rng = np.random.RandomState(seed)
+
+    total = 0
+    for i in range(pitchers):
+        pid = 400000 + i
+        df = pd.concat(
+            [season(pid, first_season + s, games, rng)
+             for s in range(seasons)], ignore_index=True)
+        total += len(df)
+
+        if 'html' in formats:
+            write_html(df, os.path.join(out_dir, 'html'))
+        if 'csv' in formats:
+            write_csv(df, os.path.join(out_dir, 'csv'))
+
+    return total
+
+
+def _cumcount(groups):
+    """The position of every element within its (contiguous) group."""
+
+    start = np.r_[0, np.flatnonzero(np.diff(groups)) + 1]
+    sizes = np.diff(np.r_[start, len(groups)])
+
+    return np.arange(len(groups)) - np.repeat(start, sizes)
+
+
+def _before(flags, groups):
+    """The number of flags before every element within its group."""
+
+    counts = pd.Series(flags.astype(int)).groupby(groups).cumsum().values
+
+    return counts - flags
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'o:p:s:g:f:r:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['o']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    total = generate(
+        opts['o'],
+        pitchers=int(opts.get('p', 1)),
+        seasons=int(opts.get('s', 7)),
+        games=int(opts.get('g', 30)),
+        formats=opts.get('f', 'html,csv').split(','),
+        seed=int(opts.get('r', 0)))
+
+    print("Generated " + str(total) + " pitches.")
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-o: the output directory.\n" +
+    "\n" +
+    "The following arguments are optional:\n" +
+    "\t-p: the number of pitchers (defaults to 1).\n" +
+    "\t-s: the number of seasons (defaults to 7).\n" +
+    "\t-g: the number of games per pitcher and season (defaults to 30).\n" +
+    "\t-f: the formats to write, html and/or csv (defaults to html,csv).\n" +
+    "\t-r: the random seed (defaults to 0).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython generate.py -o \"./data\" -p 1\n" +
+    "\tpython generate.py -o \"./data\" -p 700 -s 10 -f csv\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
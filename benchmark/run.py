@@ -0,0 +1,412 @@
+"""
+Benchmarks the stages of the pipeline (filter -> compress -> features
+-> validate -> priors -> analysis -> model) on generated data (see
+generate.py).
+
+Every stage runs in its own process, so its peak memory can be measured
+on its own. The wall time, rows (pitches) processed and peak memory of
+every stage are compared to a stored baseline for the same scale, and
+stages that got slower (or bigger) than the tolerance are reported as
+regressions.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import getopt
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import generate
+
+# The stages live with the wrangle and analysis scripts.
+for folder in ['wrangle', 'analysis']:
+    sys.path.append(os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), os.pardir, folder))
+import compress
+import filter
+import table
+import store
+import features
+import priors
+import tendency
+import matchup
+import pitchtype
+import sequence
+import validate
+
+
+# The default baseline file.
+BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def _filter(data_dir, work_dir):
+    """Sorts the game pages by pitcher (an index of them)."""
+
+    _main(filter, ['-i', os.path.join(data_dir, 'html'),
+                   '-o', os.path.join(work_dir, 'filtered'), '-m', 'index'])
+
+    return len(filter.read_index(
+        os.path.join(work_dir, 'filtered', filter.INDEX)))
+
+
+def _parse(data_dir, work_dir):
+    """Parses every game page."""
+
+    return sum(len(table.read(f)) for f in _games(data_dir))
+
+
+def _compress(data_dir, work_dir):
+    """Compresses the game pages into pitcher csv files."""
+
+    _main(compress, ['-i', os.path.join(work_dir, 'filtered'),
+                     '-o', os.path.join(work_dir, 'pitchers')])
+
+    rows = 0
+    for f in glob.glob(os.path.join(work_dir, 'pitchers', '*.csv')):
+        with open(f, 'r') as lines:
+            rows += sum(1 for _ in lines) - 1
+
+    return rows
+
+
+def _compress_parquet(data_dir, work_dir):
+    """Compresses the game pages into the store."""
+
+    _main(compress, ['-i', os.path.join(work_dir, 'filtered'),
+                     '-o', os.path.join(work_dir, 'store'), '-f', 'parquet'])
+
+    return len(store.read(os.path.join(work_dir, 'store'), columns=['gid']))
+
+
+def _features(data_dir, work_dir):
+    """Derives the additional columns of every pitcher."""
+
+    return sum(len(features.derive(df)) for df in _pitchers(data_dir))
+
+
+def _validate(data_dir, work_dir):
+    """Validates the innings of every pitcher a chunk at a time."""
+
+    rows = 0
+    for f in sorted(glob.glob(os.path.join(data_dir, 'csv', '*.csv'))):
+        for df, _ in validate.stream(store.chunks(f)):
+            rows += len(df)
+
+    return rows
+
+
+def _priors(data_dir, work_dir):
+    """Computes and attaches the batter priors of every pitcher."""
+
+    rows = 0
+    for df in _pitchers(data_dir):
+        rows += len(priors.attach(df, priors.table(df, by=['batter_id'])))
+
+    return rows
+
+
+def _tendency(data_dir, work_dir):
+    """Computes the pitch tendency of every pitcher."""
+
+    rows = 0
+    for df in _pitchers(data_dir, ['gid', 'mlbam_pitch_name']):
+        tendency.window_averages(df, 'mlbam_pitch_name', 10)
+        rows += len(df)
+
+    return rows
+
+
+def _matchup(data_dir, work_dir):
+    """Summarizes the matchups of every pitcher."""
+
+    rows = 0
+    for df in _pitchers(data_dir):
+        matchup.summary(df)
+        rows += len(df)
+
+    return rows
+
+
+def _sequence(data_dir, work_dir):
+    """Counts the pitch transitions of all the pitchers at once."""
+
+    df = pd.concat(list(_pitchers(data_dir)), ignore_index=True)
+    sequence.build(df, order=3, conditions=['count', 'stand'])
+
+    return len(df)
+
+
+def _pitchtype(data_dir, work_dir):
+    """Trains the pitch type model of every pitcher."""
+
+    rows = 0
+    for df in _pitchers(data_dir):
+        pitchtype.fit(pitchtype.design(df), df[pitchtype.TARGET], n_jobs=1)
+        rows += len(df)
+
+    return rows
+
+
+# The stages, in the order they run (later stages may use the output
+#  of earlier ones).
+STAGES = [
+    ('filter', _filter),
+    ('parse', _parse),
+    ('compress', _compress),
+    ('compress-parquet', _compress_parquet),
+    ('features', _features),
+    ('validate', _validate),
+    ('priors', _priors),
+    ('tendency', _tendency),
+    ('matchup', _matchup),
+    ('sequence', _sequence),
+    ('pitchtype', _pitchtype),
+]
+
+# The stages that read the output of other stages (in the work
+#  directory), which run first whenever they are selected.
+DEPENDS = {
+    'compress': ['filter'],
+    'compress-parquet': ['filter'],
+}
+
+
+def selected(stages):
+    """The stages to run for a selection of stages, in order."""
+
+    needed = set()
+    pending = list(stages)
+    while pending:
+        stage = pending.pop()
+        if stage not in needed:
+            needed.add(stage)
+            pending.extend(DEPENDS.get(stage, []))
+
+    return [stage for stage, _ in STAGES if stage in needed]
+
+
+def measure(stage, data_dir, work_dir):
+    """
+    Runs a stage in its own process.
+
+    Returns a dictionary with the seconds, rows and peak memory (MB) of
+    the stage, or the error it failed with.
+    """
+
+    receiver, sender = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(
+        target=_measure, args=(stage, data_dir, work_dir, sender))
+    process.start()
+
+    # Only the stage's process holds the sending end, so a process that
+    #  dies without an answer (e.g. killed for its memory) ends the pipe.
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    process.join()
+
+    if result is None:
+        result = {'error': "Stage process died (exit code " +
+                  str(process.exitcode) + ")"}
+
+    return result
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compares the results of the stages to a baseline.
+
+    Returns a DataFrame with the results, the baseline, their ratio and
+    whether the stage regressed (more than tolerance slower or bigger).
+    """
+
+    rows = []
+    for stage, result in results.items():
+        base = baseline.get(stage, {})
+        row = {'stage': stage}
+        for metric in ['seconds', 'peak_mb']:
+            row[metric] = result.get(metric)
+            row['baseline_' + metric] = base.get(metric)
+            row[metric + '_ratio'] = \
+                result[metric] / base[metric] \
+                if metric in result and base.get(metric) else None
+        row['regressed'] = any(
+            row[metric + '_ratio'] is not None and
+            row[metric + '_ratio'] > 1 + tolerance
+            for metric in ['seconds', 'peak_mb'])
+        rows.append(row)
+
+    return pd.DataFrame(rows, columns=[
+        'stage', 'seconds', 'baseline_seconds', 'seconds_ratio',
+        'peak_mb', 'baseline_peak_mb', 'peak_mb_ratio', 'regressed'])
+
+
+def _measure(stage, data_dir, work_dir, sender):
+    """Runs and measures a stage (in the stage's process)."""
+
+    start = time.time()
+    try:
+        rows = dict(STAGES)[stage](data_dir, work_dir)
+    except Exception as e:
+        sender.send({'error': str(e) or e.__class__.__name__})
+        return
+
+    # A stage without input (e.g. a missing work directory) "succeeds"
+    #  in no time, which is no measurement.
+    if not rows:
+        sender.send({'error': "No rows processed"})
+        return
+    seconds = time.time() - start
+
+    # ru_maxrss is in KB on linux; the stage's own worker
+    #  processes count as well.
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    sender.send({'seconds': seconds, 'rows': rows, 'peak_mb': peak / 1024.0})
+
+
+def _main(module, argv):
+    """Runs the main() of a script with command line arguments."""
+
+    sys.argv = [module.__name__ + '.py'] + argv
+    module.main()
+
+
+def _games(data_dir):
+    """The generated game pages."""
+
+    return sorted(glob.glob(os.path.join(data_dir, 'html', '*', '*', '*')))
+
+
+def _pitchers(data_dir, columns=None):
+    """Reads the generated pitcher files one at a time."""
+
+    for f in sorted(glob.glob(os.path.join(data_dir, 'csv', '*.csv'))):
+        yield store.read(f, columns=columns)
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'd:p:s:g:b:t:x:o:u')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    scale = {
+        'pitchers': int(opts.get('p', 1)),
+        'seasons': int(opts.get('s', 7)),
+        'games': int(opts.get('g', 30)),
+    }
+    scale_key = '-'.join(
+        key + str(scale[key]) for key in ['pitchers', 'seasons', 'games'])
+    if 'd' in opts:
+        scale_key = os.path.abspath(opts['d'])
+
+    stages = opts['x'].split(',') if 'x' in opts else \
+        [stage for stage, _ in STAGES]
+
+    work_dir = tempfile.mkdtemp(prefix='benchmark-')
+    try:
+        # Generate the data at the requested scale (unless given).
+        data_dir = opts.get('d')
+        if data_dir is None:
+            data_dir = os.path.join(work_dir, 'data')
+            print("Generating " + scale_key + " ...")
+            generate.generate(data_dir, **scale)
+
+        results = {}
+        for stage in selected(stages):
+            print("Running " + stage + " ...")
+            results[stage] = measure(stage, data_dir, work_dir)
+            if 'error' in results[stage]:
+                print("Failed " + stage + ": " + results[stage]['error'])
+    finally:
+        shutil.rmtree(work_dir)
+
+    # Compare to (or start) the baseline of this scale.
+    baseline_file = opts.get('b', BASELINE)
+    baselines = {}
+    if os.path.exists(baseline_file):
+        with open(baseline_file, 'r') as f:
+            baselines = json.load(f)
+
+    report = compare(results, baselines.get(scale_key, {}),
+                     float(opts.get('t', 0.25)))
+    print(report.to_string(index=False))
+
+    if 'o' in opts:
+        with open(opts['o'], 'w') as f:
+            json.dump({'scale': scale, 'stages': results}, f, indent=2)
+
+    # A run with failed stages is never a baseline (nor a success).
+    failed = [stage for stage, result in results.items()
+              if 'error' in result]
+    if failed:
+        print("Failed stages: " + ", ".join(failed) +
+              " (the baseline was not saved).")
+        sys.exit(1)
+
+    if 'u' in opts or not scale_key in baselines:
+        baselines[scale_key] = results
+        with open(baseline_file + '.tmp', 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        os.rename(baseline_file + '.tmp', baseline_file)
+        print("Saved the baseline for " + scale_key + ".")
+    elif report['regressed'].any():
+        sys.exit(1)
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following arguments are optional:\n" +
+    "\t-p: the number of pitchers to generate (defaults to 1).\n" +
+    "\t-s: the number of seasons to generate (defaults to 7).\n" +
+    "\t-g: the number of games per pitcher and season (defaults to 30).\n" +
+    "\t-d: use data already generated with generate.py instead.\n" +
+    "\t-x: the stages to run (comma separated, defaults to all), and\n" +
+    "\t    the stages they depend on (e.g. filter for compress).\n" +
+    "\t-b: the baseline file (defaults to benchmark/baseline.json).\n" +
+    "\t-t: the tolerated slow down (defaults to 0.25, i.e. 25%).\n" +
+    "\t-o: a json file for the results.\n" +
+    "\t-u: save the results as the new baseline.\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tpython run.py\n" +
+    "\tpython run.py -p 30 -s 10 -x \"filter,compress,features,tendency\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Puts the scripts of the wrangle, analysis and benchmark folders on the
+path (they are scripts, not packages) and provides the sample data and a
+stand-in brooksbaseball site to crawl.
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+"""
+import os
+import subprocess
+import sys
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+for folder in ['wrangle', 'analysis', 'benchmark']:
+    sys.path.append(os.path.join(ROOT, folder))
+
+# The sample pitcher file.
+SAMPLE = os.path.join(ROOT, 'samples', '433587-hernandez.csv')
+
+
+@pytest.fixture(scope='session')
+def sample():
+    """The sample pitcher (do not modify, copy it)."""
+
+    return pd.read_csv(SAMPLE, index_col=0)
+
+
+# The canned brooksbaseball pages.
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures', 'brooksbaseball')
+
+
+class BrooksHandler(BaseHTTPRequestHandler):
+    """
+    Serves the canned pages of a stand-in brooksbaseball site, i.e.
+
+      pfx.php/?year=2014&month=4&day=1            pfx-2014-4-1.html
+      ...&game=<gid>/                             pfx-<gid>.html
+      ...&game=<gid>/&pitchSel=<pid>              pfx-<gid>-<pid>.html
+      tabdel_expanded.php?game=<gid>/&pitchSel=   tabdel_expanded-<gid>-<pid>.html
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = dict((key, value[0]) for key, value in
+                      parse_qs(url.query, keep_blank_values=True).items())
+        self.server.requests.append(self.path)
+
+        if url.path.endswith('tabdel_expanded.php'):
+            name = 'tabdel_expanded-' + params.get('game', '')[:-1] + \
+                '-' + params.get('pitchSel', '')
+        elif 'pitchSel' in params:
+            name = 'pfx-' + params['game'][:-1] + '-' + params['pitchSel']
+        elif 'game' in params:
+            name = 'pfx-' + params['game'][:-1]
+        else:
+            name = 'pfx-' + '-'.join(
+                params.get(key, '') for key in ['year', 'month', 'day'])
+
+        filename = os.path.join(FIXTURES, name + '.html')
+        if not os.path.isfile(filename):
+            self.send_error(404)
+            return
+
+        with open(filename, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def brooks_site():
+    """
+    A stand-in brooksbaseball site on a local port. Its base_url is the
+    spider's base url and requests lists the paths requested so far.
+    """
+
+    server = HTTPServer(('127.0.0.1', 0), BrooksHandler)
+    server.requests = []
+    server.base_url = 'http://127.0.0.1:' + str(server.server_port) + \
+        '/pfxVB/'
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def crawl(site, path, *args, **settings):
+    """
+    Crawls the stand-in site with the brooksbaseball spider (in its own
+    process, like scrapy crawl) with everything kept below path. The
+    args are spider arguments (-a), the settings override settings.py.
+
+    Returns the finished scrapy process.
+    """
+
+    settings.setdefault('STORE_PATH', os.path.join(path, 'store'))
+    settings.setdefault('HTTPCACHE_DIR', os.path.join(path, 'httpcache'))
+    settings.setdefault('DOWNLOAD_DELAY', 0)
+    settings.setdefault('AUTOTHROTTLE_ENABLED', False)
+    settings.setdefault('LOG_LEVEL', 'INFO')
+
+    command = [sys.executable, '-m', 'scrapy', 'crawl', 'brooksbaseball',
+               '-a', 'base_url=' + site.base_url,
+               '-a', 'calendar_path=' + os.path.join(path, 'calendar.json'),
+               '-a', 'store_path=' + os.path.join(path, 'data')]
+    for arg in args:
+        command.extend(['-a', arg])
+    for key, value in sorted(settings.items()):
+        command.extend(['-s', key + '=' + str(value)])
+
+    return subprocess.run(
+        command, cwd=os.path.join(ROOT, 'wrangle', 'scrape'),
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True, timeout=120)
@@ -0,0 +1,83 @@
+"""
+Checks that the benchmark fails, and keeps its baseline, when a stage
+fails or its process dies.
+"""
+import json
+import os
+import signal
+import sys
+
+import pytest
+
+import run
+
+
+def fine(data_dir, work_dir):
+    return 10
+
+
+def raises(data_dir, work_dir):
+    raise ValueError("No tables found")
+
+
+def killed(data_dir, work_dir):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def empty(data_dir, work_dir):
+    return 0
+
+
+@pytest.fixture(autouse=True)
+def stages(monkeypatch):
+    monkeypatch.setattr(run, 'STAGES', [
+        ('fine', fine), ('raises', raises), ('killed', killed),
+        ('empty', empty)])
+    monkeypatch.setattr(run, 'DEPENDS', {'empty': ['fine']})
+
+
+def main(monkeypatch, tmp_path, stages, *argv):
+    monkeypatch.setattr(sys, 'argv', [
+        'run.py', '-d', str(tmp_path), '-b', str(tmp_path / 'baseline.json'),
+        '-x', stages] + list(argv))
+    run.main()
+
+
+def test_measure(tmp_path):
+    assert run.measure('fine', str(tmp_path), str(tmp_path))['rows'] == 10
+    assert run.measure('raises', str(tmp_path), str(tmp_path)) == \
+        {'error': "No tables found"}
+    assert run.measure('killed', str(tmp_path), str(tmp_path)) == \
+        {'error': "Stage process died (exit code -9)"}
+    assert run.measure('empty', str(tmp_path), str(tmp_path)) == \
+        {'error': "No rows processed"}
+
+
+def test_selected_stages_bring_their_inputs():
+    assert run.selected(['empty']) == ['fine', 'empty']
+    assert run.selected(['killed', 'fine']) == ['fine', 'killed']
+
+
+def test_real_stages_bring_their_inputs(monkeypatch):
+    monkeypatch.undo()
+    assert run.selected(['compress', 'features']) == \
+        ['filter', 'compress', 'features']
+
+
+@pytest.mark.parametrize('failing', ['raises', 'killed', 'empty'])
+@pytest.mark.parametrize('update', [[], ['-u']])
+def test_failed_stages_fail_the_run(monkeypatch, tmp_path, failing, update):
+    with pytest.raises(SystemExit) as e:
+        main(monkeypatch, tmp_path, 'fine,' + failing, *update)
+
+    assert e.value.code == 1
+    assert not os.path.exists(str(tmp_path / 'baseline.json'))
+
+
+def test_first_run_saves_the_baseline(monkeypatch, tmp_path):
+    main(monkeypatch, tmp_path, 'fine')
+    main(monkeypatch, tmp_path, 'fine')
+
+    with open(str(tmp_path / 'baseline.json'), 'r') as f:
+        baselines = json.load(f)
+    assert list(baselines[os.path.abspath(str(tmp_path))]) == ['fine']
@@ -0,0 +1,94 @@
+"""
+Checks that compress.py keeps going when a pitcher's files are bad, and
+that it reads the index of filter.py like the pitcher folders.
+"""
+import glob
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import compress
+import filter
+import generate
+import store
+
+
+def pitchers(path, pids):
+    """Writes the generated games of some pitchers, one folder each."""
+
+    rng = np.random.RandomState(0)
+    for pid in pids:
+        pages = os.path.join(path, 'pages-' + str(pid))
+        generate.write_html(generate.season(pid, 2008, 3, rng), pages)
+        os.makedirs(os.path.join(path, 'in', str(pid)))
+        for filename in glob.glob(os.path.join(pages, '*', '*', '*')):
+            shutil.move(filename, os.path.join(
+                path, 'in', str(pid), os.path.basename(filename)))
+        shutil.rmtree(pages)
+
+    return os.path.join(path, 'in')
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['compress.py'] + list(argv))
+    compress.main()
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_bad_pitcher_does_not_stop_the_others(
+        tmp_path, monkeypatch, capsys, fmt, workers):
+    path = pitchers(str(tmp_path), [400000, 400001, 400002])
+
+    # A game file that went missing and one that isn't a game page.
+    os.symlink(os.path.join(path, 'missing.html'),
+               os.path.join(path, '400000', 'gone.html'))
+    with open(os.path.join(path, '400001', 'bad.html'), 'w') as f:
+        f.write('<html>Service unavailable</html>')
+
+    out = str(tmp_path / 'out')
+    run(monkeypatch, '-i', path, '-o', out, '-f', fmt, '-j', workers)
+
+    printed = capsys.readouterr().out
+    assert 'Error processing 400000' in printed
+    assert 'Error processing 400001' in printed
+    assert 'Error processing 400002' not in printed
+
+    outfile = compress.output(out, '400002', fmt)
+    assert len(store.read(outfile)) > 0
+    assert not os.path.exists(compress.output(out, '400000', fmt))
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_index_matches_copied_pitchers(tmp_path, monkeypatch, fmt):
+    data = str(tmp_path / 'data')
+    rng = np.random.RandomState(0)
+    for pid in [400000, 400001]:
+        generate.write_html(generate.season(pid, 2008, 3, rng), data)
+    # Files without a pitcher are left out in both modes.
+    with open(os.path.join(data, 'calendar.json'), 'w') as f:
+        f.write('{}')
+
+    found = {}
+    for mode in ['copy', 'index']:
+        sorted_dir = str(tmp_path / mode)
+        monkeypatch.setattr(sys, 'argv', ['filter.py', '-i', data,
+                                          '-o', sorted_dir, '-m', mode])
+        filter.main()
+
+        out = str(tmp_path / (mode + '-out'))
+        run(monkeypatch, '-i', sorted_dir, '-o', out, '-f', fmt)
+        found[mode] = dict(
+            (pid, store.read(compress.output(out, pid, fmt)))
+            for pid in ['400000', '400001'])
+
+    assert os.path.isfile(os.path.join(str(tmp_path / 'index'),
+                                       filter.INDEX))
+    for pid in found['copy']:
+        df = found['copy'][pid]
+        assert len(df) > 0
+        pd.testing.assert_frame_equal(found['index'][pid], df)
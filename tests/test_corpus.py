@@ -0,0 +1,91 @@
+"""
+Checks the corpus aggregates against pandas on the whole frame, and that
+a failing or dying worker fails the run.
+"""
+import os
+import signal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import corpus
+import features
+import generate
+import store
+
+
+@pytest.fixture(scope='module')
+def pitches(tmp_path_factory):
+    """A store of three generated pitchers and all of their pitches."""
+
+    path = str(tmp_path_factory.mktemp('store'))
+    rng = np.random.RandomState(0)
+    frames = []
+    for pid in [400000, 400001, 400002]:
+        df = features.derive(pd.concat(
+            [generate.season(pid, year, 8, rng) for year in [2008, 2009]],
+            ignore_index=True))
+        store.write(df, path)
+        frames.append(store.read(os.path.join(path, str(pid))))
+
+    return path, pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_aggregates_match_pandas(pitches, workers):
+    path, df = pitches
+
+    mix = corpus.run(corpus.pitch_mix_by_inning, [path],
+                     ['inning', 'mlbam_pitch_name'], workers=workers,
+                     chunksize=1000)
+    expected = pd.crosstab(df['inning'],
+                           df['mlbam_pitch_name'].astype(object))
+    pd.testing.assert_frame_equal(
+        mix.reindex_like(expected).fillna(0).astype(int), expected,
+        check_names=False)
+
+    outs = corpus.run(corpus.outs, [path], workers=workers)
+    assert outs.sort_index().tolist() == \
+        df['outs'].value_counts().sort_index().tolist()
+
+    batters = corpus.run(corpus.batters, [path], ['batter_id'],
+                         workers=workers)
+    assert batters.estimate() == df['batter_id'].nunique()
+
+    speeds = corpus.table(corpus.run(
+        corpus.speeds, [path], ['mlbam_pitch_name', 'start_speed'],
+        workers=workers))
+    quantiles = df.groupby(df['mlbam_pitch_name'].astype(object))[
+        'start_speed'].quantile([0.1, 0.5, 0.9]).unstack()
+    assert speeds['pitches'].tolist() == \
+        df['mlbam_pitch_name'].value_counts().reindex(speeds.index).tolist()
+    np.testing.assert_allclose(
+        speeds[['p10', 'p50', 'p90']].values,
+        quantiles.reindex(speeds.index).values, atol=0.25)
+
+
+def test_distinct_estimate():
+    sketch = corpus.merge(corpus.Distinct(k=1024).add(np.arange(60000)),
+                          corpus.Distinct(k=1024).add(np.arange(40000,
+                                                                100000)))
+    assert abs(sketch.estimate() - 100000) < 0.1 * 100000
+
+
+def fails(df):
+    raise ValueError("Bad chunk")
+
+
+def dies(df):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_failing_partition(pitches, workers):
+    with pytest.raises(RuntimeError, match="Bad chunk"):
+        corpus.run(fails, [pitches[0]], ['inning'], workers=workers)
+
+
+def test_dying_worker(pitches):
+    with pytest.raises(RuntimeError, match="worker died"):
+        corpus.run(dies, [pitches[0]], ['inning'], workers=2)
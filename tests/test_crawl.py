@@ -0,0 +1,215 @@
+"""
+Crawls the stand-in brooksbaseball site (see conftest.py) with the
+spider and its store pipeline.
+"""
+import glob
+import json
+import os
+import sys
+
+from datetime import date, timedelta
+
+import pytest
+
+import compress
+import filter
+import store
+
+from conftest import FIXTURES, ROOT, crawl
+
+# The canned pitchers and their pitches.
+PITCHERS = ['400000', '400001', '400002']
+PITCHES = 12
+
+
+def test_crawl_stores_every_pitcher(brooks_site, tmp_path):
+    path = str(tmp_path)
+
+    done = crawl(brooks_site, path, 'start_date=2014-04-01',
+                 'end_date=2014-04-02')
+    assert done.returncode == 0, done.stdout
+    assert 'Traceback' not in done.stdout, done.stdout
+
+    tables = [p for p in brooks_site.requests if 'tabdel_expanded' in p]
+    assert len(tables) == len(PITCHERS)
+
+    for pid in PITCHERS:
+        df = store.read(os.path.join(path, 'store', pid))
+        assert len(df) == PITCHES
+        assert (df['pitcher_id'] == int(pid)).all()
+
+    # Nothing is archived unless asked for.
+    assert not os.path.exists(os.path.join(path, 'data'))
+
+
+def test_crawl_resumes_from_cache_and_store(brooks_site, tmp_path):
+    path = str(tmp_path)
+    args = ['start_date=2014-04-01', 'end_date=2014-04-02']
+
+    assert crawl(brooks_site, path, *args).returncode == 0
+    first = list(brooks_site.requests)
+    del brooks_site.requests[:]
+
+    # The day and game pages come from the http cache, the pitchers in
+    #  the store are skipped (and the day without games isn't asked for).
+    done = crawl(brooks_site, path, *args)
+    assert done.returncode == 0, done.stdout
+    assert brooks_site.requests == []
+    assert len(first) == 1 + 1 + 2 + 2 * len(PITCHERS)
+
+    for pid in PITCHERS:
+        assert len(store.read(os.path.join(path, 'store', pid))) == PITCHES
+
+
+def test_crawl_archive(brooks_site, tmp_path):
+    path = str(tmp_path)
+
+    done = crawl(brooks_site, path, 'start_date=2014-04-01',
+                 'end_date=2014-04-01', 'archive=1')
+    assert done.returncode == 0, done.stdout
+
+    files = sorted(os.path.basename(f) for f in glob.glob(
+        os.path.join(path, 'data', '2014', '04-01', '*.html')))
+    assert files == [
+        'gid_2014_04_01_nyamlb_bosmlb_1-pid_400002.html',
+        'gid_2014_04_01_texmlb_seamlb_1-pid_400000.html',
+        'gid_2014_04_01_texmlb_seamlb_1-pid_400001.html']
+
+    with open(os.path.join(path, 'calendar.json'), 'r') as f:
+        assert json.load(f) == {'2014-04-01': 2}
+
+
+def test_calendar_skips_days_without_games(brooks_site, tmp_path):
+    path = str(tmp_path)
+    with open(os.path.join(path, 'calendar.json'), 'w') as f:
+        json.dump({'2014-04-01': 0}, f)
+
+    done = crawl(brooks_site, path, 'start_date=2014-03-31',
+                 'end_date=2014-04-02')
+    assert done.returncode == 0, done.stdout
+
+    # Only the days not known to be empty are requested (there is no
+    #  page for 3/31, the site answers 404).
+    days = sorted(p for p in brooks_site.requests if 'pfx.php' in p)
+    assert len(days) == 2
+    assert all('day=1' not in p for p in days)
+
+    with open(os.path.join(path, 'calendar.json'), 'r') as f:
+        assert json.load(f) == {'2014-04-01': 0, '2014-04-02': 0}
+
+
+def test_calendar_leaves_out_failed_days(brooks_site, tmp_path):
+    path = str(tmp_path)
+
+    # The page of 4/3 is an error page without the games list.
+    done = crawl(brooks_site, path, 'start_date=2014-04-02',
+                 'end_date=2014-04-03')
+    assert done.returncode == 0, done.stdout
+
+    with open(os.path.join(path, 'calendar.json'), 'r') as f:
+        assert json.load(f) == {'2014-04-02': 0}
+
+
+def test_yesterday(tmp_path):
+    sys.path.append(os.path.join(ROOT, 'wrangle', 'scrape'))
+    from brooksbaseball.spiders.root_spider import RootSpider
+
+    spider = RootSpider(
+        start_date='yesterday', end_date='yesterday',
+        calendar_path=str(tmp_path / 'calendar.json'))
+
+    yesterday = date.today() - timedelta(days=1)
+    assert spider.start_dates == [yesterday]
+    assert spider.start_urls[0].endswith(
+        '&year=' + str(yesterday.year) + '&month=' + str(yesterday.month) +
+        '&day=' + str(yesterday.day))
+
+
+def test_compress_appends_to_the_crawled_store(
+        brooks_site, tmp_path, monkeypatch):
+    path = str(tmp_path)
+    done = crawl(brooks_site, path, 'start_date=2014-04-01',
+                 'end_date=2014-04-01', 'archive=1')
+    assert done.returncode == 0, done.stdout
+
+    def parts(pid):
+        # The part files (and their inodes and mtimes, to tell a
+        #  rewritten part from the crawled one).
+        return sorted(
+            (f, os.stat(f).st_ino, os.stat(f).st_mtime_ns)
+            for f in store.files(os.path.join(path, 'store'), [pid]))
+
+    crawled = parts('400000')
+
+    # Sort the archived pages by pitcher and compress them into the
+    #  crawler's store: nothing is new, nothing is rebuilt.
+    pitchers = os.path.join(path, 'pitchers')
+    run_main(monkeypatch, filter, '-i', os.path.join(path, 'data'),
+             '-o', pitchers)
+    compress_store = ['-i', pitchers, '-o', os.path.join(path, 'store'),
+                      '-f', 'parquet', '-a']
+    run_main(monkeypatch, compress, *compress_store)
+
+    assert parts('400000') == crawled
+    for pid in PITCHERS:
+        assert len(store.read(os.path.join(path, 'store', pid))) == PITCHES
+
+    # A new game of a pitcher is appended to the crawled games.
+    old = 'gid_2014_04_01_texmlb_seamlb_1'
+    new = 'gid_2014_04_06_texmlb_seamlb_1'
+    with open(os.path.join(pitchers, '400000', old + '-pid_400000.html'),
+              'r') as f:
+        html = f.read().replace(old, new).replace('4/1/2014', '4/6/2014')
+    with open(os.path.join(pitchers, '400000', new + '-pid_400000.html'),
+              'w') as f:
+        f.write(html)
+    run_main(monkeypatch, compress, *compress_store)
+
+    assert parts('400000')[:len(crawled)] == crawled
+    assert len(parts('400000')) == len(crawled) + 1
+    df = store.read(os.path.join(path, 'store', '400000'))
+    assert len(df) == 2 * PITCHES
+    assert sorted(df['gid'].unique()) == [old + '/', new + '/']
+
+
+def run_main(monkeypatch, module, *argv):
+    """Runs the main() of a script with command line arguments."""
+
+    monkeypatch.setattr(sys, 'argv', [module.__name__ + '.py'] + list(argv))
+    module.main()
+
+
+def test_failed_store_write_keeps_the_games(tmp_path, monkeypatch):
+    sys.path.append(os.path.join(ROOT, 'wrangle', 'scrape'))
+    from brooksbaseball import pipelines
+
+    path = str(tmp_path / 'store')
+    pipeline = pipelines.StorePipeline(path, 1000, 1000)
+    pipeline.open_spider(None)
+
+    pages = sorted(glob.glob(os.path.join(FIXTURES, 'tabdel_expanded-*')))
+    for page in pages:
+        with open(page, 'rb') as f:
+            body = f.read()
+        game, pid = os.path.basename(page)[len('tabdel_expanded-'):-5] \
+            .rsplit('-', 1)
+        pipeline.process_item({'pitcher_id': pid, 'body': body,
+                               'game_file': game + '.html'}, None)
+
+    write = store.write
+
+    def fails(df, root):
+        raise IOError("No space left on device")
+
+    monkeypatch.setattr(store, 'write', fails)
+    with pytest.raises(IOError):
+        pipeline.flush('400000')
+    assert len(pipeline.games) == len(PITCHERS)
+
+    monkeypatch.setattr(store, 'write', write)
+    pipeline.close_spider(None)
+    assert pipeline.games == {}
+    for pid in PITCHERS:
+        assert len(store.read(os.path.join(path, pid))) == PITCHES
+        with open(pipelines.manifest(path, pid), 'r') as f:
+            assert len(json.load(f)) == 1
@@ -0,0 +1,115 @@
+"""
+Checks the cells, roll-ups and refresh of the matchup cube against a
+pandas groupby of the sample.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import cube
+
+
+@pytest.fixture(scope='module')
+def pitches(request):
+    """The sample with its season, a second pitcher and inning bucket."""
+
+    df = request.getfixturevalue('sample').copy()
+    df['season'] = pd.to_datetime(df['dateStamp']).dt.year
+    other = df[df['season'] == 2012].copy()
+    other['pitcher_id'] = 400000
+    df = pd.concat([df, other], ignore_index=True)
+    df['bucket'] = np.array(cube.INNINGS)[
+        np.minimum((df['inning'] - 1) // 3, 3)]
+
+    return df
+
+
+def expected(df, **where):
+    """The pitch counts and average speeds of the matching pitches."""
+
+    columns = {'season': 'season', 'inning': 'bucket'}
+    mask = np.ones(len(df), dtype=bool)
+    for name, value in where.items():
+        mask &= (df[columns.get(name, name)] == value).values
+    groups = df[mask].groupby('mlbam_pitch_name', observed=True)['start_speed']
+
+    return groups.size(), groups.mean()
+
+
+QUERIES = [
+    {},
+    {'pitcher_id': 433587},
+    {'pitcher_id': 433587, 'batter_id': 400085},
+    {'pitcher_id': 433587, 'season': 2012, 'stand': 'L'},
+    {'balls': 1, 'strikes': 2},
+    {'pitcher_id': 400000, 'outs': 2, 'inning': '4-6'},
+    {'season': 2013, 'strikes': 2, 'stand': 'R'},
+]
+
+
+def test_keys_unpack(pitches):
+    keys, valid = cube._pack(pitches)
+
+    assert valid.all()
+    for name in ['pitcher_id', 'batter_id', 'balls', 'strikes', 'outs']:
+        assert (cube._unpack(keys, name) == pitches[name].values).all()
+    assert (cube._unpack(keys, 'season') + cube.FIRST_SEASON ==
+            pitches['season'].values).all()
+    assert (np.array(cube.STANDS)[cube._unpack(keys, 'stand')] ==
+            pitches['stand'].values).all()
+    assert (np.array(cube.INNINGS)[cube._unpack(keys, 'inning')] ==
+            pitches['bucket'].values).all()
+
+
+@pytest.mark.parametrize('where', QUERIES)
+def test_query_matches_groupby(pitches, where):
+    counts, speeds = expected(pitches, **where)
+    summary = cube.build(pitches).query(**where)
+
+    assert len(counts) > 0
+    assert summary['num_pitches'].to_dict() == counts.to_dict()
+    np.testing.assert_allclose(
+        summary['avg_speed'].values, speeds[summary.index].values, rtol=1e-4)
+    assert summary['pct'].sum() == pytest.approx(100.0)
+
+
+def test_cells_are_slices_for_prefixes(pitches):
+    matchups = cube.build(pitches)
+
+    assert isinstance(matchups.cells(pitcher_id=433587, batter_id=400085),
+                      slice)
+    assert not isinstance(matchups.cells(balls=1), slice)
+    assert matchups.counts.sum() == len(pitches)
+
+    # An inning and its bucket are the same cells.
+    assert np.array_equal(matchups.cells(inning=5),
+                          matchups.cells(inning='4-6'))
+
+
+def test_refresh_replaces_whole_seasons(pitches):
+    old = pitches[pitches['season'] <= 2012]
+    refreshed = cube.build(old).refresh(
+        pitches[pitches['season'] >= 2012])
+    full = cube.build(pitches)
+
+    for name in ['keys', 'counts', 'speeds']:
+        assert np.array_equal(getattr(refreshed, name), getattr(full, name))
+
+    again = refreshed.refresh(pitches[pitches['season'] >= 2012])
+    assert np.array_equal(again.counts, full.counts)
+
+
+def test_pitches_without_a_cell_are_skipped(pitches):
+    df = pitches.copy()
+    df['stand'] = df['stand'].astype(object)
+    df.loc[df.index[:5], 'stand'] = None
+    df.loc[df.index[5:8], 'balls'] = 4
+    df.loc[df.index[8:10], 'inning'] = np.nan
+
+    matchups = cube.build(df)
+
+    assert matchups.skipped == 10
+    assert matchups.counts.sum() == len(df) - 10
+    counts, _ = expected(pitches.iloc[10:], pitcher_id=433587)
+    assert matchups.query(pitcher_id=433587)['num_pitches'].to_dict() == \
+        counts.to_dict()
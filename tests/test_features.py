@@ -0,0 +1,86 @@
+"""
+Checks the derived columns against the sample file and a row by row
+python loop.
+"""
+import sys
+
+import numpy as np
+
+import features
+import generate
+import store
+
+from conftest import SAMPLE
+
+# The columns the sample file has the same way features.py derives them
+#  (outs, pitch_in_game and fastball_last are counted differently, see
+#  loop_columns()).
+SAME_AS_SAMPLE = ['pitch_in_inning', 'first_of_inning', 'last_pitch_ab',
+                  'resulting_outs', 'fastball_binary', 'speed_last',
+                  'type_last']
+
+
+def loop_columns(df):
+    """
+    Derives outs, pitch_in_game and fastball_last one pitch at a time:
+    the outs recorded earlier in the inning, the number of the pitch in
+    its game and whether the previous pitch of the inning was a
+    fastball (-1 for the first pitch).
+    """
+
+    outs, pitch_in_game, fastball_last = [], [], []
+    game_pitches, inning_outs, last = {}, {}, {}
+    for row in df.itertuples(index=False):
+        inning = (row.gid, row.inning)
+        outs.append(inning_outs.get(inning, 0))
+        if row.ab_count == row.ab_total:
+            inning_outs[inning] = outs[-1] + \
+                features.DES_OUTS.get(row.des, 0)
+
+        game_pitches[row.gid] = game_pitches.get(row.gid, 0) + 1
+        pitch_in_game.append(game_pitches[row.gid])
+
+        fastball_last.append(last.get(inning, -1))
+        last[inning] = int(row.mlbam_pitch_name in features.FASTBALLS)
+
+    return outs, pitch_in_game, fastball_last
+
+
+def test_derive_matches_sample(sample):
+    derived = features.derive(sample[generate.RAW_COLUMNS])
+
+    for column in SAME_AS_SAMPLE:
+        assert (derived[column].values == sample[column].values).all(), \
+            column
+
+
+def test_derive_matches_loop(sample):
+    derived = features.derive(sample[generate.RAW_COLUMNS])
+    outs, pitch_in_game, fastball_last = loop_columns(sample)
+
+    assert derived['outs'].tolist() == outs
+    assert derived['pitch_in_game'].tolist() == pitch_in_game
+    assert derived['fastball_last'].tolist() == fastball_last
+
+
+def test_derive_matches_generated():
+    # The generated pitches are built from their outs.
+    df = generate.season(400000, 2008, 10, np.random.RandomState(0))
+    derived = features.derive(df)
+
+    outs, pitch_in_game, fastball_last = loop_columns(df)
+    assert derived['outs'].tolist() == outs
+    assert derived['pitch_in_game'].tolist() == pitch_in_game
+    assert derived['fastball_last'].tolist() == fastball_last
+    assert derived['outs'].max() <= 2
+    assert (derived['year'] == 2008).all()
+
+
+def test_rerun_replaces_the_pitcher(tmp_path, monkeypatch, sample):
+    out = str(tmp_path / 'store')
+    monkeypatch.setattr(sys, 'argv', ['features.py', '-i', SAMPLE, '-o', out])
+
+    features.main()
+    features.main()
+
+    assert len(store.read(out)) == len(sample)
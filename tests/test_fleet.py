@@ -0,0 +1,66 @@
+"""
+Checks that the fleet carries on when the process of a pitcher dies or
+hangs, or its file is removed.
+"""
+import os
+import signal
+import time
+
+import pytest
+
+import fleet
+
+
+def fake_fit(filename, out_dir, search, probability):
+    """Trains nothing, and behaves badly for some of the files."""
+
+    name = os.path.basename(filename)
+    if name.startswith('killed'):
+        os.kill(os.getpid(), signal.SIGKILL)
+    if name.startswith('hangs'):
+        time.sleep(60)
+    if name.startswith('removed'):
+        os.remove(filename)
+        raise IOError("The file was removed")
+    if name.startswith('raises'):
+        raise ValueError("No pitches in the training or test seasons")
+
+    return {'pitcher_id': name.split('.')[0], 'test_accuracy': 1.0}
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(fleet, 'fit', fake_fit)
+
+    names = ['1.csv', 'killed.csv', '2.csv', 'hangs.csv', 'raises.csv',
+             'removed.csv', '3.csv']
+    for name in names:
+        (tmp_path / name).write_text(u'pitcher_id\n1\n')
+
+    return [str(tmp_path / name) for name in names]
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_failed_processes_do_not_stop_the_fleet(files, workers):
+    tasks = [(f, 'out', 'halving', False) for f in files]
+
+    start = time.time()
+    entries = dict(
+        (os.path.basename(entry['source']), entry)
+        for entry in fleet.run(tasks, workers, timeout=2))
+
+    assert time.time() - start < 30
+    assert sorted(entries) == sorted(os.path.basename(f) for f in files)
+
+    for name in ['1.csv', '2.csv', '3.csv']:
+        assert not 'error' in entries[name]
+        assert entries[name]['pitcher_id'] == name[0]
+        assert entries[name]['stat'] == fleet._stat(
+            [f for f in files if f.endswith(name)][0])
+
+    assert entries['killed.csv']['error'] == \
+        "Worker died (exit code -9)"
+    assert entries['hangs.csv']['error'] == "Timed out after 2 seconds"
+    assert entries['raises.csv']['error'].startswith("No pitches")
+    assert entries['removed.csv']['error'] == "The file was removed"
+    assert entries['removed.csv']['stat'] is None
@@ -0,0 +1,75 @@
+"""
+Checks that the stages only take file sizes when they are logged, and
+that the stages of worker processes are profiled.
+"""
+import glob
+import os
+import sys
+
+import pytest
+
+import compress
+import filter
+import instrument
+
+from test_compress import pitchers
+
+
+@pytest.fixture
+def sizes(monkeypatch):
+    """The paths whose size was taken."""
+
+    taken = []
+    getsize = os.path.getsize
+    monkeypatch.setattr(
+        os.path, 'getsize', lambda path: taken.append(path) or getsize(path))
+
+    return taken
+
+
+def run(monkeypatch, module, *argv):
+    monkeypatch.setattr(sys, 'argv', [module.__name__ + '.py'] + list(argv))
+    module.main()
+
+
+@pytest.mark.parametrize('logged', [False, True])
+def test_sizes_are_only_taken_when_logged(
+        tmp_path, monkeypatch, sizes, logged):
+    log = str(tmp_path / 'metrics.jsonl')
+    if logged:
+        monkeypatch.setenv(instrument.LOG, log)
+    else:
+        monkeypatch.delenv(instrument.LOG, raising=False)
+
+    path = pitchers(str(tmp_path), [400000, 400001])
+    run(monkeypatch, filter, '-i', path, '-o', str(tmp_path / 'filtered'))
+    run(monkeypatch, compress, '-i', str(tmp_path / 'filtered'),
+        '-o', str(tmp_path / 'out'))
+
+    assert bool(sizes) == logged
+    assert os.path.exists(log) == logged
+    if logged:
+        records = instrument.read(log).set_index('stage')
+        assert (records['bytes_written'] > 0).all()
+        assert (records.loc[['filter', 'compress-pitcher'],
+                            'bytes_read'] > 0).all()
+
+
+def test_worker_stages_are_profiled(tmp_path, monkeypatch):
+    profiles = str(tmp_path / 'profiles')
+    monkeypatch.setenv(instrument.PROFILE, profiles)
+    monkeypatch.delenv(instrument.LOG, raising=False)
+
+    path = pitchers(str(tmp_path), [400000, 400001, 400002])
+    run(monkeypatch, compress, '-i', path, '-o', str(tmp_path / 'out'),
+        '-j', '2')
+
+    assert len(glob.glob(os.path.join(profiles, 'compress-pitcher-*'))) == 3
+    assert len(glob.glob(os.path.join(profiles, 'compress-[0-9]*'))) == 1
+
+    # Nested stages of one process are profiled by the outer one.
+    with instrument.stage('outer'):
+        with instrument.stage('inner'):
+            pass
+    assert len(glob.glob(os.path.join(profiles, 'outer-*'))) == 1
+    assert len(glob.glob(os.path.join(profiles, 'inner-*'))) == 0
@@ -0,0 +1,98 @@
+"""
+Checks the matchup summary against the notebook's matchup_analysis and
+general_summary.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import matchup
+
+
+def matchup_analysis(hern_edited, batter_id):
+    """The notebook's matchup_analysis (python 3, without the output)."""
+
+    matchup = hern_edited[hern_edited['batter_id'] == batter_id]
+
+    avg_speed = matchup['start_speed'].mean()
+    avg_pitch_per_ab = matchup[matchup['ab_count'] == 1]['ab_total'].mean()
+
+    fb = sum(matchup['fastball_binary']) * 1.0 / len(matchup)
+
+    first_pitch = matchup[matchup['ab_count'] == 1]
+    if len(first_pitch):
+        first_pitch_fb = sum(first_pitch['fastball_binary']) * 1.0 / \
+            len(first_pitch)
+    else:
+        first_pitch_fb = np.nan
+
+    summary_vec = []
+    tot = len(matchup)
+    summary_vec.append(
+        len(matchup[matchup['mlbam_pitch_name'] == 'CH']) * 100.0 / tot)
+    summary_vec.append(
+        len(matchup[matchup['mlbam_pitch_name'] == 'CU']) * 100.0 / tot)
+    temp = (matchup['mlbam_pitch_name'] == 'FA') | \
+        (matchup['mlbam_pitch_name'] == 'FF')
+    summary_vec.append(len(matchup[temp]) * 100.0 / tot)
+    summary_vec.append(
+        len(matchup[matchup['mlbam_pitch_name'] == 'FC']) * 100.0 / tot)
+    temp = (matchup['mlbam_pitch_name'] == 'SI') | \
+        (matchup['mlbam_pitch_name'] == 'FS')
+    summary_vec.append(len(matchup[temp]) * 100.0 / tot)
+    summary_vec.append(
+        len(matchup[matchup['mlbam_pitch_name'] == 'SL']) * 100.0 / tot)
+    summary_vec.append(avg_speed)
+    summary_vec.append(avg_pitch_per_ab)
+    summary_vec.append(fb * 100)
+    summary_vec.append(first_pitch_fb * 100)
+
+    return summary_vec
+
+
+def general_summary(hern_edited, min_pitches=70):
+    """The notebook's general_summary, indexed by batter."""
+
+    batter_dict = dict(iter(hern_edited.groupby('batter_id')))
+    batters = [x for x in batter_dict.keys()
+               if len(batter_dict[x]) > min_pitches]
+
+    summary_stats = []
+    for batter in batters:
+        summary_stats.append(matchup_analysis(hern_edited, batter))
+
+    return pd.DataFrame(summary_stats, columns=matchup.COLUMNS,
+                        index=pd.Index(batters, name='batter_id'))
+
+
+@pytest.mark.parametrize('years, min_pitches', [
+    (None, 70),
+    (None, 0),
+    ([2011, 2012], 0),
+    ([2013], 20),
+])
+def test_summary_matches_general_summary(sample, years, min_pitches):
+    df = sample
+    if years is not None:
+        df = sample[pd.to_datetime(sample['dateStamp']).dt.year.isin(years)]
+    expected = general_summary(df, min_pitches).sort_index()
+
+    found = matchup.summary(sample, years=years, min_pitches=min_pitches)
+    found = found.loc[433587]
+
+    assert len(expected) > 10
+    assert list(found.index) == list(expected.index)
+    np.testing.assert_allclose(found[matchup.COLUMNS].values,
+                               expected.values, equal_nan=True)
+
+    counts = df.groupby('batter_id').size()
+    assert found['num_pitches'].tolist() == counts[found.index].tolist()
+
+
+def test_summary_by_pitcher(sample):
+    found = matchup.summary(sample, by=['pitcher_id'])
+    expected = matchup_analysis(sample.assign(batter_id=0), 0)
+
+    np.testing.assert_allclose(found.loc[433587, matchup.COLUMNS].values,
+                               expected)
+    assert found.loc[433587, 'num_pitches'] == len(sample)
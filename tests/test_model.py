@@ -0,0 +1,98 @@
+"""
+Checks the search cache of the fastball model and the Nystroem fit of
+large pitchers.
+"""
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import model
+
+# A small grid, so a search takes a moment.
+GRID = {
+    'kernel': ['rbf'],
+    'class_weight': ['balanced'],
+    'C': [1, 10],
+    'gamma': [0.01, 1],
+}
+
+
+@pytest.fixture(scope='module')
+def data(request):
+    """Some training pitches of the sample (features, target)."""
+
+    X_train, y_train, _, _ = model.split(request.getfixturevalue('sample'))
+
+    return X_train.iloc[:400], y_train[:400]
+
+
+def settings(**changes):
+    found = {'search': 'random', 'n_iter': 2, 'cv': 3, 'grid': GRID}
+    found.update(changes)
+    return found
+
+
+def test_key_changes_with_data_and_settings(data):
+    X, y = data
+    key = model.key(X, y, settings())
+
+    assert model.key(X.copy(), y.copy(), settings()) == key
+
+    changed = X.copy()
+    changed.iloc[0, 0] += 1
+    assert model.key(changed, y, settings()) != key
+    assert model.key(X, 1 - y, settings()) != key
+    assert model.key(X.rename(columns={'prior': 'rate'}), y,
+                     settings()) != key
+    assert model.key(X, y, settings(n_iter=3)) != key
+    assert model.key(X, y, settings(grid=dict(GRID, C=[1]))) != key
+
+
+def test_second_search_is_a_cache_hit(data, tmp_path, monkeypatch):
+    X, y = data
+    cache = str(tmp_path / 'models')
+    search = dict(cache_dir=cache, search='random', n_iter=2, n_jobs=1,
+                  grid=GRID)
+
+    first = model.train(X, y, **search)
+    assert len(glob.glob(os.path.join(cache, '*.joblib'))) == 1
+
+    def fails(*args, **kwargs):
+        raise AssertionError("Searched again")
+
+    monkeypatch.setattr(model.RandomizedSearchCV, 'fit', fails)
+    second = model.train(X, y, **search)
+
+    assert second['params'] == first['params']
+    assert second['score'] == first['score']
+    assert np.array_equal(second['model'].predict(X.values),
+                          first['model'].predict(X.values))
+
+    # Other data is searched (and cached) on its own.
+    monkeypatch.undo()
+    model.train(X.iloc[:300], y[:300], **search)
+    assert len(glob.glob(os.path.join(cache, '*.joblib'))) == 2
+
+
+@pytest.mark.parametrize('probability', [False, True])
+def test_large_pitchers_fit_an_approximation(data, probability):
+    X, y = data
+
+    result = model.train(X, y, search='random', n_iter=2, n_jobs=1,
+                         grid=GRID, max_exact=100, probability=probability)
+
+    fitted = result['model']
+    if probability:
+        fitted = fitted.calibrated_classifiers_[0].estimator
+    assert isinstance(fitted.named_steps['kernel'], model.Nystroem)
+    assert set(result['params']) == {
+        'kernel__gamma', 'svm__C', 'svm__class_weight'}
+
+    predicted = result['model'].predict(X.values)
+    assert set(predicted) <= {0, 1}
+    assert np.mean(predicted == y) > 0.5
+    if probability:
+        p = result['model'].predict_proba(X.values)
+        assert np.allclose(p.sum(axis=1), 1)
@@ -0,0 +1,77 @@
+"""
+Checks the per pitch type importances of the single forest against
+hand-computed ones and against the importances of binary trees.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+import pitchtype
+
+
+def test_hand_built_tree():
+    # f0 splits the FF off first, f1 then splits the CU from the SL,
+    #  f2 never splits anything.
+    X = np.array([[0, 0, 5]] * 8 + [[1, 0, 5]] * 4 + [[1, 1, 5]] * 4)
+    y = ['FF'] * 8 + ['CU'] * 4 + ['SL'] * 4
+    tree = DecisionTreeClassifier(random_state=0).fit(X, y)
+    assert tree.tree_.feature[0] == 0
+
+    # FF: 16 * 2 * 1/2 * 1/2 = 8 at the root, nothing below it.
+    # CU and SL: 16 * 2 * 1/4 * 3/4 = 6 at the root, 0 + 4 below, then
+    #  8 * 2 * 1/2 * 1/2 = 4 at the second split.
+    expected = {'CU': [1 / 3.0, 2 / 3.0, 0],
+                'FF': [1, 0, 0],
+                'SL': [1 / 3.0, 2 / 3.0, 0]}
+
+    found = pitchtype._tree_importances(tree.tree_)
+    for row, pitch_type in enumerate(tree.classes_):
+        np.testing.assert_allclose(found[row], expected[pitch_type])
+
+
+def test_binary_trees_match_sklearn(sample):
+    # With two pitch types, both are the tree's own gini importances.
+    X = pitchtype.design(sample)
+    y = np.where(sample['mlbam_pitch_name'] == 'FF', 'FF', 'other')
+    forest = pitchtype.fit(X, y, n_estimators=5, n_jobs=1)
+
+    for tree in forest.estimators_:
+        found = pitchtype._tree_importances(tree.tree_)
+        np.testing.assert_allclose(found[0], tree.feature_importances_,
+                                   atol=1e-12)
+        np.testing.assert_allclose(found[1], tree.feature_importances_,
+                                   atol=1e-12)
+
+    means, _ = pitchtype.importances(forest, X.columns)
+    np.testing.assert_allclose(means.loc['FF'].values,
+                               forest.feature_importances_, atol=1e-12)
+
+
+def test_one_pitch_type_vs_rest(sample):
+    # The importances of a pitch type in a multi-class tree are those of
+    #  a binary (pitch type vs rest) tree with the same splits.
+    X = pitchtype.design(sample).iloc[:3000]
+    y = sample['mlbam_pitch_name'].astype(str).values[:3000]
+    tree = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+    found = pd.DataFrame(pitchtype._tree_importances(tree.tree_),
+                         index=tree.classes_)
+
+    leaves = tree.apply(X)
+    nodes = tree.decision_path(X).toarray().astype(bool)
+    for pitch_type in ['FF', 'SL', 'CH']:
+        hit = y == pitch_type
+        importances = np.zeros(X.shape[1])
+        for node in np.flatnonzero(tree.tree_.children_left >= 0):
+            parts = [nodes[:, node], nodes[:, tree.tree_.children_left[node]],
+                     nodes[:, tree.tree_.children_right[node]]]
+            gini = [2 * part.sum() * hit[part].mean() *
+                    (1 - hit[part].mean()) for part in parts]
+            importances[tree.tree_.feature[node]] += \
+                gini[0] - gini[1] - gini[2]
+
+        assert len(set(leaves)) > 10
+        np.testing.assert_allclose(found.loc[pitch_type].values,
+                                   importances / importances.sum(),
+                                   atol=1e-9)
+        assert found.loc[pitch_type].sum() == pytest.approx(1)
@@ -0,0 +1,85 @@
+"""
+Checks the batter priors against the notebook's generate_priors.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import priors
+
+
+def summary(ds):
+    """The notebook's general_summary_2, only the fastball columns."""
+
+    rows = []
+    for batter, matchup in ds.groupby('batter_id'):
+        rows.append([sum(matchup['fastball_binary']) * 100.0 / len(matchup),
+                     len(matchup), batter])
+
+    return pd.DataFrame(rows, columns=[
+        '% of pitches that are fastballs', 'num_pitches', 'batter_id'])
+
+
+def generate_priors(batter_column, summary):
+    """The notebook's generate_priors (python 3)."""
+
+    sum_list = summary['% of pitches that are fastballs'].values
+    mean_val = summary['% of pitches that are fastballs'].mean()
+
+    output = []
+    for batter in batter_column:
+        if len(summary[summary['batter_id'] == batter]) == 0:
+            output.append(mean_val)
+        else:
+            ind = summary[summary['batter_id'] == batter].index
+            output.append(sum_list[ind][0] / 100.0)
+
+    return output
+
+
+@pytest.fixture(scope='module')
+def split(sample):
+    year = pd.to_datetime(sample['dateStamp']).dt.year
+    return (sample[year.isin([2011, 2012])],
+            sample[year.isin([2013, 2014])])
+
+
+def test_priors_match_generate_priors(split):
+    train, test = split
+    expected = np.array(generate_priors(test['batter_id'], summary(train)))
+
+    prior = priors.attach(test, priors.table(train, by=['batter_id']))
+    seen = test['batter_id'].isin(train['batter_id']).values
+
+    assert seen.sum() > 0 and (~seen).sum() > 0
+    np.testing.assert_allclose(prior.values[seen], expected[seen])
+
+    # Batters that weren't seen get the overall rate (the notebook took
+    #  the unweighted mean of the percentages).
+    np.testing.assert_allclose(
+        prior.values[~seen], train['fastball_binary'].mean())
+
+
+def test_shrinkage_per_pitcher(sample):
+    # Two pitchers, the second one throws nothing but fastballs.
+    other = sample.copy()
+    other['pitcher_id'] = 1
+    other['fastball_binary'] = 1
+    df = pd.concat([sample, other], ignore_index=True)
+
+    k = 20.0
+    rates = priors.table(df, shrinkage=k)
+
+    for (pid, batter), row in rates.sample(50, random_state=0).iterrows():
+        pitcher = df[df['pitcher_id'] == pid]
+        faced = pitcher[pitcher['batter_id'] == batter]
+        expected = (faced['fastball_binary'].sum() +
+                    k * pitcher['fastball_binary'].mean()) / (len(faced) + k)
+        assert row['prior'] == pytest.approx(expected)
+
+    # An unknown batter gets his pitcher's rate.
+    new = pd.DataFrame({'pitcher_id': [sample['pitcher_id'].iloc[0], 1],
+                        'batter_id': [-1, -1]})
+    np.testing.assert_allclose(
+        priors.attach(new, rates).values,
+        [sample['fastball_binary'].mean(), 1.0])
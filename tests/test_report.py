@@ -0,0 +1,113 @@
+"""
+Checks that the report draws a chart per column value and window size,
+and only draws a chart again when its data changed.
+"""
+import glob
+import json
+import os
+import sys
+
+import pytest
+
+import report
+import tendency
+
+
+COLUMNS = ['fastball_binary', 'stand']
+WINDOWS = [10, 25]
+
+
+@pytest.fixture
+def pitcher(tmp_path, sample):
+    """A csv file of the first games of the sample."""
+
+    df = sample[sample['gid'].isin(sample['gid'].unique()[:20])]
+    filename = str(tmp_path / '433587-hernandez.csv')
+    df.to_csv(filename)
+
+    return filename, df
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['report.py'] + list(argv))
+    report.main()
+
+
+def drawn(path):
+    """The modification times of the charts in a directory."""
+
+    return dict((os.path.basename(f), os.stat(f).st_mtime_ns)
+                for f in glob.glob(os.path.join(path, '*.png')))
+
+
+def test_charts_of_every_window(pitcher):
+    filename, df = pitcher
+
+    found = report.charts(filename, COLUMNS, WINDOWS)
+
+    expected = {}
+    for column in COLUMNS:
+        for n in WINDOWS:
+            avgs = tendency.window_averages(df, column, n)
+            for value in avgs.columns:
+                expected['433587-' + column + '-' + str(value) + '-n' +
+                         str(n) + '.png'] = avgs[value].tolist()
+    assert dict((name, list(values))
+                for name, _, _, values in found) == expected
+
+
+def test_unchanged_charts_are_skipped(pitcher, tmp_path, monkeypatch):
+    filename, _ = pitcher
+    found = report.charts(filename, COLUMNS, WINDOWS)
+
+    draws = []
+    draw = report._draw
+    monkeypatch.setattr(report, '_draw', lambda fig, chart: (
+        draws.append(chart[0]), draw(fig, chart)))
+
+    out = str(tmp_path / 'out')
+    os.makedirs(out)
+    signatures = report.render(found, out)
+    assert len(draws) == len(found)
+
+    # Nothing changed: nothing is drawn.
+    del draws[:]
+    assert report.render(found, out, signatures) == signatures
+    assert draws == []
+
+    # One chart's data changed, and one chart went missing.
+    name, title, labels, values = found[0]
+    found[0] = (name, title, labels, values + 1)
+    os.remove(os.path.join(out, found[1][0]))
+    report.render(found, out, signatures)
+    assert sorted(draws) == sorted([found[0][0], found[1][0]])
+
+
+def test_rerun_only_draws_changed_pitchers(pitcher, tmp_path, monkeypatch):
+    filename, df = pitcher
+    out = str(tmp_path / 'out')
+    argv = ['-i', filename, '-c', ','.join(COLUMNS),
+            '-n', ','.join(str(n) for n in WINDOWS), '-o', out, '-j', '1']
+
+    run(monkeypatch, *argv)
+    charts = os.path.join(out, '433587-hernandez')
+    first = drawn(charts)
+    assert sorted(first) == sorted(
+        name for name, _, _, _ in report.charts(filename, COLUMNS, WINDOWS))
+    with open(os.path.join(out, report.MANIFEST), 'r') as f:
+        assert sorted(json.load(f)['433587-hernandez']) == sorted(first)
+
+    run(monkeypatch, *argv)
+    assert drawn(charts) == first
+
+    # The batters of the first games all stand on the other side now.
+    changed = df.copy()
+    first_games = changed['gid'].isin(changed['gid'].unique()[:5])
+    changed.loc[first_games, 'stand'] = 'L'
+    changed.to_csv(filename)
+
+    run(monkeypatch, *argv)
+    again = drawn(charts)
+    redrawn = set(name for name in first if again[name] != first[name])
+    assert any('-stand-' in name for name in redrawn)
+    assert not any('-fastball_binary-' in name for name in redrawn)
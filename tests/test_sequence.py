@@ -0,0 +1,179 @@
+"""
+Checks the transition counts of build, update, refresh and add against
+a plain python count of the pitches, and that refreshing saved
+transitions (-a) keeps their settings.
+"""
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sequence
+
+
+def loop_counts(df, order, scope):
+    """
+    The transitions counted one pitch at a time, {(pitcher, balls,
+    strikes, stand, previous pitch types, pitch type): count}.
+    """
+
+    types = sequence.PITCH_TYPES
+    columns = sequence.SCOPES[scope] + ['balls', 'strikes', 'stand',
+                                        'mlbam_pitch_name']
+    previous = {}
+    counts = Counter()
+    for row in df[columns].astype(object).values.tolist():
+        key = tuple(row[:-4])
+        balls, strikes, stand, name = row[-4:]
+        name = name if name in types else types[-1]
+        seen = previous.setdefault(key, [])
+        counts[(int(key[0]), int(balls), int(strikes), stand,
+                tuple(seen[len(seen) - (order - 1):] if order > 1 else ()),
+                name)] += 1
+        seen.append(name)
+
+    return counts
+
+
+def assert_counts(transitions, df):
+    """The transitions hold exactly the python count of df."""
+
+    expected = loop_counts(df, transitions.order, transitions.scope)
+    for (pid, balls, strikes, stand, previous, name), n in expected.items():
+        counts = transitions.lookup(pid, list(previous), balls=balls,
+                                    strikes=strikes, stand=stand)
+        assert counts[transitions.types.index(name)] == n
+
+    # ... and nothing else.
+    for pid, n in df['pitcher_id'].value_counts().items():
+        assert transitions.counts[transitions._rows[int(pid)]].sum() == n
+    assert set(transitions._rows) == set(df['pitcher_id'].astype(int))
+
+
+@pytest.fixture(scope='module')
+def league(request):
+    """The sample pitcher and a second one with some unknown pitches."""
+
+    df = request.getfixturevalue('sample')
+    df = df[df['gid'].isin(df['gid'].unique()[:80])]
+    other = df[df['gid'].isin(df['gid'].unique()[:30])].copy()
+    other['pitcher_id'] = 400000
+    other.loc[other.index[::7], 'mlbam_pitch_name'] = 'XX'
+
+    return pd.concat([df, other], ignore_index=True)
+
+
+@pytest.mark.parametrize('order, scope', [(1, 'ab'), (2, 'ab'), (3, 'ab'),
+                                          (3, 'game')])
+def test_build(league, order, scope):
+    transitions = sequence.build(league, order, scope, ['count', 'stand'])
+
+    assert_counts(transitions, league)
+
+
+def test_update(league):
+    games = league['gid'].unique()
+    old = league[league['gid'].isin(games[:50])]
+    new = league[league['gid'].isin(games[50:])]
+
+    transitions = sequence.build(old, 3, 'ab', ['count', 'stand'])
+    assert_counts(transitions.update(new), league)
+
+
+def test_refresh(league):
+    transitions = sequence.build(league, 3, 'ab', ['count', 'stand'])
+
+    # The second pitcher's data is corrected to fewer games.
+    other = league[(league['pitcher_id'] == 400000) &
+                   league['gid'].isin(league['gid'].unique()[:10])]
+    refreshed = transitions.refresh(other)
+    assert_counts(refreshed, pd.concat([
+        league[league['pitcher_id'] != 400000], other]))
+
+    assert_counts(refreshed.refresh(other), pd.concat([
+        league[league['pitcher_id'] != 400000], other]))
+
+
+def test_add(league, tmp_path):
+    games = league['gid'].unique()
+    old = league[league['gid'].isin(games[:50]) &
+                 (league['pitcher_id'] != 400000)]
+    sequence.build(old, 3, 'ab', ['count', 'stand']).save(str(tmp_path))
+
+    # Saved counts are read-only unless loaded otherwise.
+    with pytest.raises(ValueError, match='mmap_mode'):
+        sequence.load(str(tmp_path)).add(433587, [], 'FF', balls=0,
+                                         strikes=0, stand='R')
+
+    # Add the rest pitch by pitch, new pitchers included, without
+    #  touching the saved counts.
+    transitions = sequence.load(str(tmp_path), mmap_mode='c')
+    for (pid, _, _), ab in league.drop(old.index).groupby(
+            ['pitcher_id', 'gid', 'ab_id'], sort=False):
+        previous = []
+        for pitch in ab.itertuples():
+            transitions.add(pid, previous, pitch.mlbam_pitch_name,
+                            balls=pitch.balls, strikes=pitch.strikes,
+                            stand=pitch.stand)
+            previous.append(pitch.mlbam_pitch_name)
+
+    assert_counts(transitions, league)
+    assert_counts(sequence.load(str(tmp_path)), old)
+
+    # Merging the grown transitions puts the pitchers back in order.
+    merged = transitions.update(league.iloc[:0])
+    assert list(merged.pitchers) == [400000, 433587]
+    assert np.array_equal(
+        merged.counts, sequence.build(league, 3, 'ab',
+                                      ['count', 'stand']).counts)
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['sequence.py'] + list(argv))
+    sequence.main()
+
+
+@pytest.fixture
+def saved(league, tmp_path, monkeypatch):
+    """Transitions of the first games saved by main (the input, output)."""
+
+    filename = str(tmp_path / 'league.csv')
+    league.to_csv(filename)
+    old = str(tmp_path / 'old.csv')
+    league[league['gid'].isin(league['gid'].unique()[:50])].to_csv(old)
+
+    out = str(tmp_path / 'sequence')
+    run(monkeypatch, '-i', old, '-o', out, '-n', '3', '-c', 'count,stand')
+
+    return filename, out
+
+
+def test_refresh_keeps_the_settings(saved, league, monkeypatch):
+    filename, out = saved
+
+    run(monkeypatch, '-i', filename, '-o', out, '-a')
+    assert_counts(sequence.load(out), league)
+
+    # The same settings may be given again.
+    run(monkeypatch, '-i', filename, '-o', out, '-a', '-n', '3',
+        '-s', 'ab', '-c', 'count,stand')
+    transitions = sequence.load(out)
+    assert (transitions.order, transitions.scope,
+            transitions.conditions) == (3, 'ab', ['count', 'stand'])
+    assert_counts(transitions, league)
+
+
+@pytest.mark.parametrize('argv', [['-n', '2'], ['-s', 'game'],
+                                  ['-c', 'count']])
+def test_refresh_rejects_other_settings(saved, monkeypatch, capsys, argv):
+    filename, out = saved
+    before = sequence.load(out).counts.copy()
+
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, '-i', filename, '-o', out, '-a', *argv)
+
+    assert e.value.code == 2
+    assert 'rebuild them without -a' in capsys.readouterr().out
+    assert np.array_equal(sequence.load(out).counts, before)
@@ -0,0 +1,214 @@
+"""
+Checks the micro-batching of the prediction service, its status codes
+when a pitcher or its model is missing, and that unknown pitchers don't
+re-read the registry.
+"""
+import json
+import os
+import threading
+
+try:
+    from urllib.request import Request, urlopen
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import Request, urlopen, HTTPError
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+from sklearn.linear_model import LogisticRegression
+
+import serve
+from fleet import REGISTRY
+from model import FEATURES
+
+
+SITUATION = {'ab_count': 1, 'speed_last': 0, 'fastball_last': -1,
+             'stand': 'R', 'strikes': 0, 'balls': 0, 'inning': 1,
+             'outs': 0, 'prior': 0.55}
+
+
+def write_registry(model_dir, registry):
+    with open(os.path.join(model_dir, REGISTRY), 'w') as f:
+        json.dump(registry, f)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    rng = np.random.RandomState(0)
+    X = rng.rand(40, len(FEATURES))
+    model = LogisticRegression().fit(X, (X[:, 0] > 0.5).astype(int))
+    joblib.dump({'model': model}, str(tmp_path / '1.joblib'))
+    (tmp_path / '3.joblib').write_bytes(b'not a model')
+
+    # A pitcher that never threw a fastball in training.
+    model = DummyClassifier().fit(X, np.zeros(len(X), dtype=int))
+    joblib.dump({'model': model}, str(tmp_path / '5.joblib'))
+
+    model = LogisticRegression().fit(X, (X[:, 1] > 0.3).astype(int))
+    joblib.dump({'model': model}, str(tmp_path / '6.joblib'))
+
+    write_registry(str(tmp_path), {
+        '1': {'model': '1.joblib'},
+        '2': {'model': '2.joblib'},
+        '3': {'model': '3.joblib'},
+        '4': {'error': "No pitches in the training or test seasons"},
+        '5': {'model': '5.joblib'},
+        '6': {'model': '6.joblib'},
+    })
+
+    return str(tmp_path)
+
+
+@pytest.fixture
+def server(model_dir):
+    predictor = serve.Predictor(model_dir)
+    httpd = serve.ThreadingHTTPServer(
+        ('127.0.0.1', 0), serve.handler(predictor))
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield 'http://127.0.0.1:%d' % httpd.server_address[1]
+
+    httpd.shutdown()
+    httpd.server_close()
+    predictor.close()
+
+
+def post(url, body):
+    request = Request(url + '/predict', json.dumps(body).encode('utf-8'))
+    try:
+        response = urlopen(request, timeout=10)
+    except HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8'))
+
+    return response.getcode(), json.loads(response.read().decode('utf-8'))
+
+
+@pytest.mark.parametrize('pid, code', [
+    (1, 200),
+    (5, 200),
+    # Not in the registry, or failed to train.
+    (9, 404),
+    (4, 404),
+    # In the registry, but the model file is missing or corrupt.
+    (2, 500),
+    (3, 500),
+])
+def test_status_codes(server, pid, code):
+    status, body = post(server, dict(SITUATION, pitcher_id=pid))
+
+    assert status == code
+    if code == 200:
+        assert 0 <= body['fastball'] <= 1
+    else:
+        assert body['error']
+
+
+def test_bad_requests(server):
+    assert post(server, SITUATION)[0] == 400
+    assert post(server, dict(SITUATION, pitcher_id=1, balls='x'))[0] == 400
+
+
+def test_unknown_pitchers_are_remembered(model_dir):
+    cache = serve.ModelCache(model_dir, retry=60)
+    reads = []
+    read_registry = cache._read_registry
+    cache._read_registry = lambda: reads.append(1) or read_registry()
+
+    for _ in range(3):
+        with pytest.raises(KeyError):
+            cache.get(9)
+    assert len(reads) == 1
+
+    # The pitcher is looked up again once retry seconds have passed,
+    #  and the registry is only read again if it changed.
+    cache.retry = 0
+    with pytest.raises(KeyError):
+        cache.get(9)
+    assert len(reads) == 2
+
+    with open(os.path.join(model_dir, REGISTRY), 'r') as f:
+        registry = json.load(f)
+    registry['9'] = registry['1']
+    write_registry(model_dir, registry)
+
+    assert cache.get(9) is not None
+    assert cache.get(9) is cache.get(9)
+    assert len(reads) == 3
+
+
+def situations(n):
+    """Situations that differ in every feature."""
+
+    rng = np.random.RandomState(1)
+    return [dict(zip(FEATURES, row)) for row in rng.rand(n, len(FEATURES))]
+
+
+def test_concurrent_requests_are_batched(model_dir, monkeypatch):
+    batches = []
+    probability = serve.fastball_probability
+
+    def counted(model, X):
+        batches.append(len(X))
+        return probability(model, X)
+
+    monkeypatch.setattr(serve, 'fastball_probability', counted)
+
+    # Long enough for every thread to get its request in.
+    predictor = serve.Predictor(model_dir, max_wait=0.5)
+    requests = [(pid, situation) for pid in [1, 5, 6]
+                for situation in situations(10)]
+    answers = [None] * len(requests)
+
+    def ask(i):
+        answers[i] = predictor.predict(*requests[i], timeout=10)
+
+    threads = [threading.Thread(target=ask, args=(i,))
+               for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    predictor.close()
+
+    # One batch, one predict call per pitcher.
+    assert sorted(batches) == [10, 10, 10]
+
+    # The same answers as one request at a time.
+    models = serve.ModelCache(model_dir)
+    for (pid, situation), answer in zip(requests, answers):
+        X = np.array([serve.situation_features(situation)])
+        assert answer == pytest.approx(
+            probability(models.get(pid), X)[0])
+        if pid == 5:
+            assert answer == 0.0
+
+    latency = predictor.latency()
+    assert latency['requests'] == len(requests)
+    assert 0 <= latency['p50'] <= latency['p99'] < 10000
+
+
+def test_batches_are_bounded(model_dir, monkeypatch):
+    batches = []
+    probability = serve.fastball_probability
+    monkeypatch.setattr(serve, 'fastball_probability', lambda model, X: (
+        batches.append(len(X)) or probability(model, X)))
+
+    predictor = serve.Predictor(model_dir, max_batch=4, max_wait=0.5)
+    pending = [predictor.submit(1, situation) for situation in situations(10)]
+    answers = [request.wait(10) for request in pending]
+    predictor.close()
+
+    assert sorted(batches) == [2, 4, 4]
+    assert len(answers) == 10
+    assert predictor.latency()['requests'] == 10
+
+
+def test_no_latency_without_requests(model_dir):
+    predictor = serve.Predictor(model_dir)
+    predictor.close()
+
+    assert predictor.latency() == {'requests': 0, 'p50': None, 'p99': None}
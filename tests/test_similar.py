@@ -0,0 +1,120 @@
+"""
+Checks the searches of the index against a brute force search, and that
+refreshing an index (-a) builds the new pitchers like the rest of it.
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import matchup
+import similar
+
+from conftest import SAMPLE
+
+
+NAMES = ['pitchers', 'batters', 'values', 'vectors', 'num_pitches']
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['similar.py'] + list(argv))
+    similar.main()
+
+
+def assert_same(index, other):
+    for name in NAMES:
+        assert np.array_equal(getattr(index, name), getattr(other, name))
+    assert index.metric == other.metric
+    assert index.min_pitches == other.min_pitches
+
+
+@pytest.fixture
+def league(tmp_path, sample):
+    """The sample and a second pitcher (a part of the sample)."""
+
+    other = sample[sample['gid'].isin(sample['gid'].unique()[:60])].copy()
+    other['pitcher_id'] = 400000
+    filename = str(tmp_path / '400000.csv')
+    other.to_csv(filename)
+
+    return filename, pd.concat([sample, other], ignore_index=True)
+
+
+def test_refresh_keeps_the_settings(tmp_path, monkeypatch, league):
+    filename, df = league
+    out = str(tmp_path / 'similar')
+
+    run(monkeypatch, '-i', SAMPLE, '-o', out, '-m', '20', '-d', 'cosine')
+    run(monkeypatch, '-i', filename, '-o', out, '-a')
+
+    with open(os.path.join(out, 'similar.json'), 'r') as f:
+        assert json.load(f)['min_pitches'] == 20
+    assert_same(similar.load(out), similar.build(df, 20, 'cosine'))
+
+    # The same settings may be given again.
+    run(monkeypatch, '-i', filename, '-o', out, '-a', '-m', '20')
+    assert_same(similar.load(out), similar.build(df, 20, 'cosine'))
+
+
+@pytest.mark.parametrize('argv', [['-m', '0'], ['-d', 'euclidean']])
+def test_refresh_rejects_other_settings(tmp_path, monkeypatch, capsys,
+                                        league, argv):
+    filename, _ = league
+    out = str(tmp_path / 'similar')
+
+    run(monkeypatch, '-i', SAMPLE, '-o', out, '-m', '20', '-d', 'cosine')
+    with pytest.raises(SystemExit) as e:
+        run(monkeypatch, '-i', filename, '-o', out, '-a', *argv)
+
+    assert e.value.code == 2
+    assert 'rebuild it without -a' in capsys.readouterr().out
+    assert len(similar.load(out)) == len(similar.build(
+        pd.read_csv(SAMPLE, index_col=0), 20))
+
+
+def brute_force(df, pid, vector, metric, min_pitches=0):
+    """The distances of all the batters of a pitcher, one at a time."""
+
+    summary = matchup.summary(df, min_pitches=min_pitches).sort_index()
+    vectors = similar.normalize(summary[matchup.COLUMNS]).loc[pid]
+
+    distances = {}
+    for batter_id, row in vectors.iterrows():
+        v = row.values.astype(np.float32).astype(np.float64)
+        if metric == 'cosine':
+            norm = np.linalg.norm(v) * np.linalg.norm(vector)
+            distances[batter_id] = 1 - (v.dot(vector) / norm if norm else 0)
+        else:
+            distances[batter_id] = np.linalg.norm(v - vector)
+
+    return pd.Series(distances).sort_values(kind='mergesort')
+
+
+@pytest.mark.parametrize('metric', similar.METRICS)
+@pytest.mark.parametrize('min_pitches', [0, 20])
+def test_searches_match_brute_force(sample, metric, min_pitches):
+    index = similar.build(sample, min_pitches, metric)
+    pid = 433587
+    batter_id = int(index.batters[len(index) // 2])
+    vector = np.asarray(index.vector(pid, batter_id), dtype=np.float64)
+    expected = brute_force(sample, pid, vector, metric, min_pitches)
+
+    found = index.query(pid, vector, k=15)
+    assert len(found) == 15
+    np.testing.assert_allclose(
+        found['distance'].values, expected.values[:15], atol=1e-9)
+    assert set(found['batter_id']) <= set(
+        expected[expected <= expected.iloc[14] + 1e-9].index)
+
+    neighbours = index.neighbours(pid, batter_id, k=10)
+    assert batter_id not in set(neighbours['batter_id'])
+    others = expected.drop(batter_id)
+    np.testing.assert_allclose(
+        neighbours['distance'].values, others.values[:10], atol=1e-9)
+
+    # Every batter of the pitcher, when asked for more.
+    assert len(index.query(pid, vector, k=len(expected) + 5)) == \
+        len(expected)
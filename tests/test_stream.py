@@ -0,0 +1,61 @@
+"""
+Checks the streaming tendency against the batch one and the original
+loop.
+"""
+import pandas as pd
+import pytest
+
+import stream
+import tendency
+
+from test_tendency import loop_averages
+
+
+@pytest.mark.parametrize('n', [10, 25])
+@pytest.mark.parametrize('batch_size', [1, 37])
+def test_replay_matches_batch(sample, n, batch_size):
+    acc = stream.TendencyAccumulator('mlbam_pitch_name', n)
+    for start in range(0, len(sample), batch_size):
+        acc.extend(sample.iloc[start:start + batch_size])
+
+    pd.testing.assert_frame_equal(
+        acc.snapshot(),
+        tendency.window_averages(sample, 'mlbam_pitch_name', n))
+
+    if batch_size > 1:
+        return
+
+    expected = loop_averages(sample, 'mlbam_pitch_name', n)
+    snapshot = acc.snapshot()
+    for window, values in expected.items():
+        for value in snapshot.columns:
+            assert snapshot.loc[window, value] == \
+                pytest.approx(values.get(value, 0.0))
+
+
+def test_from_frame_then_stream(sample):
+    games = sample['gid'].unique()
+    seen = sample['gid'].isin(games[:100])
+
+    acc = stream.TendencyAccumulator.from_frame(
+        sample[seen], 'mlbam_pitch_name', 10)
+    acc.extend(sample[~seen])
+
+    pd.testing.assert_frame_equal(
+        acc.snapshot(),
+        tendency.window_averages(sample, 'mlbam_pitch_name', 10))
+
+
+def test_end_game_drops_the_open_window():
+    acc = stream.TendencyAccumulator('pitch', 2)
+    for value in ['FF', 'FF', 'CU']:
+        acc.add('a', value)
+    acc.end_game('a')
+    for value in ['SL', 'SL']:
+        acc.add('b', value)
+
+    # Only game a got past its first window, game b may still go on.
+    totals, games, column_types = acc.window_totals()
+    assert games.tolist() == [1]
+    assert dict(zip(column_types, totals[0])) == {'FF': 2, 'SL': 0, 'CU': 0}
+    assert 'a' not in acc.current
@@ -0,0 +1,55 @@
+"""
+Checks the game page parser against pd.read_html.
+"""
+import glob
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import generate
+import table
+
+
+def read_html(html):
+    return pd.read_html(io.StringIO(html), header=0, flavor='lxml')[0]
+
+
+def test_generated_pages_match_read_html(tmp_path):
+    rng = np.random.RandomState(0)
+    generate.write_html(generate.season(400000, 2008, 5, rng), str(tmp_path))
+
+    files = glob.glob(os.path.join(str(tmp_path), '*', '*', '*.html'))
+    assert len(files) == 5
+    for filename in files:
+        with open(filename, 'r') as f:
+            html = f.read()
+        pd.testing.assert_frame_equal(table.read(filename), read_html(html))
+
+
+@pytest.mark.parametrize('html', [
+    # Markup, entities and whitespace inside of the cells, only the
+    #  first table is read.
+    '<html><body><p>x</p><TABLE border=1><tr><th>a</th><th> b  c </th>'
+    '<th>d</th></tr>\n<tr><td>1</td><td><b>x &amp; y</b>\n z</td>'
+    '<td>1.5</td></tr>\n<tr><td>2</td><td>In play, out(s)</td><td></td>'
+    '</tr></TABLE><table><tr><td>other</td></tr></table>',
+    # Cells without closing tags.
+    '<table><tr><th>a<th>b<tr><td>1<td>x</table>',
+    # Rows longer and shorter than the header.
+    '<table><tr><th>a</th><th>b</th></tr><tr><td>1</td><td>2</td>'
+    '<td>3</td></tr><tr><td>4</td></tr></table>',
+    '<table><tr><th>a</th><th>b</th><th>c</th></tr><tr><td>1</td></tr>'
+    '<tr><td>4</td><td>"q"</td></tr></table>',
+])
+def test_irregular_pages_match_read_html(html):
+    pd.testing.assert_frame_equal(table.parse(html), read_html(html))
+    pd.testing.assert_frame_equal(
+        table.parse(html.encode('utf-8')), read_html(html))
+
+
+def test_no_table():
+    with pytest.raises(ValueError):
+        table.parse('<html><body>No games today.</body></html>')
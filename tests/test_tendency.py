@@ -0,0 +1,79 @@
+"""
+Checks the vectorized window counts against the original per-game loop
+of pitch-tendency.py.
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tendency
+
+
+def loop_averages(df, column_name, pitches_per_window):
+    """
+    The original sliding window loop, i.e. the average occurrences of
+    every value per window, {window: {value: average}}.
+    """
+
+    pitches_by_range = {}
+    for gid, gid_group in df.groupby('gid'):
+        num_pitches = gid_group.shape[0]
+
+        i = pitches_per_window
+        while i < num_pitches:
+            pitches = gid_group.iloc[i - pitches_per_window:i]
+            pitch_counts = Counter(dict(pitches[column_name].value_counts()))
+            pitches_by_range.setdefault(i, []).append(pitch_counts)
+            i += pitches_per_window
+
+    averages = {}
+    for i, pitch_counts in sorted(pitches_by_range.items()):
+        total = Counter()
+        for pitch_count in pitch_counts:
+            total += pitch_count
+        averages[i // pitches_per_window - 1] = dict(
+            (k, float(v) / len(pitch_counts)) for k, v in total.items())
+
+    return averages
+
+
+@pytest.mark.parametrize('column_name', ['mlbam_pitch_name',
+                                         'fastball_binary'])
+@pytest.mark.parametrize('n', [10, 25, 120, 200])
+def test_window_averages_match_loop(sample, column_name, n):
+    expected = loop_averages(sample, column_name, n)
+    avgs = tendency.window_averages(sample, column_name, n)
+
+    assert list(avgs.index) == sorted(expected)
+    for window, values in expected.items():
+        for value in avgs.columns:
+            assert avgs.loc[window, value] == \
+                pytest.approx(values.get(value, 0.0))
+
+
+def test_short_games_are_left_out():
+    # Games of 3, 10 and 11 pitches: only the last one reaches past the
+    #  first window of 10, none past the second.
+    df = pd.DataFrame({
+        'gid': ['a'] * 3 + ['b'] * 10 + ['c'] * 11,
+        'pitch': ['FF'] * 3 + ['CU'] * 10 + ['FF'] * 5 + ['SL'] * 6,
+    })
+
+    totals, games, column_types = tendency.window_totals(df, 'pitch', 10)
+
+    assert list(games) == [1]
+    assert column_types == ['CU', 'FF', 'SL']
+    assert totals.tolist() == [[0, 5, 5]]
+    assert loop_averages(df, 'pitch', 10) == {0: {'FF': 5.0, 'SL': 5.0}}
+
+
+def test_no_complete_windows():
+    df = pd.DataFrame({'gid': ['a'] * 4, 'pitch': ['FF'] * 4})
+
+    avgs = tendency.window_averages(df, 'pitch', 10)
+
+    assert len(avgs) == 0
+    assert list(avgs.columns) == ['FF']
+    assert np.all(tendency.window_totals(df, 'pitch', 4)[1] == [])
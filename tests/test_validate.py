@@ -0,0 +1,99 @@
+"""
+Checks the vectorized inning validator against a python loop, and the
+chunked cleaning against cleaning the whole file.
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import store
+import validate
+
+from conftest import SAMPLE
+
+
+def loop_report(df):
+    """The checks of every (game, inning), one pitch at a time."""
+
+    innings = {}
+    last = None
+    for row in df.itertuples(index=False):
+        key = (row.gid, row.inning)
+        inning = innings.setdefault(key, {
+            'pitcher_id': row.pitcher_id, 'gid': row.gid,
+            'inning': row.inning, 'pitches': 0, 'outs': 0, 'count': 0,
+            'ab_count': 0, 'order': 0})
+
+        inning['pitches'] += 1
+        inning['outs'] += row.resulting_outs
+        if row.ab_count > row.ab_total or row.ab_count < 1:
+            inning['ab_count'] += 1
+        if last is not None and last.gid == row.gid:
+            if last.ab_id == row.ab_id and (
+                    row.balls < last.balls or row.strikes < last.strikes):
+                inning['count'] += 1
+            if row.pitch_in_game <= last.pitch_in_game or \
+                    row.id <= last.id:
+                inning['order'] += 1
+        last = row
+
+    return pd.DataFrame(list(innings.values()),
+                        columns=validate.REPORT_COLUMNS)
+
+
+def test_check_matches_loop(sample):
+    _, report = validate.check(sample)
+    expected = loop_report(sample)
+
+    assert len(report) == len(expected)
+    for column in validate.REPORT_COLUMNS:
+        assert report[column].tolist() == expected[column].tolist(), column
+
+
+def test_clean_drops_failed_innings(sample):
+    clean, quarantine = validate.clean(sample)
+
+    assert len(quarantine) == 7
+    assert len(clean) + quarantine['pitches'].sum() == len(sample)
+
+    # What is left passes every check.
+    again, none = validate.clean(clean)
+    assert len(none) == 0
+    assert len(again) == len(clean)
+
+
+@pytest.mark.parametrize('chunksize', [500, 4096])
+def test_chunks_match_whole_file(chunksize):
+    clean, quarantine = validate.clean(store.read(SAMPLE))
+
+    parts = list(validate.stream(store.chunks(SAMPLE, chunksize=chunksize)))
+    assert len(parts) > 1
+
+    chunked = pd.concat([df for df, _ in parts])
+    pd.testing.assert_frame_equal(
+        chunked.reset_index(drop=True), clean.reset_index(drop=True),
+        check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(
+        pd.concat([q for _, q in parts], ignore_index=True), quarantine)
+
+
+def test_rerun_replaces_the_pitcher(tmp_path, monkeypatch):
+    clean, _ = validate.clean(store.read(SAMPLE))
+    out = str(tmp_path / 'store')
+    monkeypatch.setattr(sys, 'argv', [
+        'validate.py', '-i', SAMPLE, '-o', out, '-b', '5000',
+        '-q', str(tmp_path / 'quarantine.csv')])
+
+    validate.main()
+    validate.main()
+
+    assert len(store.read(out)) == len(clean)
+
+    # The store can't be cleaned into itself.
+    monkeypatch.setattr(sys, 'argv', [
+        'validate.py', '-i', os.path.join(out, '433587'), '-o', out])
+    with pytest.raises(SystemExit):
+        validate.main()
+    assert len(store.read(out)) == len(clean)
@@ -12,7 +12,10 @@ The style guide follows the strict python PEP 8 guidelines.
 @requires Python >=2.7
 @copyright 2014
 """
+import csv
 import getopt
+import json
+import multiprocessing
 import os
 import re
 import shutil
@@ -20,13 +23,170 @@ import sys
 
 import pandas as pd
 
+import instrument
+import store
+import table
+
+from filter import INDEX, read_index
+
+
+def compress(pid, files, out_dir, fmt='csv', incremental=False):
+    """
+    Reads in every game file for one pitcher and saves the games
+    as a single csv file (or to the parquet store).
+
+    In incremental mode only the game files that are not in the
+    pitcher's manifest yet are read and appended to the output. If
+    an ingested file has changed since, or there is output without a
+    manifest, the pitcher is rebuilt from scratch.
+
+    Returns the pitcher id and whether the pitcher was processed.
+    """
+
+    outfile = output(out_dir, pid, fmt)
+    manifest_file = os.path.join(out_dir, pid + ".manifest.json")
+
+    # Determine which files have not been ingested yet.
+    names = dict((os.path.basename(file), file) for file in files)
+    manifest = {}
+    if incremental and os.path.exists(manifest_file):
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+
+    append = bool(manifest) and os.path.exists(outfile) and all(
+        _unchanged(names.get(name), entry)
+        for name, entry in manifest.items())
+    if append:
+        files = [
+            file for file in files
+            if not os.path.basename(file) in manifest]
+        # Nothing new for this pitcher.
+        if not files:
+            return pid, True
+
+    with instrument.stage('compress-pitcher', pitcher_id=pid) as stats:
+        try:
+            # Parse every game and concatenate them once at the end.
+            df = pd.concat([table.read(file) for file in sorted(files)])
+            stats.rows = len(df)
+            if stats.enabled:
+                stats.bytes_read = sum(
+                    os.path.getsize(file) for file in files)
+                before = instrument.size(outfile) if append else 0
+
+            if not append and os.path.exists(outfile):
+                # Start over, i.e. drop the existing output.
+                if fmt == 'parquet':
+                    shutil.rmtree(outfile)
+                else:
+                    os.remove(outfile)
+
+            if fmt == 'parquet':
+                # Save to the store, new games go to new part files.
+                store.write(df, out_dir)
+            elif append:
+                # Add the new games to the end of the csv file, the
+                #  columns have to line up with the existing header.
+                with open(outfile, 'r') as f:
+                    header = next(csv.reader(f))[1:]
+                df.reindex(columns=header).to_csv(
+                    outfile, mode='a', header=False)
+            else:
+                # Save to disk as a csv file.
+                df.to_csv(outfile)
+        except Exception as e:
+            # One bad pitcher doesn't stop the others.
+            stats.error = str(e) or e.__class__.__name__
+            return pid, False
+
+        if stats.enabled:
+            stats.bytes_written = instrument.size(outfile) - before
+
+    # Record the files that have been ingested.
+    if incremental:
+        if not append:
+            manifest = {}
+        manifest.update(
+            (os.path.basename(file), _fingerprint(file)) for file in files)
+
+        with open(manifest_file + ".tmp", 'w') as f:
+            json.dump(manifest, f)
+        os.rename(manifest_file + ".tmp", manifest_file)
+
+    return pid, True
+
+
+def pitcher_files(path):
+    """
+    Finds the game files for every pitcher. The path is either the
+    pitcher-based folder structure from filter.py or the index it
+    writes in index mode (or a folder containing the index).
+    """
+
+    if os.path.isfile(os.path.join(path, INDEX)):
+        path = os.path.join(path, INDEX)
+    if os.path.isfile(path):
+        return read_index(path)
+
+    games = {}
+    # Traverse the root folder that contains sub folders
+    #  that represent each pitcher.
+    for root, dirs, _ in os.walk(path):
+        # Traverse each folder in the root.
+        for pid in dirs:
+            files = games.setdefault(pid, [])
+            for proot, _, pfiles in os.walk(os.path.join(root, pid)):
+                files.extend(os.path.join(proot, file) for file in pfiles)
+
+    return games
+
+
+def output(out_dir, pid, fmt):
+    """
+    The output of a pitcher, a csv file or a directory in the store.
+    """
+
+    if fmt == 'parquet':
+        return os.path.join(out_dir, pid)
+
+    return os.path.join(out_dir, pid + ".csv")
+
+
+def _fingerprint(file):
+    """The manifest entry of a game file (see store.fingerprint())."""
+
+    with open(file, 'rb') as f:
+        return store.fingerprint(f.read())
+
+
+def _unchanged(file, entry):
+    """
+    Determines if a game file is the one in a manifest entry (the size
+    is compared first, so only files of the same size are hashed).
+    """
+
+    return file is not None and os.path.isfile(file) and \
+        os.path.getsize(file) == entry[0] and _fingerprint(file) == entry
+
+
+def _compress(args):
+    """
+    Unpacks the arguments for compress (in a worker process). A pitcher
+    that fails is reported as not processed.
+    """
+
+    try:
+        return compress(*args)
+    except Exception:
+        return args[0], False
+
 
 def main():
     """Main execution."""
 
     # Determine command line arguments.
     try:
-        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:')
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:j:f:a')
     except getopt.GetoptError:
         usage()
         sys.exit(2)
@@ -43,36 +203,51 @@ def main():
             usage()
             sys.exit(2)
 
+    fmt = opts.get('f', 'csv')
+    incremental = 'a' in opts
+    if not fmt in ['csv', 'parquet']:
+        usage()
+        sys.exit(2)
+
     # Make sure the output directory exists.
     if not os.path.exists(opts['o']):
         os.makedirs(opts['o'])
 
-    # Traverse the root folder that contains sub folders
-    #  that represent each pitcher.
-    for root, dirs, _ in os.walk(opts['i']):
-        # Traverse each folder in the root.
-        for pid in dirs:
-            outfile = os.path.join(opts['o'], pid + ".csv")
-
-            # Check if this pitcher was already processed.
-            if os.path.isfile(outfile):
-                continue
-
-            for proot, _, files in os.walk(os.path.join(root, pid)):
-                try:
-                    # Read in the first game for this pitcher.
-                    with open(os.path.join(proot, files[0]), 'r') as f:
-                        df = pd.read_html(f.read(), header=0)[0]
-                    # Read in the subsequent games and append to the
-                    #  running DataFrame.
-                    for file in files[1:]:
-                        with open(os.path.join(proot, file), 'r') as f:
-                            df = df.append(pd.read_html(f.read(), header=0)[0])
-                    # Save to disk as a csv file.
-                    df.to_csv(outfile)
-                except ValueError:
-                    print("Error processing " + pid)
-                    continue
+    # Gather the game files for every pitcher that still
+    #  has to be processed.
+    tasks = []
+    for pid, files in sorted(pitcher_files(opts['i']).items()):
+        # Check if this pitcher was already processed.
+        if not incremental and os.path.exists(output(opts['o'], pid, fmt)):
+            continue
+
+        tasks.append((pid, files, opts['o'], fmt, incremental))
+
+    # Compress the pitchers in parallel, every pitcher is written
+    #  to disk as soon as its worker finishes.
+    with instrument.stage('compress', pitchers=len(tasks)) as stats:
+        stats.rows = sum(len(task[1]) for task in tasks)
+        if stats.enabled:
+            before = instrument.size(opts['o'])
+
+        workers = int(opts.get('j', 1))
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            results = pool.imap_unordered(_compress, tasks)
+        else:
+            pool = None
+            results = (_compress(task) for task in tasks)
+
+        for pid, success in results:
+            if not success:
+                print("Error processing " + pid)
+
+        if pool:
+            pool.close()
+            pool.join()
+
+        if stats.enabled:
+            stats.bytes_written = instrument.size(opts['o']) - before
 
 
 def usage():
@@ -80,11 +255,20 @@ def usage():
 
     print("\n" +
     "The following are arguments required:\n" +
-    "\t-i: the input directory.\n" +
+    "\t-i: the input directory (or index file from filter.py).\n" +
     "\t-o: the output directory.\n" +
     "\n" +
+    "The following arguments are optional:\n" +
+    "\t-j: the number of worker processes (default 1).\n" +
+    "\t-f: the output format, csv (default) or parquet.\n" +
+    "\t-a: incremental mode, only add the games that are new since\n" +
+    "\t    the last run to the existing output.\n" +
+    "\n" +
     "Example Usage:\n" +
     "\tpython compress.py -i \"./pitchers\" -o \"./pitchers-compressed\"\n" +
+    "\tpython compress.py -i \"./pitchers\" -o \"./pitchers-compressed\" -j 8\n" +
+    "\tpython compress.py -i \"./pitchers\" -o \"./store\" -f parquet\n" +
+    "\tpython compress.py -i \"./pitchers\" -o \"./pitchers-compressed\" -a\n" +
     "\n")
 
 
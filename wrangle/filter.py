@@ -18,13 +18,19 @@ import re
 import shutil
 import sys
 
+import instrument
+
+
+# The name of the index file written in index mode.
+INDEX = "index.tsv"
+
 
 def main():
     """Main execution."""
 
     # Determine command line arguments.
     try:
-        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:')
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:o:m:')
     except getopt.GetoptError:
         usage()
         sys.exit(2)
@@ -41,22 +47,85 @@ def main():
             usage()
             sys.exit(2)
 
-    # Use a reg expression to find the PID which is in the file name.
-    regex = re.compile("pid_(?P<pid>\d*?)\.html|$")
-    for root, dirs, files in os.walk(opts['i']):
-        for file in files:
-            r = regex.search(file)
-            pid = r.groups()[0]
-            # Make sure we can find the PID in the file name.
-            if pid:
-                # Copy the file over to the PID's folder.
-                outdir = os.path.join(opts['o'], pid)
-                if not os.path.exists(outdir):
-                    os.makedirs(outdir)
+    mode = opts.get('m', 'copy')
+    if not mode in ['copy', 'hardlink', 'symlink', 'index']:
+        usage()
+        sys.exit(2)
 
-                shutil.copyfile(
-                    os.path.join(root, file),
-                    os.path.join(outdir, file))
+    # The game files for each pitcher (only used to build the index).
+    games = {}
+
+    with instrument.stage('filter', mode=mode) as stats:
+        # Use a reg expression to find the PID which is in the file name.
+        regex = re.compile(r"pid_(?P<pid>\d*?)\.html|$")
+        for root, dirs, files in os.walk(opts['i']):
+            for file in files:
+                r = regex.search(file)
+                pid = r.groups()[0]
+                # Make sure we can find the PID in the file name.
+                if pid:
+                    src = os.path.join(root, file)
+
+                    stats.rows += 1
+
+                    # Only remember where the file is.
+                    if mode == 'index':
+                        games.setdefault(pid, []).append(
+                            os.path.abspath(src))
+                        continue
+
+                    # Copy (or link) the file over to the PID's folder.
+                    outdir = os.path.join(opts['o'], pid)
+                    if not os.path.exists(outdir):
+                        os.makedirs(outdir)
+
+                    dst = os.path.join(outdir, file)
+                    if mode == 'copy':
+                        shutil.copyfile(src, dst)
+                        if stats.enabled:
+                            stats.bytes_read += os.path.getsize(src)
+                            stats.bytes_written += os.path.getsize(src)
+                    elif not os.path.lexists(dst):
+                        if mode == 'hardlink':
+                            os.link(src, dst)
+                        else:
+                            os.symlink(os.path.abspath(src), dst)
+
+        if mode == 'index':
+            write_index(games, opts['o'])
+            if stats.enabled:
+                stats.bytes_written += os.path.getsize(
+                    os.path.join(opts['o'], INDEX))
+
+
+def write_index(games, out_dir):
+    """
+    Writes the index of game files per pitcher, one
+    "pitcher_id<tab>path" line per game file.
+    """
+
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    with open(os.path.join(out_dir, INDEX), 'w') as f:
+        for pid in sorted(games):
+            for path in sorted(games[pid]):
+                f.write(pid + "\t" + path + "\n")
+
+
+def read_index(filename):
+    """
+    Reads an index written by write_index into a dictionary
+    of pitcher id -> game files.
+    """
+
+    games = {}
+    with open(filename, 'r') as f:
+        for line in f:
+            pid, path = line.rstrip("\n").split("\t", 1)
+            games.setdefault(pid, []).append(path)
+
+    return games
 
 
 def usage():
@@ -67,8 +136,16 @@ def usage():
     "\t-i: the input directory.\n" +
     "\t-o: the output directory.\n" +
     "\n" +
+    "The following arguments are optional:\n" +
+    "\t-m: how the files are sorted, one of\n" +
+    "\t    copy (default): copy the files to the pitcher folders,\n" +
+    "\t    hardlink/symlink: link the files into the pitcher folders,\n" +
+    "\t    index: only write an index of the files per pitcher\n" +
+    "\t    (index.tsv), which compress.py reads directly.\n" +
+    "\n" +
     "Example Usage:\n" +
     "\tpython filter.py -i \"./data\" -o \"./pitchers\"\n" +
+    "\tpython filter.py -i \"./data\" -o \"./pitchers\" -m index\n" +
     "\n")
 
 
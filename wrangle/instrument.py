@@ -0,0 +1,265 @@
+"""
+Lightweight instrumentation of the pipeline stages (the crawl, filter,
+compress and the analysis scripts).
+
+Every stage records its wall time, the rows (pitches or game files) it
+processed, the bytes it read and wrote and the peak memory of its
+process as one json line in a log file:
+
+  {"stage": "compress-pitcher", "pitcher_id": "433587", "seconds": 1.52,
+   "rows": 24161, "bytes_read": 31804412, "bytes_written": 5109838,
+   "peak_rss_mb": 212.4, "pid": 4242, "start": "2014-05-01T10:12:03"}
+
+Nothing is recorded unless the log file is set in the environment
+(PITCHING_METRICS=metrics.jsonl). With PITCHING_PROFILE=profiles/ every
+stage is also run under cProfile and its profile dumped to that
+directory (see the pstats module to read it).
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import cProfile
+import getopt
+import json
+import os
+import resource
+import sys
+import time
+
+from datetime import datetime
+
+import pandas as pd
+
+
+# The environment variables of the log file and the profile directory.
+LOG = "PITCHING_METRICS"
+PROFILE = "PITCHING_PROFILE"
+
+# The process id and profiler of the stage being profiled. Only one
+#  profiler can run at a time, nested stages are not profiled on their
+#  own. A forked worker process inherits the profiler of its parent,
+#  which is stopped (in the worker) so the worker's stages get theirs.
+_profiling = [None]
+
+
+class Stage(object):
+    """
+    The measurements of one run of a stage. Count the work done with
+    rows, bytes_read and bytes_written while the stage runs (and set
+    error if the stage failed without raising). Counts that cost work
+    of their own (e.g. the size of the output) are only worth taking
+    when the stage is enabled.
+    """
+
+    def __init__(self, name, log=None, profile_dir=None, **fields):
+        self.name = name
+        self.fields = fields
+
+        self.log = log if log is not None else os.environ.get(LOG)
+        self.profile_dir = profile_dir if profile_dir is not None else \
+            os.environ.get(PROFILE)
+
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.error = None
+
+        self._start = None
+        self._started = None
+        self._profiler = None
+
+    @property
+    def enabled(self):
+        """Whether the record of the stage is written to a log."""
+
+        return bool(self.log)
+
+    def start(self):
+        """Starts the clock (and the profiler)."""
+
+        self._started = datetime.now()
+        self._start = time.time()
+
+        if self.profile_dir:
+            profiling = _profiling[0]
+            if profiling is not None and profiling[0] != os.getpid():
+                profiling[1].disable()
+                profiling = None
+
+            if profiling is None:
+                self._profiler = cProfile.Profile()
+                _profiling[0] = (os.getpid(), self._profiler)
+                self._profiler.enable()
+
+        return self
+
+    def finish(self, error=None):
+        """
+        Stops the clock and writes the record of the stage to the log.
+
+        Returns the record.
+        """
+
+        seconds = time.time() - self._start
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            _profiling[0] = None
+            if not os.path.exists(self.profile_dir):
+                os.makedirs(self.profile_dir)
+            self._profiler.dump_stats(os.path.join(
+                self.profile_dir, self.name + "-" + str(os.getpid()) +
+                "-" + self._started.strftime("%Y%m%d%H%M%S%f") + ".prof"))
+            self._profiler = None
+
+        record = {
+            'stage': self.name,
+            'start': self._started.isoformat(),
+            'seconds': seconds,
+            'rows': self.rows,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'peak_rss_mb': peak_rss_mb(),
+            'pid': os.getpid(),
+        }
+        record.update(self.fields)
+        if error is None:
+            error = self.error
+        if error is not None:
+            record['error'] = error
+
+        if self.log:
+            write(record, self.log)
+
+        return record
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, kind, value, traceback):
+        self.finish(None if kind is None else
+                    str(value) or kind.__name__)
+
+
+def stage(name, **fields):
+    """
+    Measures a stage, e.g.
+
+      with instrument.stage('filter') as s:
+          ...
+          s.rows += 1
+
+    The extra fields (e.g. pitcher_id=...) are added to the record.
+    """
+
+    return Stage(name, **fields)
+
+
+def write(record, log):
+    """
+    Appends a record to the log. Every record is a single write, so the
+    worker processes of a stage can share the log.
+    """
+
+    line = json.dumps(record, sort_keys=True) + "\n"
+    with open(log, 'a') as f:
+        f.write(line)
+
+
+def read(log):
+    """Reads the records of a log into a DataFrame."""
+
+    with open(log, 'r') as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def summary(records):
+    """
+    The totals of every stage: the number of runs, the seconds, rows
+    and bytes summed and the largest peak memory.
+    """
+
+    return records.groupby('stage').agg(
+        runs=('seconds', 'size'),
+        seconds=('seconds', 'sum'),
+        rows=('rows', 'sum'),
+        bytes_read=('bytes_read', 'sum'),
+        bytes_written=('bytes_written', 'sum'),
+        peak_rss_mb=('peak_rss_mb', 'max'))
+
+
+def peak_rss_mb():
+    """
+    The peak memory of the process (and its finished worker processes)
+    so far in MB.
+    """
+
+    # ru_maxrss is in KB on linux (and bytes on os x).
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / scale
+
+
+def size(path):
+    """The size in bytes of a file or everything below a directory."""
+
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            total += os.path.getsize(os.path.join(root, file))
+
+    return total
+
+
+def main():
+    """Main execution."""
+
+    # Determine command line arguments.
+    try:
+        rawopts, _ = getopt.getopt(sys.argv[1:], 'i:')
+    except getopt.GetoptError:
+        usage()
+        sys.exit(2)
+
+    opts = {}
+
+    # Process each command line argument.
+    for o, a in rawopts:
+        opts[o[1]] = a
+
+    # The following arguments are required in all cases.
+    for opt in ['i']:
+        if not opt in opts:
+            usage()
+            sys.exit(2)
+
+    print(summary(read(opts['i'])).to_string())
+
+
+def usage():
+    """Prints the usage of the program."""
+
+    print("\n" +
+    "The following are arguments required:\n" +
+    "\t-i: the log file (the PITCHING_METRICS of the stages).\n" +
+    "\n" +
+    "Example Usage:\n" +
+    "\tPITCHING_METRICS=metrics.jsonl python compress.py -i ... -o ...\n" +
+    "\tpython instrument.py -i \"./metrics.jsonl\"\n" +
+    "\n")
+
+
+"""Main execution."""
+if __name__ == "__main__":
+    main()
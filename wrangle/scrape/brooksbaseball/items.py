@@ -8,6 +8,17 @@
 import scrapy
 
 
-# Not used!
 class GameItem(scrapy.Item):
-    pass
+    """The stats page of one pitcher during one game."""
+
+    year = scrapy.Field()
+    month = scrapy.Field()
+    day = scrapy.Field()
+    game_id = scrapy.Field()
+    pitcher_id = scrapy.Field()
+
+    # The name of the game file (as it would be stored on disk).
+    game_file = scrapy.Field()
+
+    # The raw html of the "expanded tabled data" page.
+    body = scrapy.Field()
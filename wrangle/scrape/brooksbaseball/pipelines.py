@@ -5,8 +5,111 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: http://doc.scrapy.org/en/latest/topics/item-pipeline.html
 
+import json
+import os
+import sys
+
+import pandas as pd
+
+from scrapy.exceptions import DropItem
+
+# The table parser and the store live with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+import store
+import table
+
+
+class StorePipeline(object):
+    """
+    Parses the games as they are scraped and writes them to the
+    columnar store (see wrangle/store.py) in bulk.
+
+    The games are buffered per pitcher and written once a pitcher has
+    STORE_BATCH_ROWS pitches buffered (or STORE_MAX_ROWS pitches are
+    buffered in total, or the crawl ends). Every written game is added
+    to the pitcher's manifest, the same one compress.py -a keeps, so
+    later crawls can skip it. Pages without a table (e.g. an error page
+    of the site) are dropped and not recorded, so later crawls request
+    them again.
+    """
+
+    def __init__(self, store_path, batch_rows, max_rows):
+        self.store_path = store_path
+        self.batch_rows = batch_rows
+        self.max_rows = max_rows
+
+        # The parsed games (and their game files) waiting to be written.
+        self.games = {}
+        self.rows = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            crawler.settings.get('STORE_PATH'),
+            crawler.settings.getint('STORE_BATCH_ROWS'),
+            crawler.settings.getint('STORE_MAX_ROWS'))
+
+    def open_spider(self, spider):
+        if not os.path.exists(self.store_path):
+            os.makedirs(self.store_path)
 
-# Note used!
-class BrooksbaseballPipeline(object):
     def process_item(self, item, spider):
+        try:
+            df = table.parse(item['body'])
+        except ValueError:
+            raise DropItem("No table in " + item['game_file'])
+
+        pid = item['pitcher_id']
+        self.games.setdefault(pid, []).append(
+            (item['game_file'], store.fingerprint(item['body']), df))
+        self.rows[pid] = self.rows.get(pid, 0) + df.shape[0]
+
+        if self.rows[pid] >= self.batch_rows:
+            self.flush(pid)
+        elif sum(self.rows.values()) >= self.max_rows:
+            for pid in list(self.games):
+                self.flush(pid)
+
         return item
+
+    def close_spider(self, spider):
+        # One pitcher that can't be written doesn't stop the others.
+        for pid in list(self.games):
+            try:
+                self.flush(pid)
+            except Exception as e:
+                spider.logger.error(
+                    "Failed to store pitcher " + pid + ": " + str(e))
+
+    def flush(self, pid):
+        """
+        Writes the buffered games of a pitcher to the store. The games
+        stay buffered if the write fails.
+        """
+
+        games = self.games[pid]
+
+        store.write(pd.concat([df for _, _, df in games]), self.store_path)
+
+        del self.games[pid]
+        del self.rows[pid]
+
+        # Record the games that have been written.
+        manifest_file = manifest(self.store_path, pid)
+        ingested = {}
+        if os.path.isfile(manifest_file):
+            with open(manifest_file, 'r') as f:
+                ingested = json.load(f)
+
+        ingested.update((name, entry) for name, entry, _ in games)
+
+        with open(manifest_file + ".tmp", 'w') as f:
+            json.dump(ingested, f)
+        os.rename(manifest_file + ".tmp", manifest_file)
+
+
+def manifest(store_path, pid):
+    """The manifest of the game files in the store for a pitcher."""
+
+    return os.path.join(store_path, pid + ".manifest.json")
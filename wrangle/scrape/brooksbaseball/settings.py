@@ -15,3 +15,33 @@ NEWSPIDER_MODULE = 'brooksbaseball.spiders'
 
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
 #USER_AGENT = 'brooksbaseball (+http://www.yourdomain.com)'
+
+# Crawl responsibly, the delay between requests adapts to the
+#  site's response times (never less than DOWNLOAD_DELAY).
+DOWNLOAD_DELAY = 0.25
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
+AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_START_DELAY = 0.5
+AUTOTHROTTLE_MAX_DELAY = 10.0
+AUTOTHROTTLE_TARGET_CONCURRENCY = 4.0
+
+# Keep every response on disk so re-crawls never refetch a page
+#  (recent days bypass the cache, see RootSpider.recent_days).
+HTTPCACHE_ENABLED = True
+HTTPCACHE_DIR = 'httpcache'
+HTTPCACHE_EXPIRATION_SECS = 0
+HTTPCACHE_IGNORE_HTTP_CODES = [500, 502, 503, 504, 408]
+
+# To be able to pause and resume a crawl, run it with a job directory:
+#  scrapy crawl brooksbaseball -s JOBDIR=crawls/brooksbaseball-1
+
+# Parse the scraped games and write them to the columnar store
+#  (see wrangle/store.py). A pitcher's games are written once
+#  STORE_BATCH_ROWS of its pitches are buffered, or once
+#  STORE_MAX_ROWS pitches are buffered in total.
+ITEM_PIPELINES = {
+    'brooksbaseball.pipelines.StorePipeline': 300,
+}
+STORE_PATH = 'store/'
+STORE_BATCH_ROWS = 2000
+STORE_MAX_ROWS = 250000
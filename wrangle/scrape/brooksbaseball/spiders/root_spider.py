@@ -1,5 +1,7 @@
 """
-Scrapes brooksbaseball and stores the raw html files to disk.
+Scrapes brooksbaseball and passes the stats of every pitcher's game
+on to the store pipeline (optionally archiving the raw html files
+to disk as well).
 
 The style guide follows the strict python PEP 8 guidelines.
 @see http://www.python.org/dev/peps/pep-0008/
@@ -8,19 +10,27 @@ The style guide follows the strict python PEP 8 guidelines.
 @author Fil Piasevoli <fpiasevoli@g.harvard.edu>
 @author Lyla Fadden <lylafadden@g.harvard.edu>
 
-@requires Python >=2.7
+@requires Python >=3
 @copyright 2014
 """
+import json
 import os
+import sys
 
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from dateutil.rrule import rrule, DAILY
-from urllib import urlencode
-from urlparse import parse_qs, urlparse
+from urllib.parse import parse_qs, urlencode, urlparse
 
 from scrapy import Request, Spider
 
 from brooksbaseball.items import GameItem
+from brooksbaseball.pipelines import manifest
+
+# The instrumentation lives with the wrangle scripts.
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir, os.pardir, os.pardir))
+import instrument
 
 class RootSpider(Spider):
     # Name of the scraper.
@@ -29,19 +39,29 @@ class RootSpider(Spider):
     # The allowed domains to crawl.
     allowed_domains = ["brooksbaseball.net"]
 
-    # The timeout between requests.
-    download_delay = 0.5
-
-    # The base url.
+    # The base url (can be overridden with -a base_url=..., e.g. to
+    #  crawl a local copy of the site).
     base_url = "http://www.brooksbaseball.net/pfxVB/"
 
-    # The location to save the scraped html files.
+    # The location to save the scraped html files (in archive mode,
+    #  -a archive=1).
     store_path = "data/"
+    archive = False
 
     # Define a start and end date for crawling.
     #  Baseball seasons starts in March!
+    # Both can be set from the command line as YYYY-MM-DD or "yesterday",
+    #  e.g. -a start_date=2014-04-01 -a end_date=2014-04-30
     start_date = date(2008, 3, 1)
-    end_date = date(2014, 12, 01)
+    end_date = date(2014, 12, 1)
+
+    # The season calendar, the number of games on every day that
+    #  has been crawled before. Days without games are not requested.
+    calendar_path = "calendar.json"
+
+    # Days this recent are always fetched from the site instead of the
+    #  http cache, their games may not be complete yet.
+    recent_days = 3
 
     def __init__(self, *args, **kwargs):
         """
@@ -50,17 +70,81 @@ class RootSpider(Spider):
 
         super(RootSpider, self).__init__(*args, **kwargs)
 
+        # Only follow links to the host that is crawled.
+        self.allowed_domains = [urlparse(self.base_url).hostname]
+
+        self.start_date = self._date(self.start_date)
+        self.end_date = self._date(self.end_date)
+
+        self.archive = self.archive in [True, '1', 'true', 'yes']
+
+        # The games in the store per pitcher (loaded when needed).
+        self.ingested = {}
+
+        self.calendar = {}
+        if os.path.isfile(self.calendar_path):
+            with open(self.calendar_path, 'r') as f:
+                self.calendar = json.load(f)
+
         self.start_urls = []
+        self.start_dates = []
 
         # The start urls are every single date from the start to the end dates
         #  defined above.
         for dt in rrule(DAILY, dtstart=self.start_date, until=self.end_date):
+            # Skip the days that are known to have no games.
+            if self.calendar.get(dt.date().isoformat(), None) == 0:
+                continue
+
             url = self.base_url + "pfx.php/?league=mlb&"
             # The site does not like 0 padded dates.
             url += "&year=" + str(int(dt.year))
             url += "&month=" + str(int(dt.month))
             url += "&day=" + str(int(dt.day))
             self.start_urls.append(url)
+            self.start_dates.append(dt.date())
+
+        # The game pages crawled (rows) and their bytes, recorded
+        #  when the crawl is done.
+        self.metrics = instrument.stage('crawl', archive=self.archive).start()
+
+    def _date(self, value):
+        """
+        Converts a date from the command line (YYYY-MM-DD or yesterday).
+        """
+
+        if isinstance(value, date):
+            return value
+
+        if value == "yesterday":
+            return date.today() - timedelta(days=1)
+
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+    def closed(self, reason):
+        """
+        Saves the season calendar when the crawl is done (and records
+        the crawl, see wrangle/instrument.py).
+        """
+
+        with open(self.calendar_path + ".tmp", 'w') as f:
+            json.dump(self.calendar, f, indent=0, sort_keys=True)
+        os.rename(self.calendar_path + ".tmp", self.calendar_path)
+
+        self.metrics.fields['reason'] = reason
+        self.metrics.finish()
+
+    def start_requests(self):
+        """
+        Generates the requests for the start urls. Recent days
+        bypass the http cache.
+        """
+
+        recent = date.today() - timedelta(days=self.recent_days)
+
+        for dt, url in zip(self.start_dates, self.start_urls):
+            yield Request(
+                url, dont_filter=True, meta={'dont_cache': dt >= recent})
 
     def parse(self, response):
         """
@@ -71,15 +155,25 @@ class RootSpider(Spider):
         # Find the games selection drop down box.
         xpath = '//select[@name="game"]/option'
 
+        # Remember how many games there were on this day. Recent days
+        #  are left out, their games may not be listed yet, and so are
+        #  pages without the drop down box (e.g. an error page), the
+        #  day is requested again on the next crawl.
+        params = parse_qs(
+            urlparse(response.url).query,
+            keep_blank_values=True)
+        dt = date(
+            int(params['year'][0]),
+            int(params['month'][0]),
+            int(params['day'][0]))
+        if not response.xpath('//select[@name="game"]'):
+            self.logger.warning("No games list on " + response.url)
+        elif dt < date.today() - timedelta(days=self.recent_days):
+            self.calendar[dt.isoformat()] = len(response.xpath(xpath))
+
         # For each option (game), generate a
         #  new request with game details.
         for sel in response.xpath(xpath):
-            url = response.url
-
-            params = parse_qs(
-                urlparse(url).query,
-                keep_blank_values=True)
-
             game = sel.xpath('@value').extract()[0]
 
             url = response.url
@@ -91,7 +185,9 @@ class RootSpider(Spider):
 
             # Generate a new request which is specific to a game
             #  on a particular day.
-            req = Request(url, callback=self.parse_game)
+            req = Request(
+                url, callback=self.parse_game,
+                meta={'dont_cache': response.meta.get('dont_cache', False)})
 
             yield req
 
@@ -101,6 +197,10 @@ class RootSpider(Spider):
         the pitchers for that game.
         """
 
+        params = parse_qs(
+            urlparse(response.url).query,
+                keep_blank_values=True)
+
         # Find the pitcher selection drop down box.
         xpath = '//select[@name="pitchSel"]/option'
 
@@ -110,9 +210,19 @@ class RootSpider(Spider):
         for sel in response.xpath(xpath):
             url = response.url
 
-            url += "&pitchSel=" + sel.xpath('@value').extract()[0]
+            pitcher_id = sel.xpath('@value').extract()[0]
+
+            # Skip the pitchers whose games were already scraped.
+            if self.scraped(self.game_file(
+                    params['year'][0], params['month'][0], params['day'][0],
+                    params['game'][0], pitcher_id), pitcher_id):
+                continue
 
-            req = Request(url, callback=self.parse_pitcher)
+            url += "&pitchSel=" + pitcher_id
+
+            req = Request(
+                url, callback=self.parse_pitcher,
+                meta={'dont_cache': response.meta.get('dont_cache', False)})
 
             yield req
 
@@ -151,7 +261,9 @@ class RootSpider(Spider):
 
         url = self.base_url + link.path + "?" + urlencode(params)
 
-        req = Request(url, callback=self.parse_pitcher_stats, meta={'data': data})
+        req = Request(url, callback=self.parse_pitcher_stats, meta={
+            'data': data,
+            'dont_cache': response.meta.get('dont_cache', False)})
 
         yield req
 
@@ -159,10 +271,11 @@ class RootSpider(Spider):
         """
         Parses the final page of the operation - a raw html page
         with one table containing all the stats for one pitcher during
-        a particular game. This html page will be directly downloaded to disk
-        for post processing.
+        a particular game. The page is handed to the item pipeline,
+        which parses the table and writes it to the store.
 
-        The files will be structured as follows:
+        In archive mode the html page is also directly downloaded
+        to disk. The files will be structured as follows:
 
         root/
           2008/
@@ -176,24 +289,61 @@ class RootSpider(Spider):
 
         data = response.meta['data']
 
-        # Create a top level year directory that will contain
-        #  sub-directories for every day containing at least
-        #  one game during the year.
-        path = self.store_path
-        path += "/" + data['year']
+        self.metrics.rows += 1
+        self.metrics.bytes_read += len(response.body)
 
-        if not os.path.exists(path):
-            os.makedirs(path)
+        filename = self.game_file(
+            data['year'], data['month'], data['day'],
+            data['game_id'], data['pitcher_id'])
 
-        path += "/" + data['month'].zfill(2) + "-" + data['day'].zfill(2)
+        if self.archive:
+            path = os.path.dirname(filename)
+            if not os.path.exists(path):
+                os.makedirs(path)
 
-        if not os.path.exists(path):
-            os.makedirs(path)
+            with open(filename, 'wb') as f:
+                f.write(response.body)
+            self.metrics.bytes_written += len(response.body)
 
-        # Make sure the game id and the pitcher id are in the file name.
-        filename = path + "/" + \
-            data['game_id'][:-1] + \
-            "-pid_" + data['pitcher_id'] + ".html"
+        yield GameItem(
+            year=data['year'],
+            month=data['month'],
+            day=data['day'],
+            game_id=data['game_id'],
+            pitcher_id=data['pitcher_id'],
+            game_file=os.path.basename(filename),
+            body=response.body)
 
-        with open(filename, 'wb') as f:
-            f.write(response.body)
+    def scraped(self, filename, pitcher_id):
+        """
+        Determines if a pitcher's game was already scraped, i.e. it is
+        in the store's manifest (or archived on disk).
+        """
+
+        if not pitcher_id in self.ingested:
+            self.ingested[pitcher_id] = {}
+
+            manifest_file = manifest(
+                self.settings.get('STORE_PATH'), pitcher_id)
+            if os.path.isfile(manifest_file):
+                with open(manifest_file, 'r') as f:
+                    self.ingested[pitcher_id] = json.load(f)
+
+        if os.path.basename(filename) in self.ingested[pitcher_id]:
+            return True
+
+        return bool(self.archive) and os.path.isfile(filename)
+
+    def game_file(self, year, month, day, game_id, pitcher_id):
+        """
+        The file a pitcher's stats for a game are stored in. There is a
+        top level year directory that contains sub-directories for every
+        day containing at least one game during the year.
+        """
+
+        path = self.store_path
+        path += "/" + year
+        path += "/" + month.zfill(2) + "-" + day.zfill(2)
+
+        # Make sure the game id and the pitcher id are in the file name.
+        return path + "/" + game_id[:-1] + "-pid_" + pitcher_id + ".html"
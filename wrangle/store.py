@@ -0,0 +1,296 @@
+"""
+A columnar (parquet) store for the pitcher data with a fixed schema.
+
+The store is partitioned by pitcher and season:
+
+  root/
+    433587/
+      2008/
+        part-0.parquet
+      2009/
+        part-0.parquet
+      ...
+    ...
+
+Reading a pitcher back only touches the requested columns and keeps the
+categoricals, small integers and real dates, so nothing is re-parsed
+from text.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+# The type of every known column. Columns that are not listed
+#  are stored as they are.
+SCHEMA = {
+    'dateStamp': 'datetime64[ns]',
+    'park_sv_id': 'object',
+    'gid': 'object',
+    'des': 'category',
+    'pdes': 'category',
+    'type': 'category',
+    'type_last': 'category',
+    'mlbam_pitch_name': 'category',
+    'stand': 'category',
+    'pitcher_team': 'category',
+    'pitcher_id': 'int32',
+    'batter_id': 'int32',
+    'ab_id': 'int16',
+    'id': 'int16',
+    'pitch_in_inning': 'int16',
+    'pitch_in_game': 'int16',
+    'ab_total': 'int8',
+    'ab_count': 'int8',
+    'strikes': 'int8',
+    'balls': 'int8',
+    'outs': 'int8',
+    'inning': 'int8',
+    'zone_location': 'int8',
+    'fastball_binary': 'int8',
+    'fastball_last': 'int8',
+    'first_of_inning': 'int8',
+    'last_pitch_ab': 'int8',
+    'resulting_outs': 'int8',
+    'start_speed': 'float32',
+    'speed_last': 'float32',
+}
+
+
+def typed(df):
+    """
+    Converts a pitcher DataFrame (e.g. read from a csv) to the store schema.
+    """
+
+    # Drop the index column written by to_csv.
+    df = df.drop(
+        [column for column in df.columns if column.startswith('Unnamed:')],
+        axis=1)
+
+    for column, dtype in SCHEMA.items():
+        if not column in df:
+            continue
+
+        if dtype.startswith('datetime'):
+            df[column] = pd.to_datetime(df[column])
+        elif dtype.startswith('int') and df[column].isnull().any():
+            # Integers can't hold missing values, keep them as floats.
+            df[column] = df[column].astype(np.float32)
+        else:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+
+def write(df, root):
+    """
+    Writes the pitches to the store, one new part file per pitcher
+    and season.
+    """
+
+    df = typed(df)
+
+    seasons = df['dateStamp'].dt.year
+    for (pid, season), group in df.groupby([df['pitcher_id'], seasons]):
+        path = os.path.join(root, str(int(pid)), str(int(season)))
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        # Only keep the categories used by this part.
+        group = group.copy()
+        for column in group.columns:
+            if group[column].dtype.name == 'category':
+                group[column] = group[column].cat.remove_unused_categories()
+
+        group.to_parquet(
+            os.path.join(path, "part-" + str(_num_parts(path)) + ".parquet"),
+            index=False)
+
+
+def remove(root, pitchers):
+    """
+    Removes pitchers from the store, e.g. before writing all of their
+    pitches again (write() only ever adds part files).
+    """
+
+    for pid in pitchers:
+        path = os.path.join(root, str(int(pid)))
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+
+def fingerprint(data):
+    """
+    The size and sha1 of the content of a game file, the entry of the
+    file in a pitcher's manifest (kept by compress.py -a and the
+    crawler's store pipeline alike).
+    """
+
+    return [len(data), hashlib.sha1(data).hexdigest()]
+
+
+def files(root, pitchers=None, seasons=None):
+    """
+    Finds the part files in the store, optionally only for
+    some pitchers and/or seasons.
+    """
+
+    found = []
+
+    pitchers = sorted(os.listdir(root)) if pitchers is None else pitchers
+    for pid in pitchers:
+        ppath = os.path.join(root, str(pid))
+        if not os.path.isdir(ppath):
+            continue
+
+        for season in sorted(os.listdir(ppath)):
+            if seasons is not None and not int(season) in seasons:
+                continue
+
+            spath = os.path.join(ppath, season)
+            found.extend(
+                os.path.join(spath, part)
+                for part in sorted(os.listdir(spath), key=_part_number))
+
+    return found
+
+
+def load(root, pitchers=None, seasons=None, columns=None):
+    """
+    Loads pitches from the store, only reading the requested columns.
+    """
+
+    return _concat(
+        [pd.read_parquet(f, columns=columns)
+         for f in files(root, pitchers, seasons)],
+        columns)
+
+
+def read(path, columns=None):
+    """
+    Reads a pitcher file, which is either a csv file from compress.py
+    or a pitcher (or whole) directory of the store.
+    """
+
+    if os.path.isdir(path):
+        root, pitchers = _pitchers(path)
+        return load(root, pitchers, columns=columns)
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+
+    return pd.read_csv(path, usecols=columns)
+
+
+def chunks(path, columns=None, chunksize=100000):
+    """
+    Reads a pitcher file (see read()) in pieces, a csv file chunksize
+    rows at a time and the store one part file at a time.
+    """
+
+    for part in partitions(path):
+        if part.endswith('.parquet'):
+            yield pd.read_parquet(part, columns=columns)
+        else:
+            for chunk in pd.read_csv(
+                    part, usecols=columns, chunksize=chunksize):
+                yield chunk
+
+
+def partitions(path):
+    """
+    The files a pitcher file (see read()) is made of: the part files of
+    a store directory, or the csv (or parquet) file itself.
+    """
+
+    if os.path.isdir(path):
+        root, pitchers = _pitchers(path)
+        return files(root, pitchers)
+
+    return [path]
+
+
+def games(frames):
+    """
+    Regroups pieces of pitches (e.g. from chunks()) so that no game is
+    split between two of them. The last game of every piece is held
+    back until the next one, so the games have to be contiguous.
+    """
+
+    held = None
+    for frame in frames:
+        if held is not None:
+            frame = pd.concat([held, frame])
+        if not len(frame):
+            continue
+
+        # Where the last game of the piece starts.
+        gid = frame['gid'].values
+        other = np.flatnonzero(gid != gid[-1])
+        last = other[-1] + 1 if len(other) else 0
+
+        held = frame.iloc[last:]
+        if last:
+            yield frame.iloc[:last]
+
+    if held is not None and len(held):
+        yield held
+
+
+def _pitchers(path):
+    """
+    The root of a store directory and its pitchers (None for all of
+    them). A single pitcher's directory holds season directories.
+    """
+
+    if all(season.isdigit() and len(season) == 4
+           for season in os.listdir(path)):
+        root, pid = os.path.split(os.path.normpath(path))
+        return root, [pid]
+
+    return path, None
+
+
+def _concat(frames, columns):
+    """
+    Concatenates the parts while keeping the categorical columns.
+    """
+
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.concat(frames, ignore_index=True)
+
+    # Parts with different categories fall back to objects.
+    for column in df.columns:
+        if SCHEMA.get(column) == 'category' and \
+                df[column].dtype.name != 'category':
+            df[column] = df[column].astype('category')
+
+    return df
+
+
+def _part_number(part):
+    """The number of a part file, e.g. 3 for part-3.parquet."""
+
+    return int(part[len("part-"):-len(".parquet")])
+
+
+def _num_parts(path):
+    """The number of part files in a season directory."""
+
+    return len(
+        [part for part in os.listdir(path) if part.endswith('.parquet')])
@@ -0,0 +1,126 @@
+"""
+A fast parser for the brooksbaseball "expanded tabled data" pages. Each
+page holds a single flat table whose first row is the header, so the
+cells are sliced out of the html with a few regular expressions (no
+document tree is built) and the rows are typed by pandas' C csv reader
+in one go. Pages the slicing can't handle (cells without closing tags)
+fall back to lxml.
+
+The style guide follows the strict python PEP 8 guidelines.
+@see http://www.python.org/dev/peps/pep-0008/
+
+@author Aaron Zampaglione <azampaglione@g.harvard.edu>
+@author Fil Piasevoli <fpiasevoli@g.harvard.edu>
+@author Lyla Fadden <lylafadden@g.harvard.edu>
+
+@requires Python >=2.7
+@copyright 2014
+"""
+import csv
+import io
+import re
+
+try:
+    from html import unescape
+except ImportError:
+    from HTMLParser import HTMLParser
+    unescape = HTMLParser().unescape
+
+import lxml.html
+import pandas as pd
+
+
+# The first table of a page, its rows and cells.
+TABLE = re.compile(r'<table\b.*?</table\s*>', re.I | re.S)
+ROW = re.compile(r'<tr\b', re.I)
+CELL = re.compile(r'<t[dh]\b[^>]*>(.*?)</t[dh]\s*>', re.I | re.S)
+
+# The markup inside of a cell, and its whitespace (collapsed the same
+#  way pd.read_html does).
+TAG = re.compile(r'<[^>]*>')
+WHITESPACE = re.compile(r'[\r\n]+|\s{2,}')
+
+# The cells of a row are joined with a character that can't be in the
+#  text of a page, the rows with new lines.
+SEP = '\x01'
+STRIP = re.compile(r'\s*' + SEP + r'\s*')
+
+
+def parse(html):
+    """
+    Parses a game page into a DataFrame. The columns are typed the same
+    way pd.read_html(html, header=0)[0] types them.
+    """
+
+    # Raw response bodies are bytes on python 3.
+    if isinstance(html, bytes) and not isinstance(html, str):
+        html = html.decode('utf-8', 'replace')
+
+    rows = cells(html)
+    if not rows:
+        raise ValueError("No tables found")
+
+    # Rows with more cells than the others are padded with empty cells
+    #  (the header with unnamed columns), like pd.read_html does.
+    widths = [row.count(SEP) for row in rows]
+    width = max(widths)
+    if widths[0] < width:
+        rows = [row + SEP * (width - n) for row, n in zip(rows, widths)]
+
+    return pd.read_csv(
+        io.StringIO(u'\n'.join(rows)), sep=SEP, header=0, index_col=False,
+        quoting=csv.QUOTE_NONE, engine='c')
+
+
+def cells(html):
+    """
+    The cell text of the rows of the first table in a page, every row
+    a string of cells joined by SEP.
+    """
+
+    table = TABLE.search(html)
+    if table is None:
+        return []
+
+    # The separator itself can only be read as a tree.
+    if SEP in table.group(0):
+        return _tree_cells(table.group(0))
+
+    rows = []
+    for row in ROW.split(table.group(0))[1:]:
+        found = CELL.findall(row)
+        if not found:
+            continue
+
+        text = SEP.join(found)
+        if '<' in text:
+            text = TAG.sub('', text)
+        if '&' in text:
+            text = unescape(text)
+        rows.append(STRIP.sub(SEP, WHITESPACE.sub(' ', text)).strip())
+
+    # Cells without closing tags can only be read as a tree.
+    if not rows and re.search(r'<t[dh]\b', table.group(0), re.I):
+        return _tree_cells(table.group(0))
+
+    return rows
+
+
+def _tree_cells(table):
+    """The rows of a table (see cells()) read with lxml."""
+
+    rows = []
+    for tr in lxml.html.fromstring(table).iter('tr'):
+        row = [WHITESPACE.sub(' ', cell.text_content()).strip()
+               for cell in tr if cell.tag in ('td', 'th')]
+        if row:
+            rows.append(SEP.join(cell.replace(SEP, ' ') for cell in row))
+
+    return rows
+
+
+def read(filename):
+    """Parses a game file from disk into a DataFrame."""
+
+    with open(filename, 'r') as f:
+        return parse(f.read())